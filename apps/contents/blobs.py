@@ -0,0 +1,145 @@
+"""Uploads deduplicated by content, so that a file uploaded again, to another post or by another creator, is stored,
+presigned and processed once.
+
+Once an image upload is confirmed, `deduplicate` hashes it and points its media at the `MediaBlob` of that digest.
+Videos are not deduplicated, hashing them takes streaming every upload through the worker for little to gain. The
+first upload of a file is copied to the key of its blob and its media is processed as usual, while later ones get
+what was derived from it copied over instead of being processed again. Uploads are deleted once their file is a
+blob's, and media that are linked while the file is still being processed get the derivatives once they are ready,
+from `share_derivatives`.
+
+Blob keys are under `blobs/`, which presigned posts are never issued for, so that an uploader cannot overwrite a file
+that other media use by uploading to its key again.
+
+Blobs count the media that use them and `collect_blobs` deletes the ones that no media uses anymore, with their files.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Exists, OuterRef
+
+from .choices import MediaType
+from .models import Media, MediaBlob, MediaVariant
+from .uploads import FILE_REFERENCES, s3_service, referenced_keys
+
+logger = logging.getLogger(__name__)
+
+# the most keys `DeleteObjects` takes, so that the files of a batch are deleted in a single request.
+BLOB_GC_BATCH_SIZE = 1000
+
+# copied to the media of a blob when they are set, which they are not before the blob's file is processed.
+DERIVED_FIELDS = ('blur_hash', 'duration', 'width', 'height', 'codec', 'poster_s3_key')
+
+BLOB_PREFIX = 'blobs/'
+
+
+def is_deduplicated(media: Media) -> bool:
+    return settings.MEDIA_DEDUPLICATION and media.media_type == MediaType.IMAGE
+
+
+def blob_key(digest: str) -> str:
+    return f'{BLOB_PREFIX}{digest}'
+
+
+def deduplicate(media: Media) -> bool:
+    """Point `media` at the blob of its file and return whether the file was already stored."""
+    if media.blob_id is not None:
+        # a retried task, the file is processed again which leaves what was already derived from it as it is.
+        return False
+
+    service = s3_service()
+    upload = media.s3_key
+    digest, size = service.digest(upload)
+    with transaction.atomic():
+        # locked so that the blob cannot be collected between being found and being used again.
+        blob, created = MediaBlob.objects.select_for_update().get_or_create(
+            digest=digest,
+            defaults={'s3_key': blob_key(digest), 'size': size},
+        )
+        if created:
+            # copied before the blob is committed, so that its file exists by the time other uploads can find it.
+            service.copy(upload, blob.s3_key)
+        MediaBlob.objects.filter(id=blob.id).update(refcount=F('refcount') + 1)
+        media.blob, media.s3_key = blob, blob.s3_key
+        media.save(update_fields=('blob', 's3_key', 'updated_at'))
+
+    # other media can still refer to the upload, as can blobs whose file was stored under the key it was uploaded to.
+    if upload != blob.s3_key and not referenced_keys({upload}, FILE_REFERENCES):
+        service.delete_keys([upload])
+
+    if created:
+        return False
+
+    source = Media.objects.filter(blob=blob).exclude(id=media.id).order_by('created_at').first()
+    if source is not None:
+        share_derivatives(source, Media.objects.filter(id=media.id))
+
+    return True
+
+
+def share_derivatives(media: Media, targets=None):
+    """Copy what was derived from the file of `media` to `targets`, by default the other media of its blob."""
+    if targets is None:
+        if media.blob_id is None:
+            return
+
+        targets = Media.objects.filter(blob_id=media.blob_id).exclude(id=media.id)
+
+    fields = {field: getattr(media, field) for field in DERIVED_FIELDS if getattr(media, field) not in {None, ''}}
+    if fields:
+        targets.update(**fields)
+
+    # variants are rows of their media, the copies refer to the same files.
+    variants = list(media.variants.all())
+    if variants:
+        MediaVariant.objects.bulk_create(
+            [
+                MediaVariant(
+                    media_id=target_id,
+                    width=variant.width,
+                    height=variant.height,
+                    image_format=variant.image_format,
+                    s3_key=variant.s3_key,
+                )
+                for target_id in targets.values_list('id', flat=True)
+                for variant in variants
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def release_blob(media: Media):
+    if media.blob_id is not None:
+        MediaBlob.objects.filter(id=media.blob_id).update(refcount=F('refcount') - 1)
+
+
+def collect_blobs(batch_size: int = BLOB_GC_BATCH_SIZE) -> int:
+    """Delete the blobs that no media uses, and their files, a batch at a time, and return how many were deleted."""
+    service = s3_service()
+    collected = 0
+    while True:
+        with transaction.atomic():
+            unused = (
+                MediaBlob.objects.select_for_update(skip_locked=True)
+                .filter(refcount=0)
+                .exclude(Exists(Media.objects.filter(blob=OuterRef('pk'))))
+                .values_list('id', 's3_key')[:batch_size]
+            )
+            batch = dict(unused)
+            MediaBlob.objects.filter(id__in=batch).delete()
+
+        if not batch:
+            return collected
+
+        # a key can be uploaded to again, the file is kept if it has become another media's or blob's since.
+        s3_keys = set(batch.values())
+        orphans = s3_keys - referenced_keys(s3_keys, FILE_REFERENCES)
+        if orphans:
+            failed = service.delete_keys(sorted(orphans))
+            if failed:
+                logger.warning('Unable to delete the files of %d unused blob(s)', len(failed))
+
+        collected += len(batch)
+        if len(batch) < batch_size:
+            return collected
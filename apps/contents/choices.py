@@ -9,3 +9,8 @@ class MediaType(models.TextChoices):
 class ContentType(models.TextChoices):
     FREE = 'free'
     PAID = 'paid'
+
+
+class ImageFormat(models.TextChoices):
+    WEBP = 'webp'
+    JPEG = 'jpeg'
@@ -0,0 +1,157 @@
+"""Ranked discover feed built from engagement scores kept in redis.
+
+Each content gets a score in the sorted set of the day it was created in, seeded when it is created and moved by
+every like, comment and purchase. Scores use forward decay: an event at time `t` adds
+`weight * 2 ** ((t - landmark) / DISCOVER_HALF_LIFE)`, the landmark being the start of the content's day, so older
+events count for less than newer ones without any stored score ever having to be decayed. A day stops being scored,
+and expires, once it falls out of `DISCOVER_HORIZON`.
+
+`rebuild_discover_pool` periodically merges the days of the horizon into a single pool, rescaling each day to a common
+landmark, and keeps the best `DISCOVER_POOL_SIZE` free contents of it. Pages are served from the pool alone, so they
+cost the same however much content there is.
+"""
+import time
+import logging
+from datetime import datetime, timedelta
+
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Count
+
+from utils.redis import get_redis
+
+from .models import Content
+from .choices import ContentType
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = int(timedelta(days=1).total_seconds())
+DISCOVER_POOL_KEY = 'discover:pool'
+DISCOVER_POOL_SIZE = 2000
+
+CREATED_WEIGHT = 1
+LIKE_WEIGHT = 1
+COMMENT_WEIGHT = 2
+PURCHASE_WEIGHT = 4
+
+
+def half_life() -> float:
+    return timedelta(hours=settings.DISCOVER_HALF_LIFE).total_seconds()
+
+
+def horizon() -> timedelta:
+    return timedelta(days=settings.DISCOVER_HORIZON)
+
+
+def bucket_of(moment: datetime) -> int:
+    return int(moment.timestamp() // BUCKET_SECONDS)
+
+
+def bucket_key(content_type: str, bucket: int) -> str:
+    return f'discover:{content_type}:{bucket}'
+
+
+def pool_member(content: Content) -> str:
+    # the creator is part of the member so that a viewer's own contents can be left out without a query.
+    return f'{content.id}:{content.creator_id}'
+
+
+def record_engagement(content: Content, weight: float, occurred_at: datetime | None = None, pipeline=None):
+    """Add an event of `weight` that happened to `content` at `occurred_at`, a retracted event weighs less than 0."""
+    occurred_at = timezone.now() if occurred_at is None else occurred_at
+    if occurred_at - content.created_at > horizon():
+        return
+
+    bucket = bucket_of(content.created_at)
+    landmark = bucket * BUCKET_SECONDS
+    key = bucket_key(content.content_type, bucket)
+    redis = get_redis().pipeline(transaction=False) if pipeline is None else pipeline
+    redis.zincrby(key, weight * 2 ** ((occurred_at.timestamp() - landmark) / half_life()), pool_member(content))
+    redis.expireat(key, landmark + BUCKET_SECONDS + int(horizon().total_seconds()))
+    if pipeline is None:
+        redis.execute()
+
+
+def update_scores_on_commit(func, *args, **kwargs):
+    """Update the scores with `func` once the current transaction commits, so that a rolled back one leaves no trace.
+
+    Scores can be rebuilt from the database, a Redis failure is logged rather than failing the write that caused it.
+    """
+
+    def update():
+        try:
+            func(*args, **kwargs)
+        except RedisError:
+            logger.exception('Unable to update the discover scores')
+
+    transaction.on_commit(update)
+
+
+def forget_content(key: str, member: str):
+    """Drop the score `member` has in the day of `key` and in the pool."""
+    with get_redis().pipeline(transaction=False) as pipeline:
+        pipeline.zrem(key, member)
+        pipeline.zrem(DISCOVER_POOL_KEY, member)
+        pipeline.execute()
+
+
+def rebuild_discover_pool():
+    """Merge the free contents of every day in the horizon into the pool and keep the best of them."""
+    current = int(time.time() // BUCKET_SECONDS)
+    days = int(horizon() / timedelta(seconds=BUCKET_SECONDS))
+    # a day's scores are relative to its own start, weighing them brings every day to the current one's landmark.
+    weights = {
+        bucket_key(ContentType.FREE, bucket): 2 ** ((bucket - current) * BUCKET_SECONDS / half_life())
+        for bucket in range(current - days, current + 1)
+    }
+    with get_redis().pipeline() as pipeline:
+        pipeline.zunionstore(DISCOVER_POOL_KEY, weights)
+        pipeline.zremrangebyrank(DISCOVER_POOL_KEY, 0, -(DISCOVER_POOL_SIZE + 1))
+        pipeline.execute()
+
+
+def discover_feed(viewer) -> list[str]:
+    """The ids of the contents in the pool, best first, without the viewer's own."""
+    redis = get_redis()
+    members = redis.zrevrange(DISCOVER_POOL_KEY, 0, -1)
+    if not members:
+        rebuild_discover_pool()
+        members = redis.zrevrange(DISCOVER_POOL_KEY, 0, -1)
+
+    own = f':{viewer.id}'
+    return [member.partition(':')[0] for member in members if not member.endswith(own)]
+
+
+def rebuild_discover_scores() -> int:
+    """Re-derive the scores of every content in the horizon from the database and return how many were scored.
+
+    Likes and purchases are not timestamped, so they are counted as if they happened when the content was created.
+    """
+    contents = Content.objects.filter(created_at__gte=timezone.now() - horizon()).annotate(
+        likes_total=Count('likes', distinct=True),
+        comments_total=Count('comments', distinct=True),
+        purchases_total=Count('purchases', distinct=True),
+    )
+    redis = get_redis()
+    for key in redis.scan_iter('discover:*'):
+        redis.delete(key)
+
+    scored = 0
+    with redis.pipeline(transaction=False) as pipeline:
+        for content in contents.iterator(chunk_size=2000):
+            weight = (
+                CREATED_WEIGHT
+                + content.likes_total * LIKE_WEIGHT
+                + content.comments_total * COMMENT_WEIGHT
+                + content.purchases_total * PURCHASE_WEIGHT
+            )
+            record_engagement(content, weight, occurred_at=content.created_at, pipeline=pipeline)
+            scored += 1
+
+        pipeline.execute()
+
+    rebuild_discover_pool()
+    return scored
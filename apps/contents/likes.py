@@ -0,0 +1,186 @@
+"""Likes buffered in redis and written to the database in batches by `flush_likes`.
+
+Liking or unliking a content only records the new state in the content's hash of pending likes, keyed by the id of
+the creator with `1` for liked and `0` for unliked, and marks the content as dirty. Toggling before a flush therefore
+collapses to the last state. The flush moves the pending hash of each dirty content to a flushing hash, applies it to
+the likes table with one insert and one delete per batch of contents and only then drops the flushing hash, so that
+reads, which lay the flushing then the pending hash over the database, never miss a like in between.
+"""
+import operator
+import functools
+from datetime import timedelta
+
+from django.db.models import Q
+from django.db import transaction
+
+from apps.creators.models import Creator
+
+from utils.redis import get_redis
+
+from . import discover
+from .models import Content
+
+LIKES_DIRTY_KEY = 'likes:dirty'
+LIKES_FLUSH_BATCH_SIZE = 500
+
+# how long the likes of a failed flush are kept for, the next flush picks them up well before they expire.
+FLUSHING_RETENTION = timedelta(days=1)
+
+TAKE_PENDING_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local entries = redis.call('HGETALL', KEYS[1])
+    for i = 1, #entries, 2 do
+        redis.call('HSET', KEYS[2], entries[i], entries[i + 1])
+    end
+    redis.call('DEL', KEYS[1])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+
+@functools.cache
+def take_pending_script():
+    return get_redis().register_script(TAKE_PENDING_SCRIPT)
+
+
+def pending_key(content_id) -> str:
+    return f'likes:pending:{content_id}'
+
+
+def flushing_key(content_id) -> str:
+    return f'likes:flushing:{content_id}'
+
+
+def set_like(content: Content, creator: Creator, *, liked: bool):
+    """Record that `creator` likes, or no longer likes, `content` in a single round trip."""
+    with get_redis().pipeline() as pipeline:
+        pipeline.hset(pending_key(content.id), str(creator.id), int(liked))
+        pipeline.sadd(LIKES_DIRTY_KEY, str(content.id))
+        pipeline.execute()
+
+
+def like_states(contents: list[Content], viewer: Creator) -> tuple[set, dict]:
+    """Which of `contents` `viewer` likes and how many likes each of them has, for a whole page at once.
+
+    The pending likes of every content are read in one round trip and the stored likes they override in one query.
+    Contents are expected to be annotated with their number of stored likes, see `with_likes_total`.
+    """
+    with get_redis().pipeline(transaction=False) as pipeline:
+        for content in contents:
+            pipeline.hgetall(flushing_key(content.id))
+            pipeline.hgetall(pending_key(content.id))
+        hashes = pipeline.execute()
+
+    pending = {
+        str(content.id): {creator_id: state == '1' for creator_id, state in (flushing | pending).items()}
+        for content, flushing, pending in zip(contents, hashes[::2], hashes[1::2], strict=True)
+    }
+    viewer_id = str(viewer.id)
+    lookup = functools.reduce(
+        operator.or_,
+        (Q(content_id=content_id, creator_id__in=states) for content_id, states in pending.items() if states),
+        Q(content__in=contents, creator_id=viewer.id),
+    )
+    stored = {
+        (str(content_id), str(creator_id))
+        for content_id, creator_id in Content.likes.through.objects.filter(lookup).values_list(
+            'content_id', 'creator_id'
+        )
+    }
+
+    liked, counts = set(), {}
+    for content in contents:
+        content_id = str(content.id)
+        states = pending[content_id]
+        if states.get(viewer_id, (content_id, viewer_id) in stored):
+            liked.add(content.id)
+        # the stored likes of the creators with a pending like are replaced by the pending state.
+        overridden = sum((content_id, creator_id) in stored for creator_id in states)
+        counts[content.id] = content.likes_total - overridden + sum(states.values())
+
+    return liked, counts
+
+
+def flush_likes(batch_size: int = LIKES_FLUSH_BATCH_SIZE) -> int:
+    """Write the pending likes of every dirty content to the database and return how many contents were flushed."""
+    redis = get_redis()
+    flushed = 0
+    while content_ids := redis.spop(LIKES_DIRTY_KEY, batch_size):
+        script = take_pending_script()
+        changes = {
+            content_id: dict(zip(entries[::2], entries[1::2], strict=True))
+            for content_id in content_ids
+            if (
+                entries := script(
+                    keys=(pending_key(content_id), flushing_key(content_id)),
+                    args=(int(FLUSHING_RETENTION.total_seconds()),),
+                )
+            )
+        }
+        try:
+            apply_likes(changes)
+        except Exception:
+            # the flushing hashes are kept, the next flush merges them with whatever was liked since.
+            redis.sadd(LIKES_DIRTY_KEY, *content_ids)
+            raise
+
+        redis.delete(*(flushing_key(content_id) for content_id in content_ids))
+        flushed += len(content_ids)
+
+    return flushed
+
+
+def likes_of(likers: dict[Content, set[str]]) -> Q:
+    return functools.reduce(
+        operator.or_,
+        (Q(content=content, creator_id__in=creator_ids) for content, creator_ids in likers.items()),
+    )
+
+
+def apply_likes(changes: dict[str, dict[str, str]]):
+    """Apply the likes of a batch of contents, skipping the contents and creators deleted in the meantime."""
+    contents = Content.objects.in_bulk(changes)
+    creator_ids = {creator_id for likes in changes.values() for creator_id in likes}
+    creators = {
+        str(creator_id) for creator_id in Creator.objects.filter(id__in=creator_ids).values_list('id', flat=True)
+    }
+    liked, unliked = {}, {}
+    for content in contents.values():
+        for creator_id, state in changes[str(content.id)].items():
+            if creator_id in creators:
+                (liked if state == '1' else unliked).setdefault(content, set()).add(creator_id)
+
+    if not liked and not unliked:
+        return
+
+    through = Content.likes.through
+    # a content can have both likes and unlikes in a batch, the lookup covers both of them.
+    changed = {content: liked.get(content, set()) | unliked.get(content, set()) for content in liked.keys() | unliked}
+    stored = {
+        (str(content_id), str(creator_id))
+        for content_id, creator_id in through.objects.filter(likes_of(changed)).values_list('content_id', 'creator_id')
+    }
+
+    with transaction.atomic():
+        through.objects.bulk_create(
+            [
+                through(content=content, creator_id=creator_id)
+                for content, likers in liked.items()
+                for creator_id in likers
+            ],
+            ignore_conflicts=True,
+        )
+        if unliked:
+            through.objects.filter(likes_of(unliked)).delete()
+
+        # the table is written in bulk, which sends no `m2m_changed`, so the discover scores are moved here for the
+        # likes that actually changed, once they are committed.
+        for content, likers in liked.items():
+            added = sum((str(content.id), creator_id) not in stored for creator_id in likers)
+            if added:
+                discover.update_scores_on_commit(discover.record_engagement, content, discover.LIKE_WEIGHT * added)
+        for content, likers in unliked.items():
+            removed = sum((str(content.id), creator_id) in stored for creator_id in likers)
+            if removed:
+                discover.update_scores_on_commit(discover.record_engagement, content, -discover.LIKE_WEIGHT * removed)
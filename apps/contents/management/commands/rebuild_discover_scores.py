@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.contents.discover import rebuild_discover_scores
+
+
+class Command(BaseCommand):
+    help = 'Drop the discover scores and rebuild them from the contents created within the horizon.'  # noqa: A003
+
+    def handle(self, *args, **options):
+        scored = rebuild_discover_scores()
+        self.stdout.write(f'Rebuilt the discover scores of {scored} content(s).')
@@ -1,15 +1,16 @@
-import datetime
+from typing import ClassVar
 
 from django.db import models
 from django.conf import settings
+from django.db.models.functions import Coalesce, RowNumber
 from django.core.validators import MaxValueValidator, MinValueValidator
 
 from services.s3 import S3Service
 
-from utils.constants import ZERO
 from utils.models import UUIDModel, TimestampedModel
+from utils.constants import ZERO, COMMENT_PREVIEW_SIZE, MAX_LIVESTREAM_DURATION, MIN_LIVESTREAM_DURATION
 
-from .choices import MediaType, ContentType
+from .choices import MediaType, ContentType, ImageFormat
 
 
 class Content(UUIDModel, TimestampedModel, models.Model):
@@ -31,14 +32,41 @@ class Content(UUIDModel, TimestampedModel, models.Model):
     def __str__(self):
         return f'{self.creator.address} - {self.caption}'
 
-    @property
-    def likes_count(self):
-        return self.likes.count()
-
     @property
     def comments_count(self):
         return self.comments.count()
 
+    @property
+    def latest_comments(self):
+        """The newest `COMMENT_PREVIEW_SIZE` comments, already fetched if the content comes with a comment preview."""
+        if hasattr(self, 'comment_preview'):
+            return self.comment_preview
+
+        return self.comments.select_related('author').order_by('-created_at')[:COMMENT_PREVIEW_SIZE]
+
+
+class MediaBlob(UUIDModel, TimestampedModel, models.Model):
+    """A unique uploaded file, stored once however many `Media` are uploads of the same bytes.
+
+    `refcount` is the number of media that use the file, blobs are collected by `collect_media_blobs` once it drops
+    to zero.
+    """
+
+    digest = models.CharField('sha256 digest', max_length=64, unique=True)
+    s3_key = models.CharField(max_length=100, blank=False, verbose_name='file path on s3')
+    size = models.PositiveBigIntegerField('size in bytes')
+    refcount = models.PositiveIntegerField('number of media using the file', default=0)
+
+    class Meta:
+        indexes: ClassVar[list] = [
+            models.Index(fields=('s3_key',), name='media_blob_s3_key_idx'),
+            # only the blobs waiting to be collected are indexed.
+            models.Index(fields=('refcount',), name='media_blob_unused_idx', condition=models.Q(refcount=0)),
+        ]
+
+    def __str__(self):
+        return f'{self.digest} - {self.s3_key}'
+
 
 class Media(UUIDModel, TimestampedModel, models.Model):
     content = models.ForeignKey(
@@ -52,6 +80,30 @@ class Media(UUIDModel, TimestampedModel, models.Model):
     s3_key = models.CharField(max_length=100, blank=False, verbose_name='file path on s3')
     media_type = models.CharField(max_length=20, choices=MediaType.choices, blank=False, verbose_name='media type')
 
+    # read from the header of videos by `process_video`, the poster being a frame of the video.
+    duration = models.DurationField('video duration', null=True, blank=True)
+    width = models.PositiveIntegerField('video width in pixels', null=True, blank=True)
+    height = models.PositiveIntegerField('video height in pixels', null=True, blank=True)
+    codec = models.CharField('video codec', max_length=16, default='', blank=True)
+    poster_s3_key = models.CharField(max_length=100, default='', blank=True, verbose_name='poster file path on s3')
+
+    # set once the upload is hashed, `s3_key` then being the key of the blob's file.
+    blob = models.ForeignKey(
+        to=MediaBlob,
+        on_delete=models.PROTECT,
+        verbose_name='blob',
+        related_name='media',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        indexes: ClassVar[list] = [
+            # the orphaned uploads sweep looks a page of listed keys up at a time.
+            models.Index(fields=('s3_key',), name='media_s3_key_idx'),
+            models.Index(fields=('poster_s3_key',), name='media_poster_s3_key_idx'),
+        ]
+
     def __str__(self):
         return f'{self.media_type} - {self.s3_key}'
 
@@ -64,6 +116,43 @@ class Media(UUIDModel, TimestampedModel, models.Model):
         )
         return s3_service.get_pre_signed_fetch_url(self.s3_key, settings.PRESIGNED_URL_EXPIRATION)
 
+    @property
+    def poster_url(self):
+        if not self.poster_s3_key:
+            return None
+
+        s3_service = S3Service(
+            settings.AWS_ACCESS_KEY_ID,
+            settings.AWS_SECRET_ACCESS_KEY,
+            settings.BUCKET_NAME,
+        )
+        return s3_service.get_pre_signed_fetch_url(self.poster_s3_key, settings.PRESIGNED_URL_EXPIRATION)
+
+
+class MediaVariant(UUIDModel, TimestampedModel, models.Model):
+    """A downscaled copy of an image `Media`, created by `create_media_variants` after the image is uploaded."""
+
+    media = models.ForeignKey(
+        to=Media,
+        on_delete=models.CASCADE,
+        verbose_name='media',
+        related_name='variants',
+        blank=False,
+    )
+    width = models.PositiveIntegerField('width in pixels')
+    height = models.PositiveIntegerField('height in pixels')
+    image_format = models.CharField('image format', max_length=4, choices=ImageFormat.choices, blank=False)
+    s3_key = models.CharField(max_length=100, blank=False, verbose_name='file path on s3')
+
+    class Meta:
+        constraints: ClassVar[list] = [
+            models.UniqueConstraint(fields=('media', 'width', 'image_format'), name='media_variant_unique'),
+        ]
+        indexes: ClassVar[list] = [models.Index(fields=('s3_key',), name='media_variant_s3_key_idx')]
+
+    def __str__(self):
+        return f'{self.media_id} - {self.width}px {self.image_format}'
+
 
 class Livestream(UUIDModel, TimestampedModel, models.Model):
     creator = models.ForeignKey(
@@ -79,14 +168,29 @@ class Livestream(UUIDModel, TimestampedModel, models.Model):
     duration = models.DurationField(
         verbose_name='livestream duration',
         validators=[
-            MinValueValidator(datetime.timedelta(minutes=15)),
-            MaxValueValidator(datetime.timedelta(minutes=120)),
+            MinValueValidator(MIN_LIVESTREAM_DURATION),
+            MaxValueValidator(MAX_LIVESTREAM_DURATION),
         ],
     )
+    # recorded from the presence data kept in redis once the livestream has ended.
+    peak_viewers = models.PositiveIntegerField(verbose_name='peak concurrent viewers', null=True, blank=True)
+    unique_viewers = models.PositiveIntegerField(verbose_name='unique viewers', null=True, blank=True)
+
+    class Meta:
+        indexes: ClassVar[list] = [
+            # discovery scans the window of streams that can be live or upcoming, filtering on creator in the index.
+            models.Index(fields=('start', 'creator'), name='livestream_start_creator_idx'),
+            # lets a creator's livestreams be paged through newest first without sorting all of them.
+            models.Index(fields=('creator', '-created_at'), name='livestream_creator_created_idx'),
+        ]
 
     def __str__(self):
         return f'Livestream: {self.title}'
 
+    @property
+    def end(self):
+        return self.start + self.duration
+
 
 class Comment(UUIDModel, TimestampedModel, models.Model):
     content = models.ForeignKey(
@@ -104,3 +208,57 @@ class Comment(UUIDModel, TimestampedModel, models.Model):
         related_name='my_comments',
     )
     message = models.CharField('message', max_length=200, blank=False)
+
+    class Meta:
+        indexes: ClassVar[list] = [
+            # comment previews and pages read a content's comments newest first straight from this index.
+            models.Index(fields=('content', '-created_at'), name='comment_content_created_idx'),
+        ]
+
+
+def with_comment_preview(contents: models.QuerySet[Content]) -> models.QuerySet[Content]:
+    """Fetch the newest `COMMENT_PREVIEW_SIZE` comments of every content in one windowed query, however many it has."""
+    preview = (
+        Comment.objects.select_related('author')
+        .annotate(
+            position=models.Window(
+                RowNumber(),
+                partition_by=models.F('content_id'),
+                order_by=models.F('created_at').desc(),
+            ),
+        )
+        .filter(position__lte=COMMENT_PREVIEW_SIZE)
+        .order_by('-created_at')
+    )
+    return contents.prefetch_related(models.Prefetch('comments', queryset=preview, to_attr='comment_preview'))
+
+
+def with_likes_total(contents: models.QuerySet[Content]) -> models.QuerySet[Content]:
+    """Annotate every content with the number of likes stored in the database, as `likes_total`."""
+    stored = (
+        Content.likes.through.objects.filter(content=models.OuterRef('pk'))
+        .order_by()
+        .values('content')
+        .annotate(total=models.Count('*'))
+        .values('total')
+    )
+    return contents.annotate(likes_total=Coalesce(models.Subquery(stored), 0))
+
+
+def unlocked_contents(contents: list[Content], viewer) -> set:
+    """The ids of the `contents` whose media `viewer` can see, checking the purchases of all of them in one query."""
+    locked = {
+        content.id
+        for content in contents
+        if content.content_type == ContentType.PAID and content.creator_id != viewer.id
+    }
+    unlocked = {content.id for content in contents} - locked
+    if locked:
+        unlocked.update(
+            Content.purchases.through.objects.filter(content_id__in=locked, creator_id=viewer.id).values_list(
+                'content_id',
+                flat=True,
+            ),
+        )
+
+    return unlocked
@@ -0,0 +1,83 @@
+"""Who is watching a livestream, tracked in redis from join and heartbeat requests.
+
+Each livestream has a sorted set of viewers scored by their last heartbeat, a HyperLogLog of every viewer that has
+joined and the peak size of the sorted set. Viewers whose heartbeat is older than `LIVESTREAM_PRESENCE_TIMEOUT`
+are pruned before the set is counted, so the live count is a `ZCARD`.
+"""
+import time
+import functools
+from datetime import timedelta
+
+from django.conf import settings
+
+from utils.redis import get_redis
+
+from .models import Livestream
+
+# keys outlive the livestream so that the stats are still there when they are flushed to the database.
+PRESENCE_RETENTION = timedelta(days=1)
+
+HEARTBEAT_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+redis.call('PFADD', KEYS[2], ARGV[2])
+local viewers = redis.call('ZCARD', KEYS[1])
+local peak = tonumber(redis.call('GET', KEYS[3]) or '0')
+if viewers > peak then
+    peak = viewers
+    redis.call('SET', KEYS[3], peak)
+end
+for _, key in ipairs(KEYS) do
+    redis.call('EXPIREAT', key, ARGV[4])
+end
+return {viewers, peak}
+"""
+
+
+@functools.cache
+def heartbeat_script():
+    return get_redis().register_script(HEARTBEAT_SCRIPT)
+
+
+def presence_keys(stream: Livestream) -> tuple[str, str, str]:
+    return (
+        f'livestream-presence:{stream.id}:viewers',
+        f'livestream-presence:{stream.id}:unique',
+        f'livestream-presence:{stream.id}:peak',
+    )
+
+
+def record_heartbeat(stream: Livestream, account: str) -> dict[str, int]:
+    """Mark `account` as watching `stream` and return the live and peak viewer counts."""
+    now = time.time()
+    viewers, peak = heartbeat_script()(
+        keys=presence_keys(stream),
+        args=(
+            now,
+            account,
+            now - settings.LIVESTREAM_PRESENCE_TIMEOUT,
+            int((stream.end + PRESENCE_RETENTION).timestamp()),
+        ),
+    )
+    return {'viewers': viewers, 'peak_viewers': peak}
+
+
+def presence_stats(stream: Livestream) -> dict[str, int]:
+    viewers_key, unique_key, peak_key = presence_keys(stream)
+    pipeline = get_redis().pipeline(transaction=False)
+    pipeline.zremrangebyscore(viewers_key, '-inf', time.time() - settings.LIVESTREAM_PRESENCE_TIMEOUT)
+    pipeline.zcard(viewers_key)
+    pipeline.pfcount(unique_key)
+    pipeline.get(peak_key)
+    _, viewers, unique_viewers, peak_viewers = pipeline.execute()
+    return {'viewers': viewers, 'unique_viewers': unique_viewers, 'peak_viewers': int(peak_viewers or 0)}
+
+
+def flush_presence(stream: Livestream):
+    """Record the final viewer stats of an ended `stream` in the database and drop them from redis."""
+    stats = presence_stats(stream)
+    Livestream.objects.filter(id=stream.id).update(
+        peak_viewers=stats['peak_viewers'],
+        unique_viewers=stats['unique_viewers'],
+    )
+    get_redis().delete(*presence_keys(stream))
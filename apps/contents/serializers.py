@@ -1,17 +1,22 @@
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import transaction
 from django.utils import timezone
+from django.db import models, transaction
 
 from rest_framework import serializers
 
 from apps.creators.serializers import MinimalCreatorSerializer
 
+from services.s3 import S3Service
+
 from utils.constants import ZERO, MINIMUM_ALLOWED_WITHDRAWAL_AMOUNT
 
+from . import likes
+from .uploads import missing_uploads
 from .choices import MediaType, ContentType
-from .models import Media, Comment, Content, Livestream
+from .variants import pick_key, requested_variant
+from .models import Media, Comment, Content, Livestream, unlocked_contents
 
 
 class PreSignedURLSerializer(serializers.Serializer):
@@ -29,10 +34,59 @@ class PreSignedURLListSerializer(serializers.Serializer):
         return value
 
 
+def sign_media(media: list[Media], request, unlocked: set | None = None) -> tuple[dict, dict]:
+    """The urls and poster urls of `media`, by id, signed with a single S3 client.
+
+    Only the media of `unlocked` contents get a url, which are looked up with one query when they are not given.
+    Images are served from the variant closest to the `image_width` and `image_format` the client asked for.
+    """
+    if unlocked is None:
+        unlocked = unlocked_contents([entry.content for entry in media], request.user)
+    width, image_format = requested_variant(request)
+    keys = {entry.id: pick_key(entry, width, image_format) for entry in media if entry.content_id in unlocked}
+    s3_service = S3Service(settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.BUCKET_NAME)
+    posters = {entry.id: entry.poster_s3_key for entry in media if entry.poster_s3_key}
+    urls = s3_service.get_pre_signed_fetch_urls(
+        {*keys.values(), *posters.values()},
+        settings.PRESIGNED_URL_EXPIRATION,
+    )
+    # the poster of a locked video is shown like the blurhash of a locked image, as a teaser.
+    return (
+        {entry.id: urls[keys[entry.id]] if entry.id in keys else None for entry in media},
+        {media_id: urls[key] for media_id, key in posters.items()},
+    )
+
+
+class MediaListSerializer(serializers.ListSerializer):
+    """Checks access to the media of a whole page with one query and signs their urls with a single S3 client.
+
+    Media nested in a page of contents use the urls `ContentListSerializer` signed for the whole page.
+    """
+
+    def to_representation(self, data):
+        media = list(data.all() if isinstance(data, models.Manager) else data)
+        signed = self.context.get('signed_media')
+        self.child.urls, self.child.posters = sign_media(media, self.context['request']) if signed is None else signed
+        try:
+            return super().to_representation(media)
+        finally:
+            del self.child.urls, self.child.posters
+
+
 class MediaSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    poster_url = serializers.SerializerMethodField()
+
+    def get_poster_url(self, obj):
+        if hasattr(self, 'posters'):
+            return self.posters.get(obj.id)
+
+        return obj.poster_url
 
     def get_url(self, obj):
+        if hasattr(self, 'urls'):
+            return self.urls[obj.id]
+
         if (
             obj.content.content_type == ContentType.FREE
             or self.context['request'].user == obj.content.creator
@@ -47,8 +101,29 @@ class MediaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Media
-        fields = ('s3_key', 'media_type', 'url', 'created_at', 'updated_at')
-        read_only_fields = ('url', 'blur_hash', 'created_at', 'updated_at')
+        list_serializer_class = MediaListSerializer
+        fields = (
+            's3_key',
+            'media_type',
+            'url',
+            'blur_hash',
+            'poster_url',
+            'duration',
+            'width',
+            'height',
+            'created_at',
+            'updated_at',
+        )
+        read_only_fields = (
+            'url',
+            'blur_hash',
+            'poster_url',
+            'duration',
+            'width',
+            'height',
+            'created_at',
+            'updated_at',
+        )
 
 
 class CreateContentSerializer(serializers.Serializer):
@@ -74,6 +149,14 @@ class CreateContentSerializer(serializers.Serializer):
                 )
             return content
 
+    def validate_media(self, value):
+        missing = missing_uploads(entry['s3_key'] for entry in value)
+        if missing:
+            files = ', '.join(sorted(missing))
+            raise serializers.ValidationError(f'Files not uploaded: {files}')
+
+        return value
+
     def validate(self, attrs):
         if attrs['content_type'] == ContentType.PAID and attrs['price'] < Decimal('1.00'):
             raise serializers.ValidationError('Content with paywall must have a price of at least $1.00')
@@ -107,15 +190,58 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'author', 'created_at', 'updated_at')
 
 
+class ContentListSerializer(serializers.ListSerializer):
+    """Reads the likes of a whole page, pending and stored, in one Redis round trip and one query.
+
+    The media of the page are checked and signed at once too, and handed down to `MediaListSerializer`.
+    """
+
+    def to_representation(self, data):
+        contents = list(data.all() if isinstance(data, models.Manager) else data)
+        request = self.context['request']
+        self.child.liked, self.child.like_counts = likes.like_states(contents, request.user)
+        # the media of the page are checked and signed at once, rather than those of each content on their own.
+        self.context['signed_media'] = sign_media(
+            [entry for content in contents for entry in content.media.all()],
+            request,
+            unlocked_contents(contents, request.user),
+        )
+        try:
+            return super().to_representation(contents)
+        finally:
+            del self.child.liked, self.child.like_counts, self.context['signed_media']
+
+
 class ContentSerializer(serializers.ModelSerializer):
     media = MediaSerializer(many=True)
     creator = MinimalCreatorSerializer()
-    comments = CommentSerializer(many=True)
+    comments = CommentSerializer(many=True, source='latest_comments', read_only=True)
     is_liked = serializers.SerializerMethodField()
+    likes_count = serializers.SerializerMethodField()
     is_purchased = serializers.SerializerMethodField()
 
+    # the likes of the page, set by `ContentListSerializer` while it is being serialized.
+    liked: set
+    like_counts: dict
+
+    def to_representation(self, instance):
+        if hasattr(self, 'liked'):
+            return super().to_representation(instance)
+
+        # a content serialized on its own, its likes are read as those of a page of one.
+        if not hasattr(instance, 'likes_total'):
+            instance.likes_total = instance.likes.count()
+        self.liked, self.like_counts = likes.like_states([instance], self.context['request'].user)
+        try:
+            return super().to_representation(instance)
+        finally:
+            del self.liked, self.like_counts
+
     def get_is_liked(self, obj):
-        return obj.likes.filter(id=self.context['request'].user.id).exists()
+        return obj.id in self.liked
+
+    def get_likes_count(self, obj):
+        return self.like_counts[obj.id]
 
     def get_is_purchased(self, obj):
         return (
@@ -141,6 +267,7 @@ class ContentSerializer(serializers.ModelSerializer):
             'content_type',
             'comments_count',
         )
+        list_serializer_class = ContentListSerializer
 
 
 class LiveStreamSerializer(serializers.ModelSerializer):
@@ -160,8 +287,12 @@ class LiveStreamSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Livestream
-        fields = ('id', 'creator', 'title', 'description', 'start', 'duration')
-        read_only_fields = ('id', 'creator')
+        fields = ('id', 'creator', 'title', 'description', 'start', 'duration', 'peak_viewers', 'unique_viewers')
+        read_only_fields = ('id', 'creator', 'peak_viewers', 'unique_viewers')
+
+
+class VerifyLivestreamTokenSerializer(serializers.Serializer):
+    token = serializers.CharField()
 
 
 class WithdrawalSerializer(serializers.Serializer):
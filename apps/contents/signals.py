@@ -1,17 +1,100 @@
+from django.utils import timezone
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, m2m_changed, post_delete
 
-from .models import Media
+from . import blobs, discover
 from .choices import MediaType
-from .tasks import fetch_blurhash_for_image
+from .models import Media, Comment, Content
+from .tasks import process_video, deduplicate_media, create_media_variants, fetch_blurhash_for_image
 
 
 @receiver(post_save, sender=Media)
 def get_blurhash(sender, instance, created, **kwargs):
-    if not created:
+    if not created or blobs.is_deduplicated(instance):
         return
 
     if instance.media_type != MediaType.IMAGE:
         return
 
     fetch_blurhash_for_image.schedule((instance.id,), delay=1)
+
+
+@receiver(post_save, sender=Media)
+def create_image_variants(sender, instance, created, **kwargs):
+    if created and not blobs.is_deduplicated(instance) and instance.media_type == MediaType.IMAGE:
+        create_media_variants.schedule((instance.id,), delay=1)
+
+
+@receiver(post_save, sender=Media)
+def read_video_metadata(sender, instance, created, **kwargs):
+    if created and instance.media_type == MediaType.VIDEO:
+        process_video.schedule((instance.id,), delay=1)
+
+
+@receiver(post_save, sender=Media)
+def deduplicate_upload(sender, instance, created, **kwargs):
+    # media are processed once deduplicated, and only when their file is not already stored.
+    if created and blobs.is_deduplicated(instance):
+        deduplicate_media.schedule((instance.id,), delay=1)
+
+
+@receiver(post_delete, sender=Media)
+def release_media_blob(sender, instance, **kwargs):
+    blobs.release_blob(instance)
+
+
+@receiver(post_save, sender=Content)
+def seed_discover_score(sender, instance, created, **kwargs):
+    if created:
+        discover.update_scores_on_commit(
+            discover.record_engagement,
+            instance,
+            discover.CREATED_WEIGHT,
+            occurred_at=instance.created_at,
+        )
+
+
+@receiver(post_delete, sender=Content)
+def forget_discover_score(sender, instance, **kwargs):
+    # taken now, as a deleted instance has no primary key anymore by the time the transaction commits.
+    key = discover.bucket_key(instance.content_type, discover.bucket_of(instance.created_at))
+    discover.update_scores_on_commit(discover.forget_content, key, discover.pool_member(instance))
+
+
+@receiver(post_save, sender=Comment)
+def score_comment(sender, instance, created, **kwargs):
+    if created:
+        discover.update_scores_on_commit(
+            discover.record_engagement,
+            instance.content,
+            discover.COMMENT_WEIGHT,
+            occurred_at=instance.created_at,
+        )
+
+
+@receiver(m2m_changed, sender=Content.likes.through)
+@receiver(m2m_changed, sender=Content.purchases.through)
+def score_likes_and_purchases(sender, instance, action, reverse, pk_set, **kwargs):
+    weight = discover.LIKE_WEIGHT if sender is Content.likes.through else discover.PURCHASE_WEIGHT
+    if action == 'pre_remove':
+        # removing a link that does not exist is a no-op, so only the links that do are retracted.
+        weight = -weight
+        if reverse:
+            links = sender.objects.filter(creator=instance, content_id__in=pk_set).values_list('content_id', flat=True)
+        else:
+            links = sender.objects.filter(content=instance, creator_id__in=pk_set).values_list('creator_id', flat=True)
+        pk_set = set(links)
+    elif action != 'post_add':
+        return
+
+    if not pk_set:
+        return
+
+    occurred_at = timezone.now()
+    if reverse:
+        for content in Content.objects.filter(pk__in=pk_set):
+            discover.update_scores_on_commit(discover.record_engagement, content, weight, occurred_at=occurred_at)
+    else:
+        discover.update_scores_on_commit(
+            discover.record_engagement, instance, weight * len(pk_set), occurred_at=occurred_at
+        )
@@ -6,9 +6,12 @@ from huey import crontab
 from huey.contrib.djhuey import db_task, lock_task, db_periodic_task
 
 from django.db import transaction
+from django.utils import timezone
+from django.db.models import F, DateTimeField, ExpressionWrapper
 
-from apps.contents.models import Media
 from apps.contents.choices import MediaType
+from apps.contents.models import Media, Livestream
+from apps.contents import blobs, likes, videos, uploads, discover, presence, variants
 
 
 @db_task()
@@ -21,6 +24,7 @@ def fetch_blurhash_for_image(media_id):
 
         media.blur_hash = blurhash.encode(image=BytesIO(response.content), x_components=6, y_components=4)
         media.save()
+        blobs.share_derivatives(media)
 
 
 @db_periodic_task(crontab(minute='*/10'))
@@ -28,3 +32,64 @@ def fetch_blurhash_for_image(media_id):
 def fetch_blurhash_for_images():
     for media in Media.objects.filter(blur_hash='').exclude(media_type=MediaType.VIDEO):
         fetch_blurhash_for_image.schedule((media.id,), delay=1)
+
+
+@db_task()
+def create_media_variants(media_id):
+    media = Media.objects.get(id=media_id)
+    variants.create_variants(media)
+    blobs.share_derivatives(media)
+
+
+@db_task()
+def process_video(media_id):
+    media = Media.objects.get(id=media_id)
+    videos.process_video(media)
+    blobs.share_derivatives(media)
+
+
+@db_task()
+def deduplicate_media(media_id):
+    media = Media.objects.get(id=media_id)
+    if blobs.deduplicate(media):
+        return
+
+    if media.media_type == MediaType.IMAGE:
+        fetch_blurhash_for_image(media.id)
+        create_media_variants(media.id)
+    else:
+        process_video(media.id)
+
+
+@db_periodic_task(crontab(minute='*'))
+@lock_task('flush-livestream-presence-lock')
+def flush_livestream_presence():
+    ended = Livestream.objects.alias(
+        end=ExpressionWrapper(F('start') + F('duration'), output_field=DateTimeField()),
+    ).filter(end__lte=timezone.now(), peak_viewers__isnull=True)
+    for stream in ended:
+        presence.flush_presence(stream)
+
+
+@db_periodic_task(crontab(minute='*'))
+@lock_task('rebuild-discover-pool-lock')
+def rebuild_discover_pool():
+    discover.rebuild_discover_pool()
+
+
+@db_periodic_task(crontab(minute='*'))
+@lock_task('flush-likes-lock')
+def flush_likes():
+    likes.flush_likes()
+
+
+@db_periodic_task(crontab(minute='15'))
+@lock_task('sweep-orphaned-uploads-lock')
+def sweep_orphaned_uploads():
+    uploads.sweep_orphaned_uploads()
+
+
+@db_periodic_task(crontab(minute='45'))
+@lock_task('collect-media-blobs-lock')
+def collect_media_blobs():
+    blobs.collect_blobs()
@@ -0,0 +1,120 @@
+import os
+import time
+import datetime
+from unittest.mock import patch
+
+from solders.keypair import Keypair
+
+from django.test import tag
+from django.db import connection
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+
+from apps.creators.models import Creator
+from apps.creators.test_helpers import SubscribersTestCase
+
+from utils.constants import COMMENT_PREVIEW_SIZE
+
+from .choices import ContentType
+from .models import Comment, Content
+from .views import CreateCommentAPIVIew
+
+
+class CommentsTestCase(SubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fan = Creator.objects.get(address=str(self.subscribers[0].pubkey()))
+        self.content = Content.objects.create(creator=self.creator, caption='viral', content_type=ContentType.FREE)
+
+    def add_comments(self, count):
+        now = timezone.now()
+        Comment.objects.bulk_create(
+            Comment(
+                content=self.content,
+                author=self.fan,
+                message=f'comment {i}',
+                created_at=now - datetime.timedelta(seconds=count - i),
+            )
+            for i in range(count)
+        )
+
+    def fetch_timeline(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path='/contents/timeline', headers=self.auth_header(self.subscribers[0]))
+        return response, len(queries)
+
+
+class CommentsTest(CommentsTestCase):
+    def test_feeds_carry_a_preview_of_the_latest_comments(self):
+        self.add_comments(5)
+        other = Content.objects.create(creator=self.creator, caption='quiet', content_type=ContentType.FREE)
+        Comment.objects.create(content=other, author=self.fan, message='only one')
+
+        response = self.client.get(path='/contents/timeline', headers=self.auth_header(self.subscribers[0]))
+        self.assertEqual(response.status_code, 200)
+        contents = {content['caption']: content for content in response.json()['results']}
+        self.assertEqual(
+            [comment['message'] for comment in contents['viral']['comments']],
+            [f'comment {i}' for i in (4, 3, 2)],
+        )
+        self.assertEqual(contents['viral']['comments_count'], 5)
+        self.assertEqual([comment['message'] for comment in contents['quiet']['comments']], ['only one'])
+
+    def test_comments_are_paged_newest_first(self):
+        self.add_comments(15)
+        path = f'/contents/{self.content.id}/comments'
+        response = self.client.get(path=path, headers=self.auth_header(self.subscribers[0]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(
+            [comment['message'] for comment in data['results']], [f'comment {i}' for i in range(14, 4, -1)]
+        )
+        self.assertEqual(data['results'][0]['author']['moniker'], self.fan.moniker)
+
+        # the content is looked up, and its access checked, once per page.
+        with patch.object(
+            CreateCommentAPIVIew, 'get_object', autospec=True, side_effect=CreateCommentAPIVIew.get_object
+        ) as lookup:
+            response = self.client.get(path=data['next'], headers=self.auth_header(self.subscribers[0]))
+        self.assertEqual(lookup.call_count, 1)
+        data = response.json()['data']
+        self.assertEqual(
+            [comment['message'] for comment in data['results']], [f'comment {i}' for i in range(4, -1, -1)]
+        )
+        self.assertIsNone(data['next'])
+
+        # the comments follow the same access rules as commenting.
+        stranger = Keypair()
+        self.create_creator('stranger.sol', stranger)
+        response = self.client.get(path=path, headers=self.auth_header(stranger))
+        self.assertEqual(response.status_code, 403)
+
+    def test_feed_payload_does_not_grow_with_the_comments(self):
+        self.add_comments(COMMENT_PREVIEW_SIZE)
+        response, queries = self.fetch_timeline()
+        size = len(response.content)
+
+        self.add_comments(10_000)
+        response, many_queries = self.fetch_timeline()
+
+        self.assertEqual(response.json()['results'][0]['comments_count'], 10_000 + COMMENT_PREVIEW_SIZE)
+        # only the count and the longer messages of the newest comments make the payload any bigger.
+        self.assertLess(len(response.content), size + 50)
+        self.assertEqual(many_queries, queries)
+
+
+@tag('benchmark')
+class CommentsBenchmark(CommentsTestCase):
+    comments = int(os.environ.get('BENCHMARK_ROWS', 10_000))
+
+    def test_feed_timing_does_not_grow_with_the_comments(self):
+        self.add_comments(self.comments)
+        self.fetch_timeline()
+
+        started_at = time.perf_counter()
+        response, _ = self.fetch_timeline()
+        elapsed = time.perf_counter() - started_at
+
+        print(f'\n{self.comments} comments: {elapsed * 1000:.1f}ms per timeline page')  # noqa: T201
+        self.assertEqual(response.json()['results'][0]['comments_count'], self.comments)
+        self.assertLess(elapsed, 0.5)
@@ -0,0 +1,146 @@
+import datetime
+from contextlib import suppress
+from unittest.mock import patch
+
+from solders.keypair import Keypair
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection, transaction
+
+from apps.creators.models import Creator
+from apps.creators.test_helpers import SubscribersTestCase
+
+from utils.redis import get_redis
+
+from .choices import ContentType
+from .models import Comment, Content
+from .tasks import rebuild_discover_pool
+from .discover import LIKE_WEIGHT, COMMENT_WEIGHT, bucket_of, bucket_key, rebuild_discover_scores
+
+
+class DiscoverFeedTest(SubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_discover_keys()
+        self.addCleanup(self.clear_discover_keys)
+        self.viewer = Keypair()
+        self.fans = Creator.objects.exclude(id=self.creator.id)
+
+    @staticmethod
+    def clear_discover_keys():
+        redis = get_redis()
+        for key in redis.scan_iter('discover:*'):
+            redis.delete(key)
+
+    def discover(self, path='/contents/discover'):
+        viewer = Creator.objects.filter(address=str(self.viewer.pubkey())).first() or self.create_creator(
+            'viewer.sol',
+            self.viewer,
+        )
+        rebuild_discover_pool.call_local()
+        return self.client.get(path=path, headers=self.auth_header(self.viewer)), viewer
+
+    def test_contents_are_ranked_by_engagement(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Content.objects.create(creator=self.creator, caption='quiet', content_type=ContentType.FREE)
+            liked, discussed = (
+                Content.objects.create(creator=self.creator, caption=caption, content_type=ContentType.FREE)
+                for caption in ('liked', 'discussed')
+            )
+            Content.objects.create(creator=self.creator, caption='paid', content_type=ContentType.PAID, price=5)
+            liked.likes.add(*self.fans[:2])
+            discussed.likes.add(self.fans[0])
+            Comment.objects.create(content=discussed, author=self.fans[0], message='First!')
+
+        response, viewer = self.discover()
+        self.assertEqual(response.status_code, 200)
+        captions = [content['caption'] for content in response.json()['data']['results']]
+        self.assertEqual(captions, ['discussed', 'liked', 'quiet'])
+
+        # the viewer's own contents are left out of its feed.
+        with self.captureOnCommitCallbacks(execute=True):
+            Content.objects.create(creator=viewer, caption='own', content_type=ContentType.FREE)
+        response, _ = self.discover()
+        self.assertNotIn('own', [content['caption'] for content in response.json()['data']['results']])
+
+    def test_retracted_engagement_is_unscored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            content = Content.objects.create(creator=self.creator, caption='liked', content_type=ContentType.FREE)
+        member = f'{content.id}:{self.creator.id}'
+        key = bucket_key(ContentType.FREE, bucket_of(content.created_at))
+        seeded = get_redis().zscore(key, member)
+
+        fan = Creator.objects.get(address=str(self.subscribers[0].pubkey()))
+        with self.captureOnCommitCallbacks(execute=True):
+            content.likes.add(fan)
+            comment = Comment.objects.create(content=content, author=fan, message='Nice')
+        self.assertGreater(get_redis().zscore(key, member), seeded + LIKE_WEIGHT + COMMENT_WEIGHT - 0.01)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            content.likes.remove(fan)
+            content.likes.remove(fan)  # not liked anymore, so nothing to retract
+            response = self.client.delete(
+                path=f'/contents/{content.id}/comments/{comment.id}',
+                headers=self.auth_header(self.subscribers[0]),
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertAlmostEqual(get_redis().zscore(key, member), seeded, places=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(content=content, author=fan, message='Again')
+            content.delete()
+        self.assertIsNone(get_redis().zscore(key, member))
+
+    def test_scores_follow_committed_writes_only(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, suppress(IntegrityError), transaction.atomic():
+            Content.objects.create(creator=self.creator, caption='rolled back', content_type=ContentType.FREE)
+            raise IntegrityError
+        self.assertEqual(callbacks, [])
+
+        # the discover feed is derived data, it does not fail the write it follows.
+        with (
+            patch('apps.contents.discover.get_redis', side_effect=RedisError),
+            patch('apps.contents.discover.logger') as logger,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            content = Content.objects.create(creator=self.creator, caption='kept', content_type=ContentType.FREE)
+        logger.exception.assert_called_once()
+        self.assertTrue(Content.objects.filter(id=content.id).exists())
+
+    def test_older_contents_rank_below_fresher_ones(self):
+        now = timezone.now()
+        for days, likers in ((0, 0), (3, 2), (settings.DISCOVER_HORIZON + 1, 2)):
+            content = Content.objects.create(creator=self.creator, caption=f'{days}', content_type=ContentType.FREE)
+            content.likes.add(*self.fans[:likers])
+            Content.objects.filter(id=content.id).update(created_at=now - datetime.timedelta(days=days))
+
+        self.assertEqual(rebuild_discover_scores(), 2)
+        response, _ = self.discover()
+        self.assertEqual([content['caption'] for content in response.json()['data']['results']], ['0', '3'])
+
+    def test_page_cost_does_not_grow_with_the_contents(self):
+        def page_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response, _ = self.discover()
+            self.assertEqual(len(response.json()['data']['results']), 10)
+            return len(queries)
+
+        Content.objects.bulk_create(
+            Content(creator=self.creator, caption=f'{i}', content_type=ContentType.FREE) for i in range(20)
+        )
+        self.assertEqual(rebuild_discover_scores(), 20)
+        self.discover()
+        first = page_queries()
+
+        Content.objects.bulk_create(
+            Content(creator=self.creator, caption=f'{i}', content_type=ContentType.FREE) for i in range(100)
+        )
+        rebuild_discover_scores()
+        self.assertEqual(page_queries(), first)
+
+        response, _ = self.discover()
+        response = self.client.get(path=response.json()['data']['next'], headers=self.auth_header(self.viewer))
+        self.assertEqual(len(response.json()['data']['results']), 10)
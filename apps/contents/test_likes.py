@@ -0,0 +1,144 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.creators.models import Creator
+from apps.creators.test_helpers import SubscribersTestCase
+
+from utils.redis import get_redis
+
+from . import likes
+from .likes import set_like
+from .tasks import flush_likes
+from .choices import ContentType
+from .serializers import ContentSerializer
+from .discover import bucket_of, bucket_key
+from .models import Content, with_likes_total
+
+
+class LikesTest(SubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_likes_keys()
+        self.addCleanup(self.clear_likes_keys)
+        self.fans = self.subscribers[:2]
+        self.content = Content.objects.create(creator=self.creator, caption='hot', content_type=ContentType.FREE)
+
+    @staticmethod
+    def clear_likes_keys():
+        redis = get_redis()
+        for key in redis.scan_iter('likes:*'):
+            redis.delete(key)
+
+    def toggle_like(self, keypair, method='post'):
+        path = f'/contents/{self.content.id}/likes'
+        response = getattr(self.client, method)(path=path, headers=self.auth_header(keypair))
+        self.assertEqual(response.status_code, 200)
+
+    def timeline(self, keypair):
+        response = self.client.get(path='/contents/timeline', headers=self.auth_header(keypair))
+        return response.json()['results'][0]
+
+    def test_likes_are_seen_before_they_are_flushed(self):
+        self.toggle_like(self.fans[0])
+        self.toggle_like(self.fans[0])
+        self.assertFalse(self.content.likes.exists())
+
+        content = self.timeline(self.fans[0])
+        self.assertTrue(content['is_liked'])
+        self.assertEqual(content['likes_count'], 1)
+        self.assertFalse(self.timeline(self.fans[1])['is_liked'])
+
+        flush_likes.call_local()
+        self.assertEqual(list(self.content.likes.values_list('address', flat=True)), [str(self.fans[0].pubkey())])
+        self.assertEqual(self.timeline(self.fans[0])['likes_count'], 1)
+        self.assertEqual(list(get_redis().scan_iter('likes:*')), [])
+
+    def test_toggles_collapse_to_the_last_state(self):
+        self.content.likes.add(Creator.objects.get(address=str(self.fans[1].pubkey())))
+        self.toggle_like(self.fans[1], 'delete')
+        self.toggle_like(self.fans[1])
+        self.toggle_like(self.fans[1], 'delete')
+        self.toggle_like(self.fans[0], 'delete')  # never liked, so there is nothing to unlike
+        self.assertEqual(self.timeline(self.fans[1])['likes_count'], 0)
+
+        flush_likes.call_local()
+        self.assertFalse(self.content.likes.exists())
+        self.assertFalse(self.timeline(self.fans[1])['is_liked'])
+
+    def test_likes_are_flushed_in_batches(self):
+        fans = list(Creator.objects.exclude(id=self.creator.id))
+        contents = Content.objects.bulk_create(
+            Content(creator=self.creator, caption=f'{i}', content_type=ContentType.FREE) for i in range(30)
+        )
+        for content in contents:
+            for fan in fans:
+                set_like(content, fan, liked=True)
+        set_like(contents[0], fans[0], liked=False)
+        contents[1].delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(likes.flush_likes(batch_size=10), 30)
+        self.assertLessEqual(len(queries), 3 * 8)
+        self.assertEqual(Content.likes.through.objects.count(), 28 * len(fans) + len(fans) - 1)
+
+    def test_repeated_likes_are_not_scored_again(self):
+        liker, unliker = (Creator.objects.get(address=str(keypair.pubkey())) for keypair in self.fans)
+        self.content.likes.add(liker)
+        key = bucket_key(ContentType.FREE, bucket_of(self.content.created_at))
+        member = f'{self.content.id}:{self.creator.id}'
+        get_redis().zadd(key, {member: 1})
+
+        # a like that is already stored, flushed along with an unlike that is not.
+        set_like(self.content, liker, liked=True)
+        set_like(self.content, unliker, liked=False)
+        flush_likes.call_local()
+
+        self.assertEqual(get_redis().zscore(key, member), 1)
+        self.assertEqual(list(self.content.likes.all()), [liker])
+
+    def test_like_state_of_a_page_is_read_at_once(self):
+        fan = Creator.objects.get(address=str(self.fans[1].pubkey()))
+        for content in Content.objects.bulk_create(
+            Content(creator=self.creator, caption=f'{i}', content_type=ContentType.FREE) for i in range(5)
+        ):
+            content.likes.add(fan)
+            set_like(content, fan, liked=False)
+        self.content.likes.add(fan)
+        self.toggle_like(self.fans[0])
+
+        contents = list(with_likes_total(Content.objects.all()))
+        with self.assertNumQueries(1):
+            liked, counts = likes.like_states(contents, fan)
+        self.assertEqual(liked, {self.content.id})
+        self.assertEqual(counts, {content.id: 2 if content == self.content else 0 for content in contents})
+
+        contents = self.client.get(path='/contents/timeline', headers=self.auth_header(self.fans[1])).json()['results']
+        self.assertEqual([content['likes_count'] for content in contents], [0] * 5 + [2])
+        self.assertEqual([content['is_liked'] for content in contents], [False] * 5 + [True])
+
+    def test_a_content_is_serialized_on_its_own(self):
+        self.toggle_like(self.fans[0])
+        request = Request(APIRequestFactory().get('/'))
+        request.user = Creator.objects.get(address=str(self.fans[0].pubkey()))
+
+        data = ContentSerializer(self.content, context={'request': request}).data
+        self.assertTrue(data['is_liked'])
+        self.assertEqual(data['likes_count'], 1)
+
+    def test_flushed_likes_are_scored_once_committed(self):
+        fan = Creator.objects.get(address=str(self.fans[0].pubkey()))
+        key = bucket_key(ContentType.FREE, bucket_of(self.content.created_at))
+        member = f'{self.content.id}:{self.creator.id}'
+        get_redis().zadd(key, {member: 1})
+
+        set_like(self.content, fan, liked=True)
+        with self.captureOnCommitCallbacks() as callbacks:
+            flush_likes.call_local()
+        self.assertEqual(get_redis().zscore(key, member), 1)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_redis().zscore(key, member), 1)
@@ -0,0 +1,562 @@
+import os
+import time
+import uuid
+import struct
+import datetime
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+
+from solders.keypair import Keypair
+
+from django.conf import settings
+from django.utils import timezone
+from django.test import TestCase, SimpleTestCase, tag
+
+from rest_framework.test import APIClient
+
+from apps.creators.models import Creator
+from apps.subscriptions.choices import SubscriptionType
+from apps.creators.test_helpers import SubscribersTestCase, auth_header, create_creator
+from apps.subscriptions.models import FreeSubscription, SubscriptionDetail, SubscriptionDetailStatus
+
+from services.agora.token_verifier import InvalidTokenError, verify_rtc_token
+from services.agora.token_builder import Role, RtcGrant, RtcTokenSigner, RtcTokenBuilder
+from services.agora.access_token import ServiceRtc, ServiceRtm, AccessToken, ServiceChat, ServiceEducation
+from services.agora.packer import (
+    pack_int16,
+    pack_string,
+    pack_uint16,
+    pack_uint32,
+    unpack_int16,
+    unpack_string,
+    unpack_uint16,
+    unpack_uint32,
+    pack_map_string,
+    pack_map_uint32,
+    unpack_map_string,
+    unpack_map_uint32,
+)
+
+from utils.redis import get_redis
+from utils.pagination import StartCursorPagination
+
+from .models import Livestream
+from .presence import presence_keys
+from .tasks import flush_livestream_presence
+from .tokens import privilege_expire, mint_livestream_token, verify_livestream_token
+
+APP_ID = '970ca35de60c44645bbae8a215061b33'
+APP_CERTIFICATE = '5cfd2fd1755d40ecb72977518be15d3b'
+
+
+def token_field(token, name):
+    """A field of an `AccessToken`, all of which are name-mangled."""
+    return getattr(token, f'_AccessToken__{name}')
+
+
+def build_access_token(privileges=(ServiceRtc.K_PRIVILEGE_JOIN_CHANNEL,)):
+    token = AccessToken(APP_ID, APP_CERTIFICATE, issue_ts=1_700_000_000, expire=600)
+    rtc = ServiceRtc('livestream-channel', 2882341273)
+    for privilege in privileges:
+        rtc.add_privilege(privilege, 3600)
+    token.add_service(rtc)
+    token.add_service(ServiceRtm('bonfida.sol'))
+    token.add_service(ServiceChat('bonfida.sol'))
+    token.add_service(ServiceEducation('room-uuid', 'user-uuid', role=-1))
+    return token, token.build()
+
+
+class AgoraAccessTokenTest(SimpleTestCase):
+    def test_from_string_round_trip(self):
+        original, encoded = build_access_token()
+
+        parsed = AccessToken()
+        self.assertTrue(parsed.from_string(encoded))
+        self.assertEqual(token_field(parsed, 'app_id'), APP_ID.encode())
+        for attribute in ('issue_ts', 'expire', 'salt'):
+            self.assertEqual(token_field(parsed, attribute), token_field(original, attribute))
+
+        original_services = token_field(original, 'service')
+        parsed_services = token_field(parsed, 'service')
+        self.assertEqual(parsed_services.keys(), original_services.keys())
+        for service_type, service in original_services.items():
+            self.assertEqual(parsed_services[service_type].pack(), service.pack())
+
+    def test_from_string_rejects_other_versions(self):
+        _, encoded = build_access_token()
+        self.assertFalse(AccessToken().from_string(f'006{encoded[3:]}'))
+
+    def test_unpack_helpers(self):
+        buffer = (
+            pack_uint16(7)
+            + pack_uint32(4_000_000_000)
+            + pack_int16(-2)
+            + pack_string('flicks')
+            + pack_map_uint32({1: 10, 2: 20})
+            + pack_map_string({3: 'three'})
+        )
+
+        value, buffer = unpack_uint16(buffer)
+        self.assertEqual(value, 7)
+        value, buffer = unpack_uint32(buffer)
+        self.assertEqual(value, 4_000_000_000)
+        value, buffer = unpack_int16(buffer)
+        self.assertEqual(value, -2)
+        value, buffer = unpack_string(buffer)
+        self.assertEqual(value, b'flicks')
+        value, buffer = unpack_map_uint32(buffer)
+        self.assertEqual(value, {1: 10, 2: 20})
+        value, buffer = unpack_map_string(buffer)
+        self.assertEqual(value, {3: b'three'})
+        self.assertEqual(bytes(buffer), b'')
+
+        rtc = ServiceRtc('channel', 1)
+        rtc.add_privilege(ServiceRtc.K_PRIVILEGE_JOIN_CHANNEL, 60)
+        parsed = ServiceRtc()
+        self.assertEqual(bytes(parsed.unpack(rtc.pack()[2:] + b'tail')), b'tail')
+        self.assertEqual(parsed.pack(), rtc.pack())
+
+    def test_truncated_buffer(self):
+        with self.assertRaises(struct.error):
+            unpack_string(pack_uint16(10) + b'short')
+
+
+class LivestreamSubscribersTestCase(SubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stream = Livestream.objects.create(
+            creator=self.creator,
+            title='Premiere',
+            description='Starting soon.',
+            start=timezone.now() + datetime.timedelta(minutes=5),
+            duration=datetime.timedelta(minutes=30),
+        )
+
+
+class LivestreamTokenTest(LivestreamSubscribersTestCase):
+    def test_signer_matches_access_token(self):
+        signer = RtcTokenSigner(APP_ID, APP_CERTIFICATE)
+        for role in (Role.PUBLISHER, Role.SUBSCRIBER):
+            token = signer.build(
+                'channel', RtcGrant('bonfida.sol', role, token_expire=600, privilege_expire=1_800_000_000)
+            )
+            parsed = AccessToken()
+            self.assertTrue(parsed.from_string(token))
+
+            expected = AccessToken(APP_ID, APP_CERTIFICATE, issue_ts=token_field(parsed, 'issue_ts'), expire=600)
+            vars(expected)['_AccessToken__salt'] = token_field(parsed, 'salt')
+            rtc = ServiceRtc('channel', 'bonfida.sol')
+            rtc.add_privilege(ServiceRtc.K_PRIVILEGE_JOIN_CHANNEL, 1_800_000_000)
+            if role == Role.PUBLISHER:
+                rtc.add_privilege(ServiceRtc.K_PRIVILEGE_PUBLISH_AUDIO_STREAM, 1_800_000_000)
+                rtc.add_privilege(ServiceRtc.K_PRIVILEGE_PUBLISH_VIDEO_STREAM, 1_800_000_000)
+                rtc.add_privilege(ServiceRtc.K_PRIVILEGE_PUBLISH_DATA_STREAM, 1_800_000_000)
+            expected.add_service(rtc)
+            self.assertEqual(token, expected.build())
+
+        invalid = RtcTokenSigner('invalid', APP_CERTIFICATE)
+        self.assertEqual(invalid.build('channel', RtcGrant(1, Role.SUBSCRIBER, 600)), '')
+
+    def test_join_signs_a_token(self):
+        response = self.client.get(
+            path=f'/contents/livestreams/{self.stream.id}/join', headers=self.auth_header(self.keypair)
+        )
+        self.assertEqual(response.status_code, 200)
+
+        claims = verify_livestream_token(self.stream, self.creator.address, response.json()['data']['token'])
+        self.assertAlmostEqual(claims.expires_at, privilege_expire(self.stream), delta=1)
+        self.assertTrue(claims.has_privilege(ServiceRtc.K_PRIVILEGE_PUBLISH_VIDEO_STREAM))
+
+    def test_verify_rtc_token(self):
+        token = RtcTokenSigner(APP_ID, APP_CERTIFICATE).build(
+            'channel', RtcGrant('bonfida.sol', Role.SUBSCRIBER, 600, 300)
+        )
+
+        claims = verify_rtc_token(token, APP_ID, APP_CERTIFICATE)
+        self.assertEqual((claims.channel_name, claims.account), ('channel', 'bonfida.sol'))
+        self.assertEqual(claims.expires_at, claims.issued_at + 600)
+        self.assertEqual(claims.privileges, {ServiceRtc.K_PRIVILEGE_JOIN_CHANNEL: claims.issued_at + 300})
+        self.assertFalse(claims.is_expired())
+        self.assertTrue(claims.has_privilege(ServiceRtc.K_PRIVILEGE_JOIN_CHANNEL))
+        self.assertFalse(claims.has_privilege(ServiceRtc.K_PRIVILEGE_JOIN_CHANNEL, now=claims.issued_at + 300))
+        self.assertFalse(claims.has_privilege(ServiceRtc.K_PRIVILEGE_PUBLISH_VIDEO_STREAM))
+
+        with self.assertRaisesMessage(InvalidTokenError, 'Token was not issued for this app.'):
+            verify_rtc_token(token, APP_ID, '0' * 32)
+        for malformed in ('006abc', '007not base64', f'{token[:40]}'):
+            with self.assertRaises(InvalidTokenError):
+                verify_rtc_token(malformed, APP_ID, APP_CERTIFICATE)
+
+        rtm_only = AccessToken(APP_ID, APP_CERTIFICATE)
+        rtm_only.add_service(ServiceRtm('bonfida.sol'))
+        with self.assertRaisesMessage(InvalidTokenError, 'Token carries no RTC privileges.'):
+            verify_rtc_token(rtm_only.build(), APP_ID, APP_CERTIFICATE)
+
+    def test_verify_token_endpoint(self):
+        token = self.client.get(
+            path=f'/contents/livestreams/{self.stream.id}/join', headers=self.auth_header(self.keypair)
+        ).json()['data']['token']
+
+        path = f'/contents/livestreams/{self.stream.id}/verify-token'
+        response = self.client.post(path=path, data={'token': token}, headers=self.auth_header(self.keypair))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['channel_name'], str(self.stream.id))
+        self.assertEqual(response.json()['data']['user_account'], self.creator.address)
+        self.assertTrue(response.json()['data']['can_publish'])
+
+        other_stream = Livestream.objects.create(
+            creator=self.creator,
+            title='Other',
+            description='Another stream.',
+            start=timezone.now(),
+            duration=datetime.timedelta(minutes=30),
+        )
+        response = self.client.post(
+            path=f'/contents/livestreams/{other_stream.id}/verify-token',
+            data={'token': token},
+            headers=self.auth_header(self.keypair),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Token is not for this livestream.')
+
+        self.stream.start = timezone.now() - datetime.timedelta(hours=1)
+        self.stream.save()
+        stale_token = mint_livestream_token(self.stream, self.creator.address, Role.PUBLISHER)
+        response = self.client.post(path=path, data={'token': stale_token}, headers=self.auth_header(self.keypair))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Token has expired.')
+
+
+class LivestreamPresenceTest(LivestreamSubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stream.start = timezone.now() - datetime.timedelta(minutes=1)
+        self.stream.save()
+        self.path = f'/contents/livestreams/{self.stream.id}/presence'
+
+    def test_heartbeats(self):
+        first, second, expired = self.subscribers
+        response = self.client.get(
+            path=f'/contents/livestreams/{self.stream.id}/join',
+            headers=self.auth_header(first),
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(path=self.path, headers=self.auth_header(second))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], {'viewers': 2, 'peak_viewers': 2})
+
+        response = self.client.post(path=self.path, headers=self.auth_header(expired))
+        self.assertEqual(response.status_code, 403)
+
+        # the first viewer stops sending heartbeats.
+        viewers_key = presence_keys(self.stream)[0]
+        get_redis().zadd(viewers_key, {str(first.pubkey()): time.time() - settings.LIVESTREAM_PRESENCE_TIMEOUT - 1})
+        response = self.client.post(path=self.path, headers=self.auth_header(second))
+        self.assertEqual(response.json()['data'], {'viewers': 1, 'peak_viewers': 2})
+
+        response = self.client.get(path=self.path, headers=self.auth_header(self.keypair))
+        self.assertEqual(response.json()['data'], {'viewers': 1, 'unique_viewers': 2, 'peak_viewers': 2})
+
+        # viewer counts are only shown to the creator and their subscribers.
+        response = self.client.get(path=self.path, headers=self.auth_header(second))
+        self.assertEqual(response.json()['data'], {'viewers': 1, 'unique_viewers': 2, 'peak_viewers': 2})
+        outsider = Keypair()
+        self.create_creator('outsider.sol', outsider)
+        for keypair in (expired, outsider):
+            response = self.client.get(path=self.path, headers=self.auth_header(keypair))
+            self.assertEqual(response.status_code, 403)
+
+    def test_stats_are_flushed_when_the_stream_ends(self):
+        self.client.post(path=self.path, headers=self.auth_header(self.subscribers[0]))
+        self.client.post(path=self.path, headers=self.auth_header(self.subscribers[1]))
+
+        flush_livestream_presence.call_local()
+        self.stream.refresh_from_db()
+        self.assertIsNone(self.stream.peak_viewers)
+
+        Livestream.objects.filter(id=self.stream.id).update(start=timezone.now() - datetime.timedelta(hours=1))
+        flush_livestream_presence.call_local()
+        self.stream.refresh_from_db()
+        self.assertEqual((self.stream.peak_viewers, self.stream.unique_viewers), (2, 2))
+        self.assertEqual(get_redis().exists(*presence_keys(self.stream)), 0)
+
+        response = self.client.post(path=self.path, headers=self.auth_header(self.subscribers[0]))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(path=self.path, headers=self.auth_header(self.keypair))
+        self.assertEqual(response.json()['data'], {'viewers': 0, 'unique_viewers': 2, 'peak_viewers': 2})
+
+
+class LivestreamDiscoveryTest(LivestreamSubscribersTestCase):
+    def test_discover_live_and_upcoming_livestreams(self):
+        now = timezone.now()
+        live = Livestream.objects.create(
+            creator=self.creator,
+            title='Live',
+            description='On air.',
+            start=now - datetime.timedelta(minutes=10),
+            duration=datetime.timedelta(minutes=30),
+        )
+        for start in (now - datetime.timedelta(hours=3), now + datetime.timedelta(days=3)):
+            Livestream.objects.create(
+                creator=self.creator,
+                title='Out of range',
+                description='Either over or too far away.',
+                start=start,
+                duration=datetime.timedelta(minutes=30),
+            )
+        Livestream.objects.create(
+            creator=self.create_creator('stranger.sol', Keypair()),
+            title='Not followed',
+            description='Someone else.',
+            start=now - datetime.timedelta(minutes=10),
+            duration=datetime.timedelta(minutes=30),
+        )
+
+        with self.assertNumQueries(2):  # authentication, then discovery
+            response = self.client.get(
+                path='/contents/livestreams/discover', headers=self.auth_header(self.subscribers[0])
+            )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['data']['results']
+        self.assertEqual([stream['id'] for stream in results['live']], [str(live.id)])
+        self.assertEqual([stream['id'] for stream in results['upcoming']], [str(self.stream.id)])
+
+        response = self.client.get(
+            path='/contents/livestreams/discover', headers=self.auth_header(self.subscribers[2])
+        )
+        self.assertEqual(response.json()['data']['results'], {'live': [], 'upcoming': []})
+
+    def test_discovery_is_paged_in_the_order_streams_start(self):
+        now = timezone.now()
+        for minutes in (-20, -10, 10):
+            Livestream.objects.create(
+                creator=self.creator,
+                title=f'Starts in {minutes} minutes',
+                description='One of many.',
+                start=now + datetime.timedelta(minutes=minutes),
+                duration=datetime.timedelta(minutes=30),
+            )
+
+        pages, path = [], '/contents/livestreams/discover'
+        with patch.object(StartCursorPagination, 'page_size', 2):
+            while path is not None:
+                response = self.client.get(path=path, headers=self.auth_header(self.subscribers[0]))
+                self.assertEqual(response.status_code, 200)
+                path = response.json()['data']['next']
+                pages.append(response.json()['data']['results'])
+
+        titles = [[stream['title'] for stream in page['live'] + page['upcoming']] for page in pages]
+        self.assertEqual(
+            titles,
+            [['Starts in -20 minutes', 'Starts in -10 minutes'], [self.stream.title, 'Starts in 10 minutes']],
+        )
+
+
+class LivestreamListTest(LivestreamSubscribersTestCase):
+    def test_livestreams_are_grouped_by_day(self):
+        now = timezone.now()
+        for i in range(14):
+            livestream = Livestream.objects.create(
+                creator=self.creator,
+                title=f'Livestream {i}',
+                description='Daily stream.',
+                start=now + datetime.timedelta(days=1),
+                duration=datetime.timedelta(minutes=30),
+            )
+            Livestream.objects.filter(id=livestream.id).update(created_at=now - datetime.timedelta(days=i // 5))
+
+        with self.assertNumQueries(2):  # authentication, then the page of livestreams with their creators
+            response = self.client.get(path='/contents/livestreams', headers=self.auth_header(self.keypair))
+        self.assertEqual(response.status_code, 200)
+
+        days = [(now - datetime.timedelta(days=i)).date().isoformat() for i in range(3)]
+        results = response.json()['results']
+        self.assertEqual(list(results.keys()), days[:2])
+        self.assertEqual([len(livestreams) for livestreams in results.values()], [6, 4])
+        self.assertEqual(results[days[0]][0]['creator']['moniker'], 'host.sol')
+
+        response = self.client.get(path=response.json()['next'], headers=self.auth_header(self.keypair))
+        self.assertEqual(list(response.json()['results'].keys()), days[1:])
+        self.assertEqual([len(livestreams) for livestreams in response.json()['results'].values()], [1, 4])
+
+
+@tag('benchmark')
+class LivestreamListBenchmark(TestCase):
+    livestreams = int(os.environ.get('BENCHMARK_ROWS', 10_000))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.keypair = Keypair()
+        cls.creator = create_creator('prolific.sol', cls.keypair)
+        Livestream.objects.bulk_create(
+            Livestream(
+                creator=cls.creator,
+                title=f'Livestream {i}',
+                description='Benchmark',
+                start=timezone.now() + datetime.timedelta(days=1),
+                duration=datetime.timedelta(minutes=60),
+            )
+            for i in range(cls.livestreams)
+        )
+
+    def test_page_timing(self):
+        client = APIClient()
+        # authentication is left out so that the timings only cover fetching, serializing and grouping a page.
+        client.force_authenticate(user=self.creator)
+        with self.assertNumQueries(1):
+            client.get(path='/contents/livestreams')
+
+        path, pages, timings, max_pages = '/contents/livestreams', 0, [], 500
+        while path and pages < max_pages:
+            started_at = time.perf_counter()
+            response = client.get(path=path)
+            timings.append(time.perf_counter() - started_at)
+            path, pages = response.json()['next'], pages + 1
+
+        timings.sort()
+        print(  # noqa: T201
+            f'\n{pages} pages: median {timings[len(timings) // 2] * 1000:.2f}ms, '
+            f'p95 {timings[int(len(timings) * 0.95)] * 1000:.2f}ms per page',
+        )
+        self.assertLess(timings[len(timings) // 2], 0.05)
+
+
+@tag('benchmark')
+class LivestreamDiscoveryBenchmark(TestCase):
+    livestreams = int(os.environ.get('BENCHMARK_ROWS', 100_000))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.keypair = Keypair()
+        creators = Creator.objects.bulk_create(
+            Creator(
+                moniker=f'creator-{i}.sol',
+                address=f'creator-{i}',
+                image_url='https://google.com',
+                banner_url='https://google.com',
+                subscription_type=SubscriptionType.FREE,
+            )
+            for i in range(1_000)
+        )
+        viewer = create_creator('viewer.sol', cls.keypair)
+        free_subscription = FreeSubscription.objects.create(creator=viewer, status='active')
+        SubscriptionDetail.objects.bulk_create(
+            SubscriptionDetail(
+                creator=creator,
+                subscriber=viewer,
+                subscription_object=free_subscription,
+                status=SubscriptionDetailStatus.ACTIVE,
+                expires_at=timezone.now() + datetime.timedelta(days=30),
+            )
+            for creator in creators[:100]
+        )
+
+        # streams are scheduled every few minutes over two months around now.
+        now = timezone.now()
+        spacing = datetime.timedelta(days=60) / cls.livestreams
+        for offset in range(0, cls.livestreams, 10_000):
+            Livestream.objects.bulk_create(
+                Livestream(
+                    creator=creators[i % len(creators)],
+                    title=f'Livestream {i}',
+                    description='Benchmark',
+                    start=now - datetime.timedelta(days=30) + i * spacing,
+                    duration=datetime.timedelta(minutes=60),
+                )
+                for i in range(offset, min(offset + 10_000, cls.livestreams))
+            )
+
+    def test_discovery_cost_is_bounded(self):
+        headers = auth_header(self.keypair)
+
+        rounds = 50
+        started_at = time.perf_counter()
+        for _ in range(rounds):
+            response = self.client.get(path='/contents/livestreams/discover', headers=headers)
+        elapsed = (time.perf_counter() - started_at) / rounds
+
+        data = response.json()['data']['results']
+        live, upcoming = len(data['live']), len(data['upcoming'])
+        print(  # noqa: T201
+            f'\n{self.livestreams} livestreams: {live} live and {upcoming} upcoming '
+            f'in {elapsed * 1000:.1f}ms per request',
+        )
+        self.assertTrue(data['live'])
+        self.assertLess(elapsed, 0.25)
+
+
+@tag('benchmark')
+class LivestreamJoinBenchmark(TestCase):
+    subscribers = int(os.environ.get('BENCHMARK_ROWS', 2_000))
+
+    def test_join_storm(self):
+        stream = Livestream(
+            id=uuid.uuid4(),
+            title='Join storm',
+            start=timezone.now(),
+            duration=datetime.timedelta(minutes=60),
+        )
+        expire = privilege_expire(stream)
+        # every subscriber joins a few times, as clients reconnect while the stream is starting.
+        joins = [str(Keypair().pubkey()) for _ in range(self.subscribers)] * 5
+
+        def uncached(account):
+            return RtcTokenBuilder.build_token_with_user_account(
+                APP_ID, APP_CERTIFICATE, str(stream.id), account, Role.SUBSCRIBER, expire, expire
+            )
+
+        def signed(account):
+            return mint_livestream_token(stream, account, Role.SUBSCRIBER)
+
+        timings = {}
+        for join in (uncached, signed):
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                started_at = time.perf_counter()
+                tokens = list(executor.map(join, joins))
+                timings[join.__name__] = time.perf_counter() - started_at
+            self.assertTrue(all(tokens))
+            print(  # noqa: T201
+                f'\n{join.__name__}: {len(joins)} joins in {timings[join.__name__]:.2f}s '
+                f'({len(joins) / timings[join.__name__]:,.0f} joins/s)',
+            )
+
+        self.assertLess(timings['signed'], timings['uncached'])
+
+
+@tag('benchmark')
+class AgoraTokenVerificationBenchmark(SimpleTestCase):
+    def test_verify_throughput(self):
+        signer = RtcTokenSigner(APP_ID, APP_CERTIFICATE)
+        grants = [RtcGrant(f'subscriber-{i}', Role.SUBSCRIBER, 3600, 3600) for i in range(1_000)]
+        tokens = [signer.build('channel', grant) for grant in grants]
+        rounds = int(os.environ.get('BENCHMARK_ROWS', 100_000)) // len(tokens)
+
+        started_at = time.perf_counter()
+        for _ in range(rounds):
+            for token in tokens:
+                verify_rtc_token(token, APP_ID, APP_CERTIFICATE)
+        elapsed = time.perf_counter() - started_at
+
+        verifications = rounds * len(tokens)
+        print(f'\n{verifications} verifications in {elapsed:.2f}s ({verifications / elapsed:,.0f} verify ops/s)')  # noqa: T201
+        self.assertGreater(verifications / elapsed, 5_000)
+
+
+@tag('benchmark')
+class AgoraAccessTokenBenchmark(SimpleTestCase):
+    def test_from_string_scales_linearly(self):
+        timings = {}
+        for privileges in (2_000, 32_000):
+            _, encoded = build_access_token(range(privileges))
+            rounds = 20
+            started_at = time.perf_counter()
+            for _ in range(rounds):
+                AccessToken().from_string(encoded)
+            timings[privileges] = (time.perf_counter() - started_at) / rounds
+            print(  # noqa: T201
+                f'\n{privileges} privileges ({len(encoded)} byte token): {timings[privileges] * 1000:.2f}ms per parse',
+            )
+
+        # a 16x larger token should take roughly 16x longer to parse, nowhere near the 256x of quadratic copying.
+        self.assertLess(timings[32_000] / timings[2_000], 40)
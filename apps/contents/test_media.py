@@ -0,0 +1,296 @@
+import shutil
+import struct
+import datetime
+import tempfile
+import subprocess
+from io import BytesIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+import boto3
+from PIL import Image
+
+from django.conf import settings
+
+from apps.creators.models import Creator
+from apps.creators.test_helpers import SubscribersTestCase
+
+from services.s3 import S3Service, shared_client
+
+from utils import videos
+from utils.mock import LocalS3Client
+
+from .choices import MediaType, ContentType
+from .models import Media, Content, unlocked_contents
+from .tasks import process_video, create_media_variants
+
+
+class MediaGalleryTest(SubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fan = Creator.objects.get(address=str(self.subscribers[0].pubkey()))
+
+    def add_contents(self, count, content_type=ContentType.FREE):
+        contents = Content.objects.bulk_create(
+            Content(creator=self.creator, caption=f'{i}', content_type=content_type, price=0 if i % 2 else 5)
+            for i in range(count)
+        )
+        Media.objects.bulk_create(
+            Media(content=content, s3_key=f'images/{content.id}-{i}.png', media_type=MediaType.IMAGE)
+            for content in contents
+            for i in range(2)
+        )
+        return contents
+
+    def gallery(self, keypair):
+        shared_client.cache_clear()
+        self.addCleanup(shared_client.cache_clear)
+        with patch('services.s3.boto3.client', wraps=boto3.client) as client:
+            response = self.client.get(
+                path=f'/contents/media/{self.creator.address}', headers=self.auth_header(keypair)
+            )
+        self.assertEqual(client.call_count, 1)
+        return response.json()['data']['results']
+
+    def test_only_unlocked_media_are_signed(self):
+        free, paid, purchased = (
+            Content.objects.create(creator=self.creator, caption=caption, content_type=content_type, price=price)
+            for caption, content_type, price in (('free', 'free', 0), ('paid', 'paid', 5), ('bought', 'paid', 5))
+        )
+        purchased.purchases.add(self.fan)
+        for content in (free, paid, purchased):
+            Media.objects.bulk_create([Media(content=content, s3_key=f'{content.caption}.png', media_type='image')])
+
+        urls = {media['s3_key']: media['url'] for media in self.gallery(self.subscribers[0])}
+        self.assertIsNone(urls.pop('paid.png'))
+        self.assertTrue(all('Signature' in url for url in urls.values()))
+        self.assertEqual(set(urls), {'free.png', 'bought.png'})
+
+        # a creator sees all of their own media.
+        self.assertTrue(all(media['url'] for media in self.gallery(self.keypair)))
+
+    def test_page_queries_do_not_grow_with_the_media(self):
+        contents = self.add_contents(2, ContentType.PAID)
+        contents[0].purchases.add(self.fan)
+        # authentication, the page of media with their contents, their variants and the purchases of the paid ones.
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.gallery(self.subscribers[0])), 4)
+
+        self.add_contents(30, ContentType.PAID)
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.gallery(self.subscribers[0])), 10)
+
+    def test_the_media_of_a_content_page_are_signed_at_once(self):
+        contents = self.add_contents(3, ContentType.PAID)
+        contents[0].purchases.add(self.fan)
+        shared_client.cache_clear()
+        self.addCleanup(shared_client.cache_clear)
+        fetch_urls = S3Service.get_pre_signed_fetch_urls
+        with (
+            patch('apps.contents.serializers.unlocked_contents', wraps=unlocked_contents) as unlocked,
+            patch.object(S3Service, 'get_pre_signed_fetch_urls', autospec=True, side_effect=fetch_urls) as sign,
+        ):
+            response = self.client.get(path='/contents/timeline', headers=self.auth_header(self.subscribers[0]))
+
+        self.assertEqual((unlocked.call_count, sign.call_count), (1, 1))
+        urls = {
+            content['caption']: [media['url'] for media in content['media']] for content in response.json()['results']
+        }
+        self.assertTrue(all('Signature' in url for url in urls.pop('0')))
+        self.assertEqual(urls, {'1': [None, None], '2': [None, None]})
+
+
+def fixture_image(width, height, mode='RGB', image_format='PNG'):
+    """A gradient image, which unlike a flat one shows resampling and encoding artifacts."""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = gradient.convert(mode)
+    if 'A' in mode:
+        image.putalpha(gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM))
+    buffer = BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class LocalS3TestCase(SubscribersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.s3 = LocalS3Client()
+        s3_client = patch('services.s3.boto3.client', return_value=self.s3)
+        s3_client.start()
+        self.addCleanup(s3_client.stop)
+        shared_client.cache_clear()
+        self.addCleanup(shared_client.cache_clear)
+        self.content = Content.objects.create(creator=self.creator, caption='photos', content_type=ContentType.FREE)
+
+    def upload(self, s3_key, data, media_type=MediaType.IMAGE):
+        self.s3.put_object(Bucket=settings.BUCKET_NAME, Key=s3_key, Body=data)
+        # bulk created so that the signals do not schedule the tasks, which are run explicitly instead.
+        return Media.objects.bulk_create([Media(content=self.content, s3_key=s3_key, media_type=media_type)])[0]
+
+    def stored_image(self, s3_key):
+        stored = self.s3.objects[(settings.BUCKET_NAME, s3_key)]
+        with Image.open(BytesIO(stored['Body'])) as image:
+            return image.format, image.mode, image.size, stored['ContentType']
+
+
+class MediaVariantsTest(LocalS3TestCase):
+    def test_variants_are_created_for_uploaded_images(self):
+        media = self.upload('images/landscape.png', fixture_image(1600, 1200))
+        create_media_variants.call_local(media.id)
+
+        variants = {(variant.width, variant.image_format): variant for variant in media.variants.all()}
+        self.assertEqual(set(variants), {(width, fmt) for width in (320, 640, 1080) for fmt in ('webp', 'jpeg')})
+        self.assertEqual(self.stored_image(variants[320, 'webp'].s3_key), ('WEBP', 'RGB', (320, 240), 'image/webp'))
+        self.assertEqual(self.stored_image(variants[1080, 'jpeg'].s3_key), ('JPEG', 'RGB', (1080, 810), 'image/jpeg'))
+        self.assertEqual(variants[640, 'jpeg'].height, 480)
+
+        # running the task again, as a retry would, leaves the variants as they are.
+        create_media_variants.call_local(media.id)
+        self.assertEqual(media.variants.count(), 6)
+
+    def test_small_images_are_not_upscaled(self):
+        media = self.upload('images/icon.png', fixture_image(200, 150, mode='RGBA'))
+        create_media_variants.call_local(media.id)
+
+        variants = {variant.image_format: variant for variant in media.variants.all()}
+        self.assertEqual({(variant.width, variant.height) for variant in variants.values()}, {(200, 150)})
+        self.assertEqual(self.stored_image(variants['webp'].s3_key)[:3], ('WEBP', 'RGBA', (200, 150)))
+        self.assertEqual(self.stored_image(variants['jpeg'].s3_key)[:3], ('JPEG', 'RGB', (200, 150)))
+
+    def test_gallery_serves_the_variant_closest_to_the_requested_width(self):
+        media = self.upload('images/landscape.png', fixture_image(1600, 1200))
+        create_media_variants.call_local(media.id)
+        self.upload('videos/clip.mov', b'not decoded', media_type=MediaType.VIDEO)
+        self.upload('images/pending.png', fixture_image(100, 100))
+
+        def urls(query=''):
+            path = f'/contents/media/{self.creator.address}{query}'
+            response = self.client.get(path=path, headers=self.auth_header(self.keypair))
+            return {entry['s3_key']: entry['url'].split('?')[0] for entry in response.json()['data']['results']}
+
+        prefix = f'https://s3.local/{settings.BUCKET_NAME}/'
+        self.assertEqual(urls()['images/landscape.png'], f'{prefix}variants/{media.id}/1080.webp')
+        self.assertEqual(
+            urls('?image_width=500&image_format=jpeg')['images/landscape.png'],
+            f'{prefix}variants/{media.id}/640.jpeg',
+        )
+        served = urls('?image_width=4000')
+        self.assertEqual(served['images/landscape.png'], f'{prefix}variants/{media.id}/1080.webp')
+        self.assertEqual(served['videos/clip.mov'], f'{prefix}videos/clip.mov')
+        self.assertEqual(served['images/pending.png'], f'{prefix}images/pending.png')
+
+
+def box(box_type, *children):
+    payload = b''.join(children)
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def video_track(handler, codec, width, height, duration, *, rotated=False):
+    matrix = (
+        (0, 1 << 16, 0, -(1 << 16), 0, 0, 0, 0, 1 << 30) if rotated else (1 << 16, 0, 0, 0, 1 << 16, 0, 0, 0, 1 << 30)
+    )
+    tkhd = box(
+        b'tkhd',
+        bytes(4),
+        struct.pack('>5I', 0, 0, 1, 0, duration),
+        bytes(16),
+        struct.pack('>9i', *matrix),
+        struct.pack('>II', width << 16, height << 16),
+    )
+    hdlr = box(b'hdlr', bytes(8), handler, bytes(12), b'Handler\x00')
+    stsd = box(b'stsd', bytes(4), struct.pack('>I', 1), struct.pack('>I4s', 16, codec), bytes(8))
+    return box(b'trak', tkhd, box(b'mdia', hdlr, box(b'minf', box(b'stbl', stsd))))
+
+
+def sample_video(*, codec=b'avc1', width=1920, height=1080, seconds=12.5, rotated=False, moov_first=False):
+    """An MP4 container with an audio and a video track around 5MB of media data that is never decoded."""
+    timescale = 600
+    duration = int(seconds * timescale)
+    moov = box(
+        b'moov',
+        box(b'mvhd', bytes(4), struct.pack('>4I', 0, 0, timescale, duration), bytes(80)),
+        video_track(b'soun', b'mp4a', 0, 0, duration),
+        video_track(b'vide', codec, width, height, duration, rotated=rotated),
+    )
+    media = bytes(5_000_000)
+    # a 64-bit size, as recordings over 4GB have.
+    mdat = struct.pack('>I4sQ', 1, b'mdat', 16 + len(media)) + media
+    ftyp = box(b'ftyp', b'isom', bytes(4), b'isomavc1')
+    return ftyp + moov + mdat if moov_first else ftyp + mdat + moov
+
+
+class MediaVideoTest(LocalS3TestCase):
+    def process(self, s3_key, data):
+        media = self.upload(s3_key, data, media_type=MediaType.VIDEO)
+        self.s3.reads.clear()
+        process_video.call_local(media.id)
+        media.refresh_from_db()
+        return media, sum(end - start for key, start, end in self.s3.reads if key == s3_key)
+
+    def test_metadata_is_read_from_the_header_alone(self):
+        media, downloaded = self.process('videos/clip.mp4', sample_video())
+        self.assertEqual(media.duration, datetime.timedelta(seconds=12.5))
+        self.assertEqual((media.width, media.height, media.codec), (1920, 1080, 'avc1'))
+        self.assertLess(downloaded, 100_000)
+
+        response = self.client.get(
+            path=f'/contents/media/{self.creator.address}', headers=self.auth_header(self.keypair)
+        )
+        entry = response.json()['data']['results'][0]
+        self.assertEqual((entry['duration'], entry['width'], entry['height']), ('00:00:12.500000', 1920, 1080))
+
+    def test_streaming_optimized_videos_are_read_in_one_request(self):
+        media, _ = self.process('videos/portrait.mov', sample_video(codec=b'hvc1', rotated=True, moov_first=True))
+        self.assertEqual((media.width, media.height, media.codec), (1080, 1920, 'hvc1'))
+        self.assertEqual(len(self.s3.reads), 1)
+
+    def test_other_containers_are_left_without_metadata(self):
+        media, downloaded = self.process('videos/clip.webm', bytes.fromhex('1a45dfa3') + bytes(1_000_000))
+        self.assertIsNone(media.duration)
+        self.assertEqual(media.codec, '')
+        self.assertLess(downloaded, 100_000)
+
+    def test_truncated_headers_are_left_without_metadata(self):
+        truncated = box(b'ftyp', b'isom', bytes(4), b'isomavc1') + box(b'moov', box(b'mvhd', bytes(4)))
+        media, _ = self.process('videos/truncated.mp4', truncated)
+        self.assertIsNone(media.duration)
+
+    def test_metadata_is_kept_when_the_poster_fails(self):
+        failure = subprocess.TimeoutExpired('ffmpeg', videos.POSTER_TIMEOUT)
+        with (
+            patch('utils.videos.extract_poster', side_effect=failure),
+            patch('apps.contents.videos.logger') as logger,
+        ):
+            media, _ = self.process('videos/clip.mp4', sample_video())
+        logger.warning.assert_called_once()
+        self.assertEqual(media.duration, datetime.timedelta(seconds=12.5))
+        self.assertEqual(media.poster_s3_key, '')
+
+    @skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+    def test_poster_is_extracted_from_a_real_video(self):
+        ffmpeg = shutil.which('ffmpeg')
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'sample.mp4'
+            command = (
+                ffmpeg,
+                '-loglevel',
+                'error',
+                '-f',
+                'lavfi',
+                '-i',
+                'testsrc=duration=3:size=320x240:rate=10',
+                path,
+            )
+            subprocess.run(command, check=True)  # noqa: S603
+            data = path.read_bytes()
+
+            def fetch(start, end):
+                stop = end + 1
+                return data[start:stop]
+
+            info = videos.read_video_info(videos.RangedFile(fetch, len(data)))
+            self.assertEqual((info.width, info.height, round(info.duration)), (320, 240, 3))
+
+            with Image.open(BytesIO(videos.extract_poster(str(path), 1.0))) as poster:
+                self.assertEqual((poster.format, poster.size), ('JPEG', (320, 240)))
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import hashlib
+import datetime
+from unittest.mock import MagicMock, patch
+
+import boto3
+
+from django.conf import settings
+from django.test import SimpleTestCase, tag
+
+from services.s3 import S3Service, upload_conditions
+
+from . import blobs
+from .choices import MediaType
+from .uploads import sweep_orphaned_uploads
+from .models import Media, MediaBlob, MediaVariant
+from .test_media import LocalS3TestCase, fixture_image
+from .tasks import deduplicate_media, create_media_variants, fetch_blurhash_for_image
+
+
+class UploadsTest(LocalS3TestCase):
+    def create_content(self, *s3_keys):
+        data = {
+            'caption': 'Uploaded',
+            'content_type': 'free',
+            'media': [{'media_type': 'image', 's3_key': s3_key} for s3_key in s3_keys],
+        }
+        return self.client.post(
+            path='/contents/',
+            data=json.dumps(data),
+            headers=self.auth_header(self.keypair),
+            content_type='application/json',
+        )
+
+    def test_content_is_only_created_from_uploaded_files(self):
+        keys = [f'images/{self.creator.address}/{i}.png' for i in range(3)]
+        for key in keys[:2]:
+            self.s3.put_object(Bucket=settings.BUCKET_NAME, Key=key, Body=b'image')
+
+        response = self.create_content(*keys)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'media': [f'Files not uploaded: {keys[2]}']})
+        self.assertEqual(sorted(self.s3.heads), keys)
+
+        self.s3.put_object(Bucket=settings.BUCKET_NAME, Key=keys[2], Body=b'image')
+        self.assertEqual(self.create_content(*keys).status_code, 201)
+        self.assertEqual(Media.objects.filter(s3_key__in=keys).count(), 3)
+
+    def test_orphaned_uploads_are_swept(self):
+        def store(s3_key, age):
+            self.s3.put_object(Bucket=settings.BUCKET_NAME, Key=s3_key, Body=b'file')
+            self.s3.objects[settings.BUCKET_NAME, s3_key]['LastModified'] -= age
+
+        old, fresh = datetime.timedelta(hours=settings.ORPHANED_UPLOAD_AGE + 1), datetime.timedelta(minutes=5)
+        media = self.upload('images/kept.png', b'image')
+        Media.objects.filter(id=media.id).update(poster_s3_key='posters/kept.jpg')
+        MediaVariant.objects.create(
+            media=media, width=320, height=240, image_format='webp', s3_key='variants/kept.webp'
+        )
+        for s3_key in ('images/kept.png', 'posters/kept.jpg', 'variants/kept.webp'):
+            store(s3_key, old)
+        store('images/just-uploaded.png', fresh)
+        store('variants/deleted.webp', old)
+        store('posters/deleted.jpg', old)
+        for i in range(2500):
+            store(f'videos/abandoned-{i:04}.mov', old)
+
+        self.assertEqual(sweep_orphaned_uploads(), 2502)
+        self.assertEqual(
+            sorted(key for _, key in self.s3.objects),
+            ['images/just-uploaded.png', 'images/kept.png', 'posters/kept.jpg', 'variants/kept.webp'],
+        )
+        # the abandoned videos were listed and deleted a thousand at a time.
+        self.assertEqual(sorted(len(keys) for keys in self.s3.deletions), [1, 1, 500, 1000, 1000])
+
+    def test_upload_urls_are_signed_by_a_shared_client(self):
+        files = [{'file_name': f'photo-{i}.jpg', 'file_type': 'image'} for i in range(3)]
+        files += [{'file_name': f'clip-{i}.mp4', 'file_type': 'video'} for i in range(2)]
+        with patch('services.s3.boto3.client', return_value=self.s3) as client:
+            responses = [
+                self.client.post(
+                    path='/contents/get-upload-urls',
+                    data=json.dumps({'files': files}),
+                    headers=self.auth_header(self.keypair),
+                    content_type='application/json',
+                )
+                for _ in range(2)
+            ]
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            posts = response.json()['data']
+            self.assertEqual(
+                {file_name: post['fields']['key'] for file_name, post in posts.items()},
+                {
+                    file['file_name']: f"{file['file_type']}s/{self.creator.address}/{file['file_name']}"
+                    for file in files
+                },
+            )
+            self.assertEqual(len({post['fields']['policy'] for post in posts.values()}), len(files))
+
+        # the client is created once and reused by later requests, botocore signing every file.
+        self.assertEqual(client.call_count, 1)
+        self.assertEqual(self.s3.presigned_posts, 2 * len(files))
+
+
+class MediaBlobsTest(LocalS3TestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = fixture_image(800, 600)
+        # blurhashes are computed from the image downloaded through its presigned url.
+        download = patch('apps.contents.tasks.requests.get', return_value=MagicMock(ok=True, content=self.image))
+        download.start()
+        self.addCleanup(download.stop)
+
+    def stored_keys(self, prefix):
+        return {key for _, key in self.s3.objects if key.startswith(prefix)}
+
+    @staticmethod
+    def blob_key(data):
+        return f'blobs/{hashlib.sha256(data).hexdigest()}'
+
+    def test_identical_uploads_are_stored_and_processed_once(self):
+        first = self.upload('images/first/beach.png', self.image)
+        deduplicate_media.call_local(first.id)
+        first.refresh_from_db()
+        self.assertEqual((first.s3_key, first.blob.s3_key), (self.blob_key(self.image), self.blob_key(self.image)))
+        self.assertEqual(self.stored_keys('images/'), set())
+        self.assertNotEqual(first.blur_hash, '')
+        variant_keys = self.stored_keys('variants/')
+        self.assertEqual(set(first.variants.values_list('s3_key', flat=True)), variant_keys)
+
+        second = self.upload('images/second/beach-again.png', self.image)
+        reads = len(self.s3.reads)
+        deduplicate_media.call_local(second.id)
+        second.refresh_from_db()
+
+        # the duplicate is only read to be hashed, then deleted in favour of the blob's file.
+        self.assertEqual(self.s3.reads[reads:], [('images/second/beach-again.png', 0, len(self.image))])
+        self.assertEqual(self.stored_keys('images/'), set())
+        self.assertEqual(self.stored_keys('blobs/'), {self.blob_key(self.image)})
+        self.assertEqual(self.stored_keys('variants/'), variant_keys)
+        self.assertEqual((second.blob_id, second.s3_key), (first.blob_id, first.s3_key))
+        self.assertEqual(second.blur_hash, first.blur_hash)
+        self.assertEqual(set(second.variants.values_list('s3_key', flat=True)), variant_keys)
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+
+        other = self.upload('images/second/other.png', fixture_image(640, 480))
+        deduplicate_media.call_local(other.id)
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        self.assertEqual(len(self.stored_keys('blobs/')), 2)
+
+    def test_uploading_again_does_not_change_the_file_of_a_blob(self):
+        first = self.upload('images/first/beach.png', self.image)
+        second = self.upload('images/second/beach.png', self.image)
+        blobs.deduplicate(first)
+        blobs.deduplicate(second)
+
+        # the first uploader posts another file to the key they uploaded to.
+        self.s3.put_object(Bucket=settings.BUCKET_NAME, Key='images/first/beach.png', Body=b'replaced')
+        second.refresh_from_db()
+        self.assertEqual(second.s3_key, self.blob_key(self.image))
+        self.assertEqual(self.s3.objects[(settings.BUCKET_NAME, second.s3_key)]['Body'], self.image)
+
+    def test_only_images_are_deduplicated(self):
+        with (
+            patch('apps.contents.signals.deduplicate_media') as deduplicate_media_task,
+            patch('apps.contents.signals.process_video') as process_video_task,
+        ):
+            image = Media.objects.create(content=self.content, s3_key='images/a.png', media_type=MediaType.IMAGE)
+            video = Media.objects.create(content=self.content, s3_key='videos/a.mp4', media_type=MediaType.VIDEO)
+
+        deduplicate_media_task.schedule.assert_called_once_with((image.id,), delay=1)
+        process_video_task.schedule.assert_called_once_with((video.id,), delay=1)
+
+    def test_duplicates_get_the_derivatives_of_a_file_processed_later(self):
+        first = self.upload('images/first/beach.png', self.image)
+        second = self.upload('images/second/beach.png', self.image)
+        self.assertFalse(blobs.deduplicate(first))
+        self.assertTrue(blobs.deduplicate(second))
+        self.assertFalse(second.variants.exists())
+
+        fetch_blurhash_for_image.call_local(first.id)
+        create_media_variants.call_local(first.id)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(second.blur_hash, '')
+        self.assertEqual(second.blur_hash, first.blur_hash)
+        self.assertEqual(
+            set(second.variants.values_list('width', 'image_format', 's3_key')),
+            set(first.variants.values_list('width', 'image_format', 's3_key')),
+        )
+
+    def test_unused_blobs_are_collected(self):
+        images = [fixture_image(320 + i, 240) for i in range(3)]
+        media = [self.upload(f'images/first/{i}.png', image) for i, image in enumerate(images)]
+        media.append(self.upload('images/second/0.png', images[0]))
+        for entry in media:
+            blobs.deduplicate(entry)
+
+        # the last media of the first file is kept, the two other files are no longer used.
+        Media.objects.filter(id__in=[media[0].id, media[1].id, media[2].id]).delete()
+        keys = [self.blob_key(image) for image in images]
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('s3_key', 'refcount')), {keys[0]: 1, keys[1]: 0, keys[2]: 0}
+        )
+
+        # unused blobs are only deleted by their collection, as uploads of the same file can still use them.
+        for stored in self.s3.objects.values():
+            stored['LastModified'] -= datetime.timedelta(hours=settings.ORPHANED_UPLOAD_AGE + 1)
+        self.assertEqual(sweep_orphaned_uploads(), 0)
+
+        deletions = len(self.s3.deletions)
+        self.assertEqual(blobs.collect_blobs(batch_size=1), 2)
+        self.assertEqual(list(MediaBlob.objects.values_list('s3_key', flat=True)), keys[:1])
+        self.assertEqual(self.stored_keys('blobs/'), set(keys[:1]))
+        self.assertEqual(sorted(self.s3.deletions[deletions:]), sorted([key] for key in keys[1:]))
+
+
+@tag('benchmark')
+class PresignedPostBenchmark(SimpleTestCase):
+    rounds = int(os.environ.get('BENCHMARK_ROWS', 200))
+
+    def test_shared_client_signing(self):
+        files = [
+            (f'{file_type}s/creator/file-{i}', file_type)
+            for i in range(settings.MAX_FILE_UPLOAD_PER_REQUEST)
+            for file_type in (MediaType.IMAGE, MediaType.VIDEO)
+        ][: settings.MAX_FILE_UPLOAD_PER_REQUEST]
+        s3_service = S3Service(settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.BUCKET_NAME)
+
+        def one_client_per_file():
+            for s3_key, file_type in files:
+                boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                ).generate_presigned_post(
+                    s3_service.bucket,
+                    s3_key,
+                    Conditions=upload_conditions(file_type),
+                    ExpiresIn=3600,
+                )
+
+        def shared():
+            s3_service.get_pre_signed_upload_urls(files, expiration=3600)
+
+        timings = {}
+        for name, sign in (('client per file', one_client_per_file), ('shared client', shared)):
+            started_at = time.perf_counter()
+            for _ in range(self.rounds):
+                sign()
+            timings[name] = (time.perf_counter() - started_at) / self.rounds
+            print(f'\n{name}: {len(files)} files in {timings[name] * 1000:.2f}ms per request')  # noqa: T201
+
+        self.assertLess(timings['shared client'] * 2, timings['client per file'])
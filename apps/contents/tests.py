@@ -7,6 +7,7 @@ from unittest.mock import patch
 
 from solders.keypair import Keypair
 
+from django.conf import settings
 from django.test import TestCase
 from django.utils import timezone
 
@@ -17,6 +18,10 @@ from apps.subscriptions.choices import SubscriptionType
 from apps.creators.tests import WALLET_CREATION_RESPONSE, WALLET_CREATION_RESPONSE_2
 from apps.subscriptions.models import FreeSubscription, SubscriptionDetail, SubscriptionDetailStatus
 
+from services.s3 import shared_client
+
+from utils.mock import LocalS3Client
+
 from .models import Content, Livestream
 
 
@@ -28,6 +33,19 @@ class ContentsTest(TestCase):
         self.signature = self.keypair.sign_message(message=self.message)
         self.auth_header = {'Authorization': f'Signature {self.keypair.pubkey()}:{self.signature}'}
 
+        # content is only created from files that have been uploaded.
+        storage = LocalS3Client()
+        for key in (
+            'images/8LnFdWY5KjemEPqXVfco4h7RZubFds9iM7DPpinWZCnG/test.png',
+            'videos/vYBRhWTQPJXByU3ED3SpUWSqR3RnJ7eT1vJ6Ckfbuqq/test.mov',
+        ):
+            storage.put_object(Bucket=settings.BUCKET_NAME, Key=key, Body=b'')
+        s3_client = patch('services.s3.boto3.client', return_value=storage)
+        s3_client.start()
+        self.addCleanup(s3_client.stop)
+        shared_client.cache_clear()
+        self.addCleanup(shared_client.cache_clear)
+
         logging.disable(logging.CRITICAL)
 
     @staticmethod
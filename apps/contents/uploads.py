@@ -0,0 +1,73 @@
+"""Files uploaded straight to the bucket with presigned posts.
+
+Content is only created once `missing_uploads` confirms that all of its files landed. Uploads that are abandoned, and
+the derivatives of deleted media, are removed by `sweep_orphaned_uploads` once they are older than
+`ORPHANED_UPLOAD_AGE`, which leaves clients the time to create their content after uploading.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from services.s3 import S3Service
+
+from .models import Media, MediaBlob, MediaVariant
+
+logger = logging.getLogger(__name__)
+
+# the most keys `DeleteObjects` takes, so that every listed page is deleted in a single request.
+SWEEP_PAGE_SIZE = 1000
+
+# the files of unused blobs are left to `collect_media_blobs`, as an identical upload can still be deduplicated
+# against them until they are collected.
+FILE_REFERENCES = ((Media, 's3_key'), (MediaBlob, 's3_key'))
+
+# the columns that refer to the objects under each prefix of the bucket.
+UPLOAD_REFERENCES = {
+    'images/': FILE_REFERENCES,
+    'videos/': FILE_REFERENCES,
+    'blobs/': FILE_REFERENCES,
+    'variants/': ((MediaVariant, 's3_key'),),
+    'posters/': ((Media, 'poster_s3_key'),),
+}
+
+
+def s3_service() -> S3Service:
+    return S3Service(settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.BUCKET_NAME)
+
+
+def missing_uploads(s3_keys) -> set[str]:
+    s3_keys = set(s3_keys)
+    return s3_keys - s3_service().existing_keys(s3_keys)
+
+
+def referenced_keys(s3_keys, references) -> set[str]:
+    """The keys among `s3_keys` that a row of `references` refers to."""
+    referenced = set()
+    for model, field in references:
+        referenced.update(model.objects.filter(**{f'{field}__in': s3_keys}).values_list(field, flat=True))
+    return referenced
+
+
+def sweep_orphaned_uploads() -> int:
+    """Delete the objects no row refers to that are older than `ORPHANED_UPLOAD_AGE`, and return how many."""
+    service = s3_service()
+    cutoff = timezone.now() - timedelta(hours=settings.ORPHANED_UPLOAD_AGE)
+    deleted = 0
+    for prefix, references in UPLOAD_REFERENCES.items():
+        for page in service.list_objects(prefix, page_size=SWEEP_PAGE_SIZE):
+            stale = {entry['Key'] for entry in page if entry['LastModified'] < cutoff}
+            if not stale:
+                continue
+
+            orphans = stale - referenced_keys(stale, references)
+            if not orphans:
+                continue
+
+            failed = service.delete_keys(sorted(orphans))
+            if failed:
+                logger.warning('Unable to delete %d orphaned upload(s) under %s', len(failed), prefix)
+            deleted += len(orphans) - len(failed)
+
+    return deleted
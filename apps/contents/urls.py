@@ -13,6 +13,9 @@ from .views import (
     CreateCommentAPIVIew,
     DeleteCommentAPIView,
     PayForContentAPIView,
+    LivestreamPresenceView,
+    LivestreamDiscoveryView,
+    VerifyLivestreamTokenView,
     FetchUpdateDeleteLivestreamView,
 )
 
@@ -21,11 +24,22 @@ urlpatterns = [
     path('discover', DiscoverView.as_view(), name='discover-view'),
     path('get-upload-urls', PreSignedURLView.as_view(), name='presigned-urls'),
     path('livestreams', LivestreamView.as_view(), name='livestream-view'),
+    path('livestreams/discover', LivestreamDiscoveryView.as_view(), name='livestream-discovery'),
     path(
         'livestreams/<uuid:stream_id>/join',
         JoinLivestreamView.as_view(),
         name='join-livestream',
     ),
+    path(
+        'livestreams/<uuid:stream_id>/verify-token',
+        VerifyLivestreamTokenView.as_view(),
+        name='verify-livestream-token',
+    ),
+    path(
+        'livestreams/<uuid:stream_id>/presence',
+        LivestreamPresenceView.as_view(),
+        name='livestream-presence',
+    ),
     path(
         'livestreams/<uuid:id>',
         FetchUpdateDeleteLivestreamView.as_view(),
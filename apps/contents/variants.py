@@ -0,0 +1,87 @@
+"""Downscaled variants of uploaded images, so that clients do not download originals of up to 5MB for thumbnails.
+
+`create_variants` renders every image to each of `MEDIA_VARIANT_WIDTHS` as WebP and JPEG on a pool of processes, as
+resizing and encoding are CPU bound and would hold the GIL of the worker. Clients ask for the width they display an
+image at and the format they support, and are handed the url of the smallest variant that is at least that wide.
+"""
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from services.s3 import S3Service
+
+from utils import images
+
+from .models import Media, MediaVariant
+from .choices import MediaType, ImageFormat
+
+CONTENT_TYPES = {ImageFormat.WEBP: 'image/webp', ImageFormat.JPEG: 'image/jpeg'}
+
+
+@functools.cache
+def variant_pool() -> ProcessPoolExecutor:
+    # spawned rather than forked, a fork would inherit the database and redis connections of the worker.
+    return ProcessPoolExecutor(
+        max_workers=settings.MEDIA_VARIANT_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+def variant_key(media: Media, width: int, image_format: str) -> str:
+    return f'variants/{media.id}/{width}.{image_format}'
+
+
+def create_variants(media: Media) -> list[MediaVariant]:
+    s3_service = S3Service(settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.BUCKET_NAME)
+    original = s3_service.download(media.s3_key)
+    rendered = variant_pool().submit(
+        images.render_variants,
+        original,
+        tuple(settings.MEDIA_VARIANT_WIDTHS),
+        tuple(ImageFormat.values),
+    )
+
+    variants, files = [], []
+    for width, height, image_format, data in rendered.result():
+        key = variant_key(media, width, image_format)
+        variants.append(MediaVariant(media=media, width=width, height=height, image_format=image_format, s3_key=key))
+        files.append((key, data, CONTENT_TYPES[image_format]))
+
+    s3_service.upload_files(files)
+    return MediaVariant.objects.bulk_create(variants, ignore_conflicts=True)
+
+
+def requested_variant(request) -> tuple[int | None, str]:
+    """The width and format a client asks for with the `image_width` and `image_format` query parameters."""
+    try:
+        width = int(request.query_params['image_width'])
+    except (KeyError, ValueError):
+        width = None
+
+    image_format = request.query_params.get('image_format', ImageFormat.WEBP)
+    return width, image_format if image_format in ImageFormat.values else ImageFormat.WEBP
+
+
+def pick_key(media: Media, width: int | None, image_format: str) -> str:
+    """The key of the smallest variant of `media` at least `width` wide, or of its largest one if none is.
+
+    Videos, and images whose variants are not created yet, are served from the original.
+    """
+    if media.media_type != MediaType.IMAGE:
+        return media.s3_key
+
+    variants = sorted(
+        (variant for variant in media.variants.all() if variant.image_format == image_format),
+        key=lambda variant: variant.width,
+    )
+    if not variants:
+        return media.s3_key
+
+    if width is not None:
+        for variant in variants:
+            if variant.width >= width:
+                return variant.s3_key
+
+    return variants[-1].s3_key
@@ -0,0 +1,56 @@
+"""Duration, dimensions, codec and a poster frame of uploaded videos, read without downloading the whole file.
+
+The metadata comes from the container header through ranged reads, the poster from ffmpeg reading the frame it
+needs from a presigned url. The poster is blurhashed like images are, so that clients have a placeholder for videos.
+"""
+import logging
+import subprocess
+from io import BytesIO
+from datetime import timedelta
+
+import blurhash
+
+from django.conf import settings
+
+from services.s3 import S3Service
+
+from utils import videos
+
+from .models import Media
+
+logger = logging.getLogger(__name__)
+
+# seconds into the video of the poster frame, past the black frames that many videos fade in from.
+POSTER_AT = 1.0
+
+# ffmpeg gives up on a poster long before this, the url only needs to last as long as it reads.
+POSTER_URL_EXPIRATION = 5 * 60
+
+
+def poster_key(media: Media) -> str:
+    return f'posters/{media.id}.jpg'
+
+
+def process_video(media: Media):
+    s3_service = S3Service(settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.BUCKET_NAME)
+    info = videos.read_video_info(s3_service.open_ranged_file(media.s3_key, videos.HEAD_READ_SIZE))
+    if info is not None:
+        media.duration = timedelta(seconds=info.duration)
+        media.width, media.height, media.codec = info.width, info.height, info.codec
+        # saved first, so that a poster that cannot be extracted does not lose the metadata.
+        media.save(update_fields=('duration', 'width', 'height', 'codec', 'updated_at'))
+
+    position = min(POSTER_AT, info.duration / 2) if info is not None else 0
+    try:
+        poster = videos.extract_poster(
+            s3_service.get_pre_signed_fetch_url(media.s3_key, POSTER_URL_EXPIRATION), position
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        logger.warning('Unable to extract a poster for media %s', media.id, exc_info=True)
+        return
+
+    if poster is not None:
+        media.poster_s3_key = poster_key(media)
+        s3_service.upload_files([(media.poster_s3_key, poster, 'image/jpeg')])
+        media.blur_hash = blurhash.encode(image=BytesIO(poster), x_components=6, y_components=4)
+        media.save(update_fields=('poster_s3_key', 'blur_hash', 'updated_at'))
@@ -1,10 +1,12 @@
 import logging
-import itertools
-from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+
+from drf_yasg.utils import swagger_auto_schema
 
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
+from django.db.models import F, DateTimeField, ExpressionWrapper
 
 from rest_framework import status
 from rest_framework.views import APIView
@@ -12,19 +14,31 @@ from rest_framework.generics import ListAPIView, GenericAPIView, get_object_or_4
 from rest_framework.mixins import ListModelMixin, UpdateModelMixin, DestroyModelMixin, RetrieveModelMixin
 
 from apps.transactions.models import Transaction
+from apps.transactions.choices import LedgerCategory
 from apps.creators.permissions import IsAuthenticated
 from apps.subscriptions.models import SubscriptionDetail
 from apps.subscriptions.choices import SubscriptionDetailStatus
 
 from services.s3 import S3Service
-from services.agora.token_builder import Role, RtcTokenBuilder
+from services.agora.token_builder import Role
+from services.agora.access_token import ServiceRtc
+from services.agora.token_verifier import InvalidTokenError
 
-from utils.constants import ZERO
-from utils.pagination import CustomCursorPagination
+from utils.constants import ZERO, MAX_LIVESTREAM_DURATION
 from utils.responses import error_response, success_response
+from utils.pagination import (
+    RankedPagination,
+    StartCursorPagination,
+    CustomCursorPagination,
+    DateGroupedCursorPagination,
+)
 
+from .likes import set_like
 from .choices import ContentType
-from .models import Media, Comment, Content, Livestream
+from .presence import presence_stats, record_heartbeat
+from .tokens import mint_livestream_token, verify_livestream_token
+from .discover import COMMENT_WEIGHT, discover_feed, record_engagement, update_scores_on_commit
+from .models import Media, Comment, Content, Livestream, with_likes_total, with_comment_preview
 from .permissions import (
     IsCommentOwner,
     IsContentOwner,
@@ -34,12 +48,14 @@ from .permissions import (
 )
 from .serializers import (
     MediaSerializer,
+    CommentSerializer,
     ContentSerializer,
     LiveStreamSerializer,
     CreateCommentSerializer,
     CreateContentSerializer,
     UpdateContentSerializer,
     PreSignedURLListSerializer,
+    VerifyLivestreamTokenSerializer,
 )
 
 logger = logging.getLogger(__name__)
@@ -53,20 +69,18 @@ class PreSignedURLView(GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        response_data = {}
+        s3_service = S3Service(
+            bucket=settings.BUCKET_NAME,
+            access_key=settings.AWS_ACCESS_KEY_ID,
+            secret_key=settings.AWS_SECRET_ACCESS_KEY,
+        )
+        keys = {}
         for data in serializer.validated_data['files']:
             key = f"{data['file_type']}s/{self.request.user.address}/{data['file_name']}"
-            s3_service = S3Service(
-                bucket=settings.BUCKET_NAME,
-                access_key=settings.AWS_ACCESS_KEY_ID,
-                secret_key=settings.AWS_SECRET_ACCESS_KEY,
-            )
-            response = s3_service.get_pre_signed_upload_url(
-                key=key,
-                file_type=data['file_type'],
-                expiration=settings.PRESIGNED_URL_EXPIRATION,
-            )
-            response_data[data['file_name']] = response
+            keys[data['file_name']] = (key, data['file_type'])
+
+        posts = s3_service.get_pre_signed_upload_urls(keys.values(), expiration=settings.PRESIGNED_URL_EXPIRATION)
+        response_data = {file_name: posts[key] for file_name, (key, _) in keys.items()}
 
         return success_response(response_data)
 
@@ -135,7 +149,11 @@ class ContentListAPIView(ListAPIView):
             return qs.none()
 
         address = self.kwargs['address']
-        return qs.filter(creator__address=address)
+        return with_comment_preview(
+            with_likes_total(qs.filter(creator__address=address))
+            .select_related('creator')
+            .prefetch_related('media__variants')
+        )
 
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
@@ -157,7 +175,11 @@ class PayForContentAPIView(APIView):
             )
 
         with transaction.atomic():
-            payer.wallet.transfer(amount=content.price, recipient=content.creator)
+            payer.wallet.transfer(
+                amount=content.price,
+                recipient=content.creator.wallet,
+                category=LedgerCategory.CONTENT_PURCHASE,
+            )
             Transaction.create_payment_for_content(amount=content.price, creator=content.creator, subscriber=payer)
 
             content.purchases.add(payer)
@@ -183,10 +205,10 @@ class PayForContentAPIView(APIView):
 class LivestreamView(GenericAPIView, ListModelMixin):
     serializer_class = LiveStreamSerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = CustomCursorPagination
+    pagination_class = DateGroupedCursorPagination
 
     def get_queryset(self):
-        return Livestream.objects.filter(creator=self.request.user).order_by('-created_at')
+        return Livestream.objects.filter(creator=self.request.user).select_related('creator').order_by('-created_at')
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=self.request.data)
@@ -195,22 +217,46 @@ class LivestreamView(GenericAPIView, ListModelMixin):
         return success_response(serializer.data, 201)
 
     def get(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            data = self.group_livestreams(page)
-            return self.get_paginated_response(data)
+        return self.list(request, *args, **kwargs)
+
 
-        data = self.group_livestreams(page)
-        return success_response(data)
+class LivestreamDiscoveryView(GenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    pagination_class = StartCursorPagination
+
+    def get_queryset(self):
+        now = timezone.now()
+        followed_creators = SubscriptionDetail.objects.filter(
+            subscriber=self.request.user,
+            expires_at__gt=now,
+            status=SubscriptionDetailStatus.ACTIVE,
+        ).values('creator')
+        # a stream that is still live cannot have started more than the maximum duration ago, which bounds the
+        # range scanned on the (start, creator) index no matter how many streams have ever been scheduled.
+        return (
+            Livestream.objects.filter(
+                creator__in=followed_creators,
+                start__gt=now - MAX_LIVESTREAM_DURATION,
+                start__lte=now + timedelta(hours=settings.LIVESTREAM_DISCOVERY_HORIZON),
+            )
+            .alias(end=ExpressionWrapper(F('start') + F('duration'), output_field=DateTimeField()))
+            .filter(end__gt=now)
+            .select_related('creator')
+        )
 
-    def group_livestreams(self, results):
-        grouped_data = defaultdict(list)
-        for key, group in itertools.groupby(results, lambda x: x.created_at.date()):
-            for entry in group:
-                grouped_data[key.isoformat()].append(self.get_serializer(instance=entry).data)
+    def get(self, request):
+        now = timezone.now()
+        live, upcoming = [], []
+        for livestream in self.paginate_queryset(self.get_queryset()):
+            (live if livestream.start <= now else upcoming).append(livestream)
 
-        return grouped_data
+        response = self.get_paginated_response(
+            {
+                'live': LiveStreamSerializer(live, many=True).data,
+                'upcoming': LiveStreamSerializer(upcoming, many=True).data,
+            },
+        )
+        return success_response(response.data)
 
 
 class FetchUpdateDeleteLivestreamView(GenericAPIView, DestroyModelMixin, UpdateModelMixin, RetrieveModelMixin):
@@ -249,7 +295,7 @@ class JoinLivestreamView(APIView):
         subscription_detail_qs = SubscriptionDetail.objects.filter(
             creator=creator,
             subscriber=subscriber,
-            expires_at__lte=timezone.now(),
+            expires_at__gt=timezone.now(),
             status=SubscriptionDetailStatus.ACTIVE,
         )
         return subscription_detail_qs.exists()
@@ -263,18 +309,10 @@ class JoinLivestreamView(APIView):
                 message='You are not subscribed to this creator',
             )
 
-        token_builder = RtcTokenBuilder()
         role = Role.PUBLISHER if stream.creator == self.request.user else Role.SUBSCRIBER
-        token_expiration = (stream.start + stream.duration).timestamp()
-        token = token_builder.build_token_with_user_account(
-            role=role,
-            channel_name=str(stream.id),
-            account=request.user.address,
-            app_id=settings.AGORA_APP_ID,
-            token_expire=token_expiration,
-            privilege_expire=token_expiration,
-            app_certificate=settings.AGORA_APP_CERTIFICATE,
-        )
+        token = mint_livestream_token(stream=stream, account=request.user.address, role=role)
+        if stream.start <= timezone.now() < stream.end:
+            record_heartbeat(stream=stream, account=request.user.address)
         return success_response(
             {
                 'token': token,
@@ -284,6 +322,64 @@ class JoinLivestreamView(APIView):
         )
 
 
+class LivestreamPresenceView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, stream_id):
+        stream = get_object_or_404(Livestream.objects.all(), id=stream_id)
+        if not JoinLivestreamView.is_subscribed(creator=stream.creator, subscriber=self.request.user):
+            return error_response(
+                errors=None,
+                status_code=status.HTTP_403_FORBIDDEN,
+                message='You are not subscribed to this creator',
+            )
+
+        if stream.peak_viewers is not None:
+            stats = {'viewers': 0, 'unique_viewers': stream.unique_viewers, 'peak_viewers': stream.peak_viewers}
+            return success_response(stats)
+
+        return success_response(presence_stats(stream))
+
+    def post(self, request, stream_id):
+        stream = get_object_or_404(Livestream.objects.all(), id=stream_id)
+        if not JoinLivestreamView.is_subscribed(creator=stream.creator, subscriber=self.request.user):
+            return error_response(
+                errors=None,
+                status_code=status.HTTP_403_FORBIDDEN,
+                message='You are not subscribed to this creator',
+            )
+
+        now = timezone.now()
+        if not stream.start <= now < stream.end:
+            return error_response(errors=None, message='Livestream is not live')
+
+        return success_response(record_heartbeat(stream=stream, account=request.user.address))
+
+
+class VerifyLivestreamTokenView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(request_body=VerifyLivestreamTokenSerializer)
+    def post(self, request, stream_id):
+        serializer = VerifyLivestreamTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        stream = get_object_or_404(Livestream.objects.all(), id=stream_id)
+        try:
+            claims = verify_livestream_token(stream, request.user.address, serializer.validated_data['token'])
+        except InvalidTokenError as e:
+            return error_response(errors=None, message=str(e))
+
+        return success_response(
+            {
+                'channel_name': claims.channel_name,
+                'user_account': claims.account,
+                'expires_at': datetime.fromtimestamp(claims.expires_at, tz=UTC),
+                'can_publish': claims.has_privilege(ServiceRtc.K_PRIVILEGE_PUBLISH_VIDEO_STREAM),
+            },
+        )
+
+
 class LikesAPIView(APIView):
     queryset = Content.objects.get_queryset()
     permission_classes = (IsAuthenticated, IsSubscribedToCreator, IsSubscribedToContent)
@@ -305,16 +401,12 @@ class LikesAPIView(APIView):
 
     def post(self, request, *args, **kwargs):
         content = self.get_object()
-        content.likes.add(request.user)
+        set_like(content, request.user, liked=True)
         return success_response('Content liked successfully')
 
     def delete(self, request, *args, **kwargs):
         content = self.get_object()
-        try:
-            content.likes.remove(request.user)
-        except Exception:
-            logger.exception('An exception occurred while unliking content %s', content.id)
-
+        set_like(content, request.user, liked=False)
         return success_response('Content unliked successfully')
 
 
@@ -322,6 +414,13 @@ class CreateCommentAPIVIew(GenericAPIView):
     queryset = Content.objects.get_queryset()
     serializer_class = CreateCommentSerializer
     permission_classes = (IsAuthenticated, IsSubscribedToCreator, IsSubscribedToContent)
+    pagination_class = CustomCursorPagination
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return CommentSerializer
+
+        return super().get_serializer_class()
 
     def get_object(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -345,19 +444,31 @@ class CreateCommentAPIVIew(GenericAPIView):
 
         return success_response(data='Comment created successfully.', status_code=status.HTTP_201_CREATED)
 
+    def get(self, request, *args, **kwargs):
+        # feeds only carry a preview of the comments, the rest are paged through here.
+        content = self.get_object()
+        page = self.paginate_queryset(content.comments.select_related('author'))
+        serializer = self.get_serializer(page, many=True)
+        return success_response(self.get_paginated_response(serializer.data).data)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        context['content'] = self.get_object()
+        # only a new comment needs its content, `get` has already fetched it to page through its comments.
+        if self.request.method == 'POST':
+            context['content'] = self.get_object()
         return context
 
 
 class DeleteCommentAPIView(APIView):
-    queryset = Comment.objects.get_queryset()
+    queryset = Comment.objects.select_related('content')
     permission_classes = (IsAuthenticated, IsCommentOwner)
 
     def delete(self, request, *args, **kwargs):
         obj = self.get_object()
         obj.delete()
+        # unscored here rather than on `post_delete`, as deleting a content cascades to its comments, which must not
+        # each be unscored. The weight is taken back as of the comment's `created_at`, which is when it was added.
+        update_scores_on_commit(record_engagement, obj.content, -COMMENT_WEIGHT, occurred_at=obj.created_at)
 
         return success_response(None, status_code=status.HTTP_204_NO_CONTENT)
 
@@ -387,11 +498,13 @@ class TimelineView(ListAPIView):
     pagination_class = CustomCursorPagination
 
     def get_queryset(self):
-        return Content.objects.filter(
+        contents = Content.objects.filter(
             creator__in=self.request.user.subscriptions.filter(status=SubscriptionDetailStatus.ACTIVE).values(
                 'creator',
             ),
-        ).order_by('-created_at')
+        )
+        contents = with_likes_total(contents).select_related('creator').prefetch_related('media__variants')
+        return with_comment_preview(contents).order_by('-created_at')
 
 
 class MediaView(ListAPIView):
@@ -401,7 +514,11 @@ class MediaView(ListAPIView):
 
     def get_queryset(self):
         creator = self.kwargs['address']
-        qs = Media.objects.filter(content__creator__address=creator)
+        qs = (
+            Media.objects.filter(content__creator__address=creator)
+            .select_related('content')
+            .prefetch_related('variants')
+        )
         return qs.order_by('-created_at')
 
     def get(self, request, *args, **kwargs):
@@ -409,18 +526,23 @@ class MediaView(ListAPIView):
         return success_response(response.data)
 
 
-class DiscoverView(ListAPIView):
+class DiscoverView(GenericAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = ContentSerializer
-    pagination_class = CustomCursorPagination
-
-    def get_queryset(self):
-        return (
-            Content.objects.filter(content_type=ContentType.FREE)
-            .exclude(creator__address=self.request.user.address)
-            .order_by('-created_at')
-        )
+    pagination_class = RankedPagination
 
     def get(self, request, *args, **kwargs):
-        response = self.list(request, args, kwargs)
-        return success_response(response.data)
+        page = self.paginate_queryset(discover_feed(request.user))
+        contents = {
+            str(content.id): content
+            for content in with_comment_preview(
+                with_likes_total(Content.objects.filter(id__in=page))
+                .select_related('creator')
+                .prefetch_related('media__variants'),
+            )
+        }
+        # a content deleted since the pool was built is left out of its page.
+        serializer = self.get_serializer(
+            [contents[content_id] for content_id in page if content_id in contents], many=True
+        )
+        return success_response(self.get_paginated_response(serializer.data).data)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CreatorsConfig(AppConfig):
@@ -7,3 +8,6 @@ class CreatorsConfig(AppConfig):
 
     def ready(self):
         import apps.creators.signals  # noqa: F401
+        from apps.creators.search import create_search_indexes  # pylint: disable=import-outside-toplevel
+
+        post_migrate.connect(create_search_indexes, sender=self)
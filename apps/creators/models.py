@@ -1,16 +1,18 @@
 from decimal import Decimal
 from typing import ClassVar
 
-from django.db import models, transaction
+from django.db import models
 from django.core.validators import MaxLengthValidator, MinLengthValidator
 
+from apps.transactions import ledger
+from apps.transactions.choices import LedgerCategory
 from apps.subscriptions.choices import SubscriptionType
 
 from utils.constants import ZERO
 from utils.models import UUIDModel, TimestampedModel
 
 from .choices import Blockchain
-from .exceptions import AccountSuspensionError, InsufficientBalanceError
+from .exceptions import AccountSuspensionError
 
 
 class Creator(UUIDModel, TimestampedModel, models.Model):
@@ -65,45 +67,23 @@ class Wallet(UUIDModel, TimestampedModel, models.Model):
     def __str__(self):
         return str(self.balance)
 
-    @transaction.atomic()
     def top_up(self, amount: Decimal):
         if self.creator.is_suspended:
             raise AccountSuspensionError(self.creator.suspension_reason)
 
-        self.balance = models.F('balance') + amount
-        self.save()
+        self.balance = ledger.top_up(self, amount)
 
-        self.refresh_from_db()
-
-    @transaction.atomic()
-    def withdraw(self, amount: Decimal):
+    def withdraw(self, amount: Decimal, fee: Decimal = ZERO):
         if self.creator.is_suspended:
             raise AccountSuspensionError(self.creator.suspension_reason)
 
-        if self.balance - amount < ZERO:
-            raise InsufficientBalanceError(f'Your balance is {self.balance} while attempting to withdraw {amount}')
-
-        self.balance = models.F('balance') - amount
-        self.save()
-
-        self.refresh_from_db()
+        self.balance = ledger.withdraw(self, amount, fee=fee)
 
-    @transaction.atomic()
-    def transfer(self, amount: Decimal, recipient: 'Wallet'):
+    def transfer(self, amount: Decimal, recipient: 'Wallet', category: LedgerCategory = LedgerCategory.TRANSFER):
         if self.creator.is_suspended:
             raise AccountSuspensionError(self.creator.suspension_reason)
 
-        if self.balance - amount < ZERO:
-            raise InsufficientBalanceError(f'Your balance is {self.balance} while attempting to transfer {amount}')
-
-        self.balance = models.F('balance') - amount
-        recipient.balance = models.F('balance') + amount
-
-        self.save()
-        recipient.save()
-
-        self.refresh_from_db()
-        recipient.refresh_from_db()
+        self.balance, recipient.balance = ledger.transfer(self, recipient, amount, category=category)
 
 
 class WalletDepositAddress(UUIDModel, TimestampedModel, models.Model):
@@ -0,0 +1,125 @@
+"""Every taken moniker, held in memory by each process to answer availability checks and suggestions while typing.
+
+Monikers are kept in a sorted list searched with `bisect`, in front of which sits a Bloom filter so that most
+available monikers are answered without searching the list at all. Each process reloads its index from the database
+in a background thread once it is older than `MONIKER_INDEX_REFRESH_INTERVAL`, and creator signals apply the
+monikers that the process itself creates in the meantime. The index can therefore lag behind other processes, which
+is fine as the unique constraint on `Creator.moniker` remains what decides whether a moniker can be taken.
+"""
+import time
+import bisect
+import itertools
+import threading
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.db import connection
+
+from utils.bloom import BloomFilter
+
+from .models import Creator
+
+# the Bloom filter is sized for this many monikers more than are loaded, for the ones added until the next reload.
+MONIKER_INDEX_HEADROOM = 10_000
+
+MONIKER_SUGGESTIONS_LIMIT = 10
+
+
+class MonikerIndex:
+    __slots__ = ('monikers', 'bloom', 'loaded_at')
+
+    def __init__(self, monikers: Iterable[str]):
+        self.monikers = sorted(monikers)
+        self.bloom = BloomFilter(capacity=len(self.monikers) + MONIKER_INDEX_HEADROOM)
+        for moniker in self.monikers:
+            self.bloom.add(moniker)
+
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls) -> 'MonikerIndex':
+        return cls(Creator.objects.values_list('moniker', flat=True).iterator(chunk_size=10_000))
+
+    def __len__(self) -> int:
+        return len(self.monikers)
+
+    def __contains__(self, moniker: str) -> bool:
+        if moniker not in self.bloom:
+            return False
+
+        position = bisect.bisect_left(self.monikers, moniker)
+        return position < len(self.monikers) and self.monikers[position] == moniker
+
+    def add(self, moniker: str):
+        if moniker not in self:
+            bisect.insort(self.monikers, moniker)
+            self.bloom.add(moniker)
+
+    def discard(self, moniker: str):
+        # the Bloom filter keeps reporting it as possibly taken, which only costs a search of the list.
+        position = bisect.bisect_left(self.monikers, moniker)
+        if position < len(self.monikers) and self.monikers[position] == moniker:
+            del self.monikers[position]
+
+    def with_prefix(self, prefix: str, limit: int = MONIKER_SUGGESTIONS_LIMIT) -> list[str]:
+        start = bisect.bisect_left(self.monikers, prefix)
+        end = start + limit
+        return list(itertools.takewhile(lambda moniker: moniker.startswith(prefix), self.monikers[start:end]))
+
+
+class MonikerRegistry:
+    """Hands out the `MonikerIndex` of this process, loading it on first use and reloading it once it is stale."""
+
+    def __init__(self):
+        self.index = None
+        self.lock = threading.Lock()
+        # changes made while a reload is in flight, replayed onto the reloaded index as it may not include them.
+        self.pending = None
+
+    def get(self) -> MonikerIndex:
+        with self.lock:
+            if self.index is None:
+                self.index = MonikerIndex.load()
+            elif self.pending is None and time.monotonic() - self.index.loaded_at > (
+                settings.MONIKER_INDEX_REFRESH_INTERVAL
+            ):
+                self.pending = []
+                threading.Thread(target=self.reload, daemon=True).start()
+
+            return self.index
+
+    def reload(self):
+        try:
+            index = MonikerIndex.load()
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+        finally:
+            connection.close()
+
+        with self.lock:
+            for change, moniker in self.pending:
+                getattr(index, change)(moniker)
+
+            self.index, self.pending = index, None
+
+    def apply(self, change: str, moniker: str):
+        with self.lock:
+            if self.index is not None:
+                getattr(self.index, change)(moniker)
+            if self.pending is not None:
+                self.pending.append((change, moniker))
+
+    def add(self, moniker: str):
+        self.apply('add', moniker)
+
+    def discard(self, moniker: str):
+        self.apply('discard', moniker)
+
+    def clear(self):
+        with self.lock:
+            self.index, self.pending = None, None
+
+
+moniker_registry = MonikerRegistry()
@@ -0,0 +1,47 @@
+"""Public creator profiles cached in redis.
+
+Everything in a profile except `is_subscribed` and the wallet, which is only shown to its owner, is the same for
+every viewer. That part is cached as rendered JSON per creator address. The signal handlers in `signals.py` drop the
+entry whenever a row it was built from changes, while `CREATOR_PROFILE_CACHE_TIMEOUT` bounds how long subscriptions
+that lapse (without their row being saved) are still counted.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+
+from utils.redis import get_redis
+
+
+def profile_cache_key(address: str) -> str:
+    return f'creator-profile:{address}'
+
+
+def get_cached_profile(address: str) -> str | None:
+    return get_redis().get(profile_cache_key(address))
+
+
+def cache_profile(address: str, profile: dict) -> str:
+    """Render `profile` the way the API would and cache it. Returns the rendered JSON."""
+    rendered = JSONRenderer().render(profile).decode('utf-8')
+    get_redis().set(profile_cache_key(address), rendered, ex=settings.CREATOR_PROFILE_CACHE_TIMEOUT)
+    return rendered
+
+
+def invalidate_profile(address: str):
+    key = profile_cache_key(address)
+    # dropped right away for reads within this transaction and again once it commits, so that a concurrent request
+    # that rebuilt the profile from the rows as they were before the commit does not leave it stale.
+    get_redis().delete(key)
+    transaction.on_commit(lambda: get_redis().delete(key))
+
+
+def profile_etag(profile: str, *viewer_parts) -> str:
+    """A strong ETag over the cached profile and the parts of the response that are specific to the viewer."""
+    digest = hashlib.blake2b(profile.encode('utf-8'), digest_size=16)
+    for part in viewer_parts:
+        digest.update(b'\0' + JSONRenderer().render(part))
+
+    return f'"{digest.hexdigest()}"'
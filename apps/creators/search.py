@@ -0,0 +1,149 @@
+"""Ranked creator search.
+
+Matches are ranked exact moniker first, then moniker prefixes, then everything else that matched. On Postgres the
+rest are substring matches on the moniker or address and fuzzy trigram matches on the moniker, all served by
+`gin_trgm_ops` indexes, and they are ordered by their similarity to the query. SQLite (in tests) has no fuzzy
+matching, its substring matches come from an FTS5 trigram index kept in sync by triggers and are ordered by how
+close the length of the moniker is to the query.
+
+Queries shorter than a trigram cannot use those indexes, so they only match moniker prefixes through a btree index.
+They are also what autocomplete sends on the first keystrokes, so their top matches are cached in redis.
+"""
+import json
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Abs, Lower, Length
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q, Case, When, Value, QuerySet, IntegerField
+
+from rest_framework.renderers import JSONRenderer
+
+from utils.redis import get_redis
+
+from .models import Creator
+from .serializers import MinimalCreatorSerializer
+
+TRIGRAM_LENGTH = 3
+
+# how many of the best matches of a short query are cached, which is also as deep as its results can be paged.
+PREFIX_MATCHES_LIMIT = 100
+
+# the highest code point, so that `[prefix, prefix + MAX_CHARACTER)` is the range of strings starting with `prefix`.
+MAX_CHARACTER = '\U0010ffff'
+
+SEARCH_INDEXES = {
+    'postgresql': (
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX IF NOT EXISTS creator_moniker_prefix_idx ON {table} (LOWER(moniker) text_pattern_ops)',
+        'CREATE INDEX IF NOT EXISTS creator_moniker_trgm_idx ON {table} USING gin (LOWER(moniker) gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS creator_address_trgm_idx ON {table} USING gin (LOWER(address) gin_trgm_ops)',
+    ),
+    'sqlite': (
+        'CREATE INDEX IF NOT EXISTS creator_moniker_prefix_idx ON {table} (LOWER(moniker))',
+        'CREATE VIRTUAL TABLE IF NOT EXISTS creator_search USING fts5(moniker, address, content={table}, '
+        "content_rowid='rowid', tokenize='trigram')",
+        'CREATE TRIGGER IF NOT EXISTS creator_search_insert AFTER INSERT ON {table} BEGIN '
+        'INSERT INTO creator_search(rowid, moniker, address) VALUES (new.rowid, new.moniker, new.address); END',
+        'CREATE TRIGGER IF NOT EXISTS creator_search_delete AFTER DELETE ON {table} BEGIN '
+        'INSERT INTO creator_search(creator_search, rowid, moniker, address) '
+        "VALUES ('delete', old.rowid, old.moniker, old.address); END",
+        'CREATE TRIGGER IF NOT EXISTS creator_search_update AFTER UPDATE ON {table} BEGIN '
+        'INSERT INTO creator_search(creator_search, rowid, moniker, address) '
+        "VALUES ('delete', old.rowid, old.moniker, old.address); "
+        'INSERT INTO creator_search(rowid, moniker, address) VALUES (new.rowid, new.moniker, new.address); END',
+        "INSERT INTO creator_search(creator_search) VALUES ('rebuild')",
+    ),
+}
+
+# the creators whose moniker or address contain a pattern according to the trigram index of `SEARCH_INDEXES`.
+SQLITE_TRIGRAM_MATCHES = (
+    'SELECT id FROM {table} WHERE rowid IN ('
+    'SELECT rowid FROM creator_search WHERE moniker LIKE %s '
+    'UNION SELECT rowid FROM creator_search WHERE address LIKE %s)'
+)
+
+
+def create_search_indexes(sender, using, **kwargs):
+    """Create the indexes used by the search on `post_migrate`, as they depend on the database in use."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for statement in SEARCH_INDEXES.get(connection.vendor, ()):
+            cursor.execute(statement.format(table=connection.ops.quote_name(Creator._meta.db_table)))  # noqa: SLF001
+
+
+def normalize_query(query: str) -> str:
+    return query.strip().lower()
+
+
+def is_prefix_query(term: str) -> bool:
+    return len(term) < TRIGRAM_LENGTH
+
+
+def search_creators(term: str) -> QuerySet[Creator]:
+    """Creators matching the normalized search `term`, best matches first."""
+    is_postgres = connections[Creator.objects.db].vendor == 'postgresql'
+    creators = Creator.objects.annotate(search_moniker=Lower('moniker'), search_address=Lower('address'))
+    if is_postgres:
+        prefix = Q(search_moniker__startswith=term)
+    else:
+        # `LIKE` is case insensitive on SQLite, which keeps it from using the index on the lower-cased moniker.
+        prefix = Q(search_moniker__gte=term, search_moniker__lt=term + MAX_CHARACTER)
+
+    if is_prefix_query(term):
+        creators = creators.filter(prefix)
+    elif is_postgres:
+        creators = creators.filter(
+            Q(search_moniker__contains=term)
+            | Q(search_address__contains=term)
+            | Q(search_moniker__trigram_similar=term),
+        )
+    else:
+        # `%` and `_` in the term make the trigram lookup match more than it should, never less, which the substring
+        # filter then corrects.
+        pattern = f'%{term}%'
+        creators = creators.filter(
+            Q(pk__in=RawSQL(SQLITE_TRIGRAM_MATCHES.format(table=Creator._meta.db_table), (pattern, pattern)))  # noqa: SLF001
+            & (Q(search_moniker__contains=term) | Q(search_address__contains=term)),
+        )
+
+    creators = creators.annotate(
+        rank=Case(
+            When(search_moniker=term, then=Value(0)),
+            When(prefix, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        ),
+    )
+    if is_postgres:
+        return creators.annotate(similarity=TrigramSimilarity('search_moniker', term)).order_by(
+            'rank',
+            '-similarity',
+            'search_moniker',
+            'id',
+        )
+
+    return creators.annotate(distance=Abs(Length('moniker') - len(term))).order_by(
+        'rank',
+        'distance',
+        'search_moniker',
+        'id',
+    )
+
+
+def prefix_search_cache_key(term: str) -> str:
+    return f'creator-search:{term}'
+
+
+def search_prefix(term: str) -> list[dict]:
+    """The serialized best `PREFIX_MATCHES_LIMIT` matches of a short `term`, cached for autocomplete."""
+    redis = get_redis()
+    cache_key = prefix_search_cache_key(term)
+    cached = redis.get(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
+    matches = MinimalCreatorSerializer(search_creators(term)[:PREFIX_MATCHES_LIMIT], many=True).data
+    redis.set(cache_key, JSONRenderer().render(matches), ex=settings.CREATOR_SEARCH_CACHE_TIMEOUT)
+    return matches
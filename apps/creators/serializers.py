@@ -2,11 +2,9 @@ from solders.pubkey import Pubkey
 
 from django.conf import settings
 from django.utils import timezone
-from django.contrib.auth.models import AnonymousUser
 
 from rest_framework import serializers
 
-from apps.subscriptions.models import SubscriptionDetail
 from apps.subscriptions.choices import SubscriptionType, SubscriptionDetailStatus
 
 from services.sharingan import SharinganService
@@ -28,33 +26,35 @@ class WalletSerializer(serializers.ModelSerializer):
         fields = ('id', 'balance', 'deposit_addresses', 'created_at', 'updated_at')
 
 
-class CreatorSerializer(serializers.ModelSerializer):
-    wallet = WalletSerializer()
-    is_subscribed = serializers.SerializerMethodField()
+class PublicCreatorSerializer(serializers.ModelSerializer):
+    """The part of a creator's profile that is the same for every viewer, see `apps.creators.profiles`."""
+
     contents_count = serializers.SerializerMethodField()
     subscribers_count = serializers.SerializerMethodField()
     subscription_info = serializers.SerializerMethodField()
 
-    def get_contents_count(self, obj):
-        return obj.contents.count()
+    # `CreatorAPIView` annotates the counts onto the creator, they are only queried for here when serializing a
+    # creator that was loaded without them.
 
-    def get_is_subscribed(self, obj):
-        if isinstance(self.context['request'].user, AnonymousUser):
-            return False
+    def get_contents_count(self, obj):
+        if hasattr(obj, 'contents_count'):
+            return obj.contents_count
 
-        status = SubscriptionDetail.objects.filter(
-            creator=obj,
-            status=SubscriptionDetailStatus.ACTIVE,
-            subscriber=self.context['request'].user,
-        )
-        return status.exists()
+        return obj.contents.count()
 
     def get_subscribers_count(self, obj):
+        if hasattr(obj, 'subscribers_count'):
+            return obj.subscribers_count
+
         return obj.subscribers.filter(status=SubscriptionDetailStatus.ACTIVE, expires_at__gte=timezone.now()).count()
 
     def get_subscription_info(self, obj):
+        # `.all()` rather than `.first()` so that a prefetched plan is read from the cache instead of queried again.
         if obj.subscription_type == SubscriptionType.NFT:
-            subscription = obj.nft_subscriptions.first()
+            subscription = next(iter(obj.nft_subscriptions.all()), None)
+            if subscription is None:
+                return {}
+
             return {
                 'collection_name': subscription.collection_name,
                 'collection_image': subscription.collection_image_url,
@@ -62,8 +62,8 @@ class CreatorSerializer(serializers.ModelSerializer):
                 'collection_description': subscription.collection_description,
             }
         if obj.subscription_type == SubscriptionType.MONETARY:
-            subscription = obj.monetary_subscriptions.first()
-            return {'amount': subscription.amount}
+            subscription = next(iter(obj.monetary_subscriptions.all()), None)
+            return {} if subscription is None else {'amount': subscription.amount}
 
         return {}
 
@@ -72,7 +72,6 @@ class CreatorSerializer(serializers.ModelSerializer):
         fields = (
             'id',
             'bio',
-            'wallet',
             'address',
             'moniker',
             'image_url',
@@ -82,7 +81,6 @@ class CreatorSerializer(serializers.ModelSerializer):
             'is_verified',
             'social_links',
             'is_suspended',
-            'is_subscribed',
             'contents_count',
             'subscription_info',
             'subscribers_count',
@@ -1,14 +1,17 @@
 from django.conf import settings
 from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 
-from apps.subscriptions.models import FreeSubscription
+from apps.contents.models import Content
 from apps.subscriptions.choices import SubscriptionStatus
+from apps.subscriptions.models import NFTSubscription, FreeSubscription, SubscriptionDetail, MonetarySubscription
 
 from services.circle import CircleAPI
 
 from .models import Wallet, Creator
+from .monikers import moniker_registry
+from .profiles import invalidate_profile
 from .tasks import create_deposit_addresses_for_wallet
 
 circle_api = CircleAPI(api_key=settings.CIRCLE_API_KEY, base_url=settings.CIRCLE_API_BASE_URL)
@@ -30,3 +33,54 @@ def create_profile_and_subscription(sender, instance, created, **kwargs):
 
         wallet = Wallet.objects.create(creator=instance, provider_id=response['data']['walletId'])
         create_deposit_addresses_for_wallet.schedule((wallet.id,), delay=1)
+
+
+@receiver(post_save, sender=Creator)
+@receiver(post_delete, sender=Creator)
+def invalidate_creator_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.address)
+
+
+@receiver(pre_save, sender=Creator)
+def remember_stored_moniker(sender, instance, update_fields=None, **kwargs):
+    """Keep the moniker a creator is saved over, so that `index_moniker` can drop it when the creator is renamed."""
+    instance.stored_moniker = None
+    if update_fields is None or 'moniker' in update_fields:
+        instance.stored_moniker = Creator.objects.filter(pk=instance.pk).values_list('moniker', flat=True).first()
+
+
+@receiver(post_save, sender=Creator)
+def index_moniker(sender, instance, **kwargs):
+    moniker, stored_moniker = instance.moniker, instance.stored_moniker
+
+    def apply():
+        if stored_moniker not in {None, moniker}:
+            moniker_registry.discard(stored_moniker)
+        moniker_registry.add(moniker)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Creator)
+def unindex_moniker(sender, instance, **kwargs):
+    transaction.on_commit(lambda: moniker_registry.discard(instance.moniker))
+
+
+def invalidate_related_creator_profile(sender, instance, **kwargs):
+    """Drop the cached profile of the creator that a content, subscriber or subscription plan belongs to."""
+    if instance.creator_id is None:
+        return
+
+    if sender.creator.is_cached(instance):
+        address = instance.creator.address
+    else:
+        # the creator may be gone already when its rows are deleted along with it, which invalidates it as well.
+        address = Creator.objects.filter(pk=instance.creator_id).values_list('address', flat=True).first()
+
+    if address is not None:
+        invalidate_profile(address)
+
+
+for model in (Content, SubscriptionDetail, FreeSubscription, NFTSubscription, MonetarySubscription):
+    post_save.connect(invalidate_related_creator_profile, sender=model, dispatch_uid=f'{model.__name__}-profile')
+    post_delete.connect(invalidate_related_creator_profile, sender=model, dispatch_uid=f'{model.__name__}-profile')
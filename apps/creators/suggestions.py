@@ -0,0 +1,77 @@
+"""Creators suggested to follow, ranked periodically by `rank_suggested_creators` instead of on every request.
+
+Creators are scored on the subscribers they gained, the content they posted and the likes that content got within
+`SUGGESTION_WINDOW`, with a bonus for verified creators. The ids of the best `SUGGESTION_POOL_SIZE` of them are stored
+in redis as one ranked list shared by every viewer, which each request filters down to the creators its viewer does
+not follow yet.
+"""
+import json
+from datetime import timedelta
+
+from django.utils import timezone
+from django.db.models import F, Case, When, Value, OuterRef, IntegerField
+
+from apps.contents.models import Content
+from apps.subscriptions.models import SubscriptionDetail
+from apps.subscriptions.choices import SubscriptionDetailStatus
+
+from utils.redis import get_redis
+from utils.models import count_subquery
+
+from .models import Creator
+
+SUGGESTIONS_KEY = 'suggested-creators'
+SUGGESTION_POOL_SIZE = 1000
+SUGGESTION_WINDOW = timedelta(days=7)
+
+NEW_SUBSCRIBER_WEIGHT = 3
+RECENT_CONTENT_WEIGHT = 2
+RECENT_LIKE_WEIGHT = 1
+VERIFIED_BONUS = 10
+
+
+def rank_creators() -> list[str]:
+    """Score every creator, store the ids of the best ones and return them, best first."""
+    since = timezone.now() - SUGGESTION_WINDOW
+    new_subscribers = SubscriptionDetail.objects.filter(
+        creator=OuterRef('pk'),
+        status=SubscriptionDetailStatus.ACTIVE,
+        created_at__gte=since,
+    )
+    recent_contents = Content.objects.filter(creator=OuterRef('pk'), created_at__gte=since)
+    recent_likes = Content.likes.through.objects.filter(
+        content__creator=OuterRef('pk'), content__created_at__gte=since
+    )
+    ranked = (
+        Creator.objects.filter(is_suspended=False)
+        .annotate(
+            score=count_subquery(new_subscribers) * NEW_SUBSCRIBER_WEIGHT
+            + count_subquery(recent_contents) * RECENT_CONTENT_WEIGHT
+            + count_subquery(recent_likes, group_by='content__creator') * RECENT_LIKE_WEIGHT
+            + Case(When(is_verified=True, then=Value(VERIFIED_BONUS)), default=Value(0), output_field=IntegerField()),
+        )
+        .order_by(F('score').desc(), '-created_at')
+        .values_list('id', flat=True)[:SUGGESTION_POOL_SIZE]
+    )
+    creator_ids = [str(creator_id) for creator_id in ranked]
+    get_redis().set(SUGGESTIONS_KEY, json.dumps(creator_ids))
+    return creator_ids
+
+
+def ranked_creators() -> list[str]:
+    """The stored ranking, which is computed on the spot until `rank_suggested_creators` has first run."""
+    ranking = get_redis().get(SUGGESTIONS_KEY)
+    return rank_creators() if ranking is None else json.loads(ranking)
+
+
+def suggestions_for(viewer: Creator) -> list[str]:
+    """The ranked creator ids minus the viewer and the creators the viewer is subscribed to."""
+    followed = {
+        str(creator_id)
+        for creator_id in SubscriptionDetail.objects.filter(
+            subscriber=viewer,
+            status=SubscriptionDetailStatus.ACTIVE,
+        ).values_list('creator_id', flat=True)
+    }
+    followed.add(str(viewer.id))
+    return [creator_id for creator_id in ranked_creators() if creator_id not in followed]
@@ -15,6 +15,7 @@ from services.circle import CircleAPI
 from utils.constants import MINIMUM_ALLOWED_DEPOSIT_AMOUNT
 
 from .choices import Blockchain
+from .suggestions import rank_creators
 from .models import Wallet, WalletDepositAddress
 
 circle_api = CircleAPI(api_key=settings.CIRCLE_API_KEY, base_url=settings.CIRCLE_API_BASE_URL)
@@ -89,3 +90,9 @@ def periodically_check_for_wallets_without_deposit_addresses():
     with transaction.atomic():
         for wallet in wallet_without_addresses:
             create_deposit_addresses_for_wallet.schedule((wallet.id,), delay=1)
+
+
+@db_periodic_task(crontab(minute='*/15'))
+@lock_task('rank-suggested-creators-lock')
+def rank_suggested_creators():
+    rank_creators()
@@ -0,0 +1,63 @@
+"""Fixtures shared by the test suites of the apps."""
+import datetime
+from unittest.mock import patch
+
+from solders.keypair import Keypair
+
+from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from apps.creators.models import Creator
+from apps.subscriptions.choices import SubscriptionType
+from apps.subscriptions.models import FreeSubscription, SubscriptionDetail, SubscriptionDetailStatus
+
+from .tests import WALLET_CREATION_RESPONSE
+
+SIGN_IN_MESSAGE = b'Message: Welcome to Flicks!\nURI: https://flicks.vercel.app'
+
+
+def create_creator(moniker, keypair=None, wallet_response=WALLET_CREATION_RESPONSE, **fields) -> Creator:
+    """A creator signed in with `keypair`, a new one by default, whose wallet creation is mocked."""
+    fields = {'subscription_type': SubscriptionType.FREE, **fields}
+    keypair = Keypair() if keypair is None else keypair
+    with patch(target='services.circle.CircleAPI._request', return_value=wallet_response):
+        return Creator.objects.create(
+            moniker=moniker,
+            image_url='https://google.com',
+            banner_url='https://google.com',
+            address=str(keypair.pubkey()),
+            **fields,
+        )
+
+
+def auth_header(keypair) -> dict[str, str]:
+    return {'Authorization': f'Signature {keypair.pubkey()}:{keypair.sign_message(SIGN_IN_MESSAGE)}'}
+
+
+class SubscribersTestCase(TestCase):
+    """A creator with two active subscribers, and a third whose subscription has expired."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.keypair = Keypair()
+        self.creator = self.create_creator('host.sol', self.keypair)
+        self.subscribers = [Keypair() for _ in range(3)]
+        free_subscription = FreeSubscription.objects.create(creator=self.creator, status='active')
+        for keypair, expires_in in zip(self.subscribers, (1, 1, -1), strict=True):
+            SubscriptionDetail.objects.create(
+                creator=self.creator,
+                subscriber=self.create_creator(str(keypair.pubkey())[:20], keypair),
+                subscription_object=free_subscription,
+                status=SubscriptionDetailStatus.ACTIVE,
+                expires_at=timezone.now() + datetime.timedelta(days=expires_in),
+            )
+
+    @staticmethod
+    def create_creator(moniker, keypair):
+        # every creator gets a wallet of its own.
+        wallet_response = {'data': {**WALLET_CREATION_RESPONSE['data'], 'walletId': moniker}}
+        return create_creator(moniker, keypair, wallet_response=wallet_response)
+
+    auth_header = staticmethod(auth_header)
@@ -1,15 +1,31 @@
+import os
 import json
+import time
 import logging
+import datetime
+import itertools
+from decimal import Decimal
 from unittest.mock import patch
 
 from solders.keypair import Keypair
 
-from django.test import TestCase
+from django.utils import timezone
+from django.test import TestCase, SimpleTestCase, tag
+from django.contrib.contenttypes.models import ContentType
 
 from rest_framework.test import APIClient
 
+from apps.contents.models import Content
 from apps.creators.models import Creator
-from apps.subscriptions.choices import SubscriptionType
+from apps.creators.profiles import invalidate_profile
+from apps.creators.suggestions import SUGGESTIONS_KEY
+from apps.creators.tasks import rank_suggested_creators
+from apps.creators.search import prefix_search_cache_key
+from apps.creators.monikers import MonikerIndex, moniker_registry
+from apps.subscriptions.models import FreeSubscription, SubscriptionDetail, MonetarySubscription
+from apps.subscriptions.choices import SubscriptionType, SubscriptionStatus, SubscriptionDetailStatus
+
+from utils.redis import get_redis
 
 WALLET_CREATION_RESPONSE = json.loads(
     """
@@ -164,3 +180,419 @@ class AccountTest(TestCase):
             headers={'Authorization': f'Signature {self.keypair.pubkey()}:{signature}'},
         )
         self.assertEqual(response.status_code, 200)
+
+
+def create_subscribers(creator, count, name='fan', expires_in=datetime.timedelta(days=1)):
+    subscription = FreeSubscription.objects.create(creator=creator, status=SubscriptionStatus.ACTIVE)
+    subscribers = Creator.objects.bulk_create(
+        Creator(
+            moniker=f'{creator.moniker}-{name}-{i}',
+            address=f'{creator.address[:30]}-{name}-{i}',
+            image_url='https://google.com',
+            banner_url='https://google.com',
+            subscription_type=SubscriptionType.FREE,
+        )
+        for i in range(count)
+    )
+    subscription_type = ContentType.objects.get_for_model(FreeSubscription)
+    return SubscriptionDetail.objects.bulk_create(
+        SubscriptionDetail(
+            creator=creator,
+            subscriber=subscriber,
+            subscription_type=subscription_type,
+            subscription_id=subscription.id,
+            expires_at=timezone.now() + expires_in,
+            status=SubscriptionDetailStatus.ACTIVE,
+        )
+        for subscriber in subscribers
+    )
+
+
+class CreatorProfileTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.keypair = Keypair()
+        with patch(target='services.circle.CircleAPI._request', return_value=WALLET_CREATION_RESPONSE):
+            self.creator = Creator.objects.create(
+                moniker='profile.sol',
+                address=str(self.keypair.pubkey()),
+                image_url='https://google.com',
+                banner_url='https://google.com',
+                subscription_type=SubscriptionType.MONETARY,
+            )
+        MonetarySubscription.objects.create(
+            creator=self.creator, amount=Decimal('5'), status=SubscriptionStatus.ACTIVE
+        )
+        Content.objects.bulk_create(
+            Content(creator=self.creator, caption=f'Content {i}', content_type='free') for i in range(3)
+        )
+        create_subscribers(self.creator, 4)
+        create_subscribers(self.creator, 2, name='lapsed', expires_in=-datetime.timedelta(days=1))
+
+    def test_profile_is_served_from_annotations(self):
+        # the creator with its counts and the monetary plan, then nothing at all once the profile is cached.
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/creators/{self.keypair.pubkey()}')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'/creators/{self.keypair.pubkey()}').json(), response.json())
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['contents_count'], 3)
+        self.assertEqual(data['subscribers_count'], 4)
+        self.assertEqual(data['is_subscribed'], False)
+        self.assertEqual(data['subscription_info'], {'amount': 5.0})
+        self.assertNotIn('wallet', data)
+
+    def test_profile_is_subscribed(self):
+        subscriber = (
+            SubscriptionDetail.objects.filter(creator=self.creator, expires_at__gt=timezone.now()).first().subscriber
+        )
+        self.client.force_authenticate(user=subscriber)
+        response = self.client.get(f'/creators/{self.keypair.pubkey()}')
+        self.assertEqual(response.json()['data']['is_subscribed'], True)
+        self.assertNotIn('wallet', response.json()['data'])
+
+        self.client.force_authenticate(user=self.creator)
+        response = self.client.get(f'/creators/{self.keypair.pubkey()}')
+        self.assertEqual(response.json()['data']['is_subscribed'], False)
+        self.assertEqual(response.json()['data']['wallet']['id'], str(self.creator.wallet.id))
+
+    def test_profile_is_invalidated(self):
+        path = f'/creators/{self.keypair.pubkey()}'
+        self.client.get(path)
+
+        content = Content.objects.create(creator=self.creator, caption='Fresh', content_type='free')
+        self.assertEqual(self.client.get(path).json()['data']['contents_count'], 4)
+
+        content.delete()
+        SubscriptionDetail.objects.filter(creator=self.creator, expires_at__gt=timezone.now()).first().delete()
+        self.assertEqual(self.client.get(path).json()['data']['contents_count'], 3)
+        self.assertEqual(self.client.get(path).json()['data']['subscribers_count'], 3)
+
+        plan = self.creator.monetary_subscriptions.get()
+        plan.amount = Decimal('7')
+        plan.save()
+        self.assertEqual(self.client.get(path).json()['data']['subscription_info'], {'amount': 7.0})
+
+        self.creator.bio = 'Updated'
+        self.creator.save()
+        self.assertEqual(self.client.get(path).json()['data']['bio'], 'Updated')
+
+    def test_profile_etag(self):
+        path = f'/creators/{self.keypair.pubkey()}'
+        etag = self.client.get(path)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # the viewer specific parts of the profile are part of its ETag as well.
+        self.client.force_authenticate(user=self.creator)
+        self.assertEqual(self.client.get(path, headers={'If-None-Match': etag}).status_code, 200)
+        self.client.force_authenticate(user=None)
+
+        self.creator.bio = 'Updated'
+        self.creator.save()
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@tag('benchmark')
+class CreatorProfileBenchmark(TestCase):
+    subscribers = int(os.environ.get('BENCHMARK_ROWS', 100_000))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.keypair = Keypair()
+        with patch(target='services.circle.CircleAPI._request', return_value=WALLET_CREATION_RESPONSE):
+            cls.creator = Creator.objects.create(
+                moniker='popular.sol',
+                address=str(cls.keypair.pubkey()),
+                image_url='https://google.com',
+                banner_url='https://google.com',
+                subscription_type=SubscriptionType.FREE,
+            )
+        create_subscribers(cls.creator, cls.subscribers)
+
+    def test_profile_timing(self):
+        client, path = APIClient(), f'/creators/{self.keypair.pubkey()}'
+        with self.assertNumQueries(1):
+            response = client.get(path)
+        self.assertEqual(response.json()['data']['subscribers_count'], self.subscribers)
+
+        def timed_request(cached):
+            if not cached:
+                invalidate_profile(self.creator.address)
+
+            started_at = time.perf_counter()
+            client.get(path)
+            return time.perf_counter() - started_at
+
+        for cached, label in ((False, 'uncached'), (True, 'cached')):
+            timings = sorted(timed_request(cached) for _ in range(20))
+            print(  # noqa: T201
+                f'\n{self.subscribers} subscribers, {label}: '
+                f'median {timings[len(timings) // 2] * 1000:.2f}ms, max {timings[-1] * 1000:.2f}ms per profile',
+            )
+
+
+def build_creators(*monikers, **fields):
+    return Creator.objects.bulk_create(
+        Creator(
+            moniker=moniker,
+            address=fields.get('address', f'{moniker}-address'),
+            image_url='https://google.com',
+            banner_url='https://google.com',
+            subscription_type=SubscriptionType.FREE,
+        )
+        for moniker in monikers
+    )
+
+
+class CreatorSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        (self.searcher,) = build_creators('searcher.sol')
+        self.client.force_authenticate(user=self.searcher)
+        build_creators('bigalice', 'Alice.sol', 'alice', 'bob.sol', 'alicia')
+        get_redis().delete(prefix_search_cache_key('al'))
+
+    def search(self, q, **params):
+        return self.client.get('/creators/search', data={'q': q, **params}).json()['data']
+
+    def test_search_ranks_exact_then_prefix_then_substring_matches(self):
+        response = self.search(' ALICE ')
+        self.assertEqual([creator['moniker'] for creator in response['results']], ['alice', 'Alice.sol', 'bigalice'])
+        self.assertIsNone(response['next'])
+
+        response = self.search('bob.sol-addr')
+        self.assertEqual([creator['moniker'] for creator in response['results']], ['bob.sol'])
+
+        Creator.objects.filter(moniker='bob.sol').update(moniker='robert.sol', address='robert.sol-address')
+        self.assertEqual(self.search('bob.sol')['results'], [])
+        self.assertEqual([creator['moniker'] for creator in self.search('robert')['results']], ['robert.sol'])
+
+    def test_search_short_queries_match_prefixes_from_cache(self):
+        response = self.search('al')
+        self.assertEqual(
+            [creator['moniker'] for creator in response['results']],
+            ['alice', 'alicia', 'Alice.sol'],
+        )
+
+        build_creators('alan')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('al'), response)
+
+    def test_search_is_paginated(self):
+        build_creators(*(f'page-{i:02}' for i in range(25)))
+        response = self.search('page-')
+        self.assertEqual(len(response['results']), 10)
+        self.assertEqual(response['results'][0]['moniker'], 'page-00')
+        self.assertIsNone(response['previous'])
+
+        response = self.client.get(response['next']).json()['data']
+        self.assertEqual(response['results'][0]['moniker'], 'page-10')
+        self.assertNotIn('page=', response['previous'])
+
+        response = self.client.get(response['next']).json()['data']
+        self.assertEqual([creator['moniker'] for creator in response['results']][-1], 'page-24')
+        self.assertEqual(len(response['results']), 5)
+        self.assertIsNone(response['next'])
+
+    def test_search_requires_a_query(self):
+        self.assertEqual(self.client.get('/creators/search', data={'q': '  '}).status_code, 400)
+        self.assertEqual(self.client.get('/creators/search').status_code, 400)
+
+
+@tag('benchmark')
+class CreatorSearchBenchmark(TestCase):
+    creators = int(os.environ.get('BENCHMARK_ROWS', 1_000_000))
+
+    @classmethod
+    def setUpTestData(cls):
+        # monikers with scattered prefixes, so that a short query matches a realistic slice of the creators.
+        monikers = (f'{i * 2654435761 % 2**32:08x}.sol' for i in range(cls.creators))
+        batch_size = 50_000
+        while batch := list(itertools.islice(monikers, batch_size)):
+            build_creators(*batch)
+
+        cls.searcher = Creator.objects.first()
+
+    def test_search_timing(self):
+        client = APIClient()
+        client.force_authenticate(user=self.searcher)
+        queries = {
+            'exact': self.searcher.moniker,
+            'prefix': self.searcher.moniker[:4],
+            'substring': self.searcher.moniker[2:7],
+        }
+        for name, q in (*queries.items(), ('short', 'ab')):
+            get_redis().delete(prefix_search_cache_key(q))
+            timings = []
+            for _ in range(5):
+                started_at = time.perf_counter()
+                response = client.get('/creators/search', data={'q': q})
+                timings.append(time.perf_counter() - started_at)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()['results'])
+            print(  # noqa: T201
+                f'\n{self.creators} creators, {name} query {q!r}: first {timings[0] * 1000:.2f}ms, '
+                f'best {min(timings) * 1000:.2f}ms',
+            )
+
+
+class MonikerAvailabilityTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        build_creators('alice.sol', 'alicia.sol', 'bob.sol')
+        moniker_registry.clear()
+        self.addCleanup(moniker_registry.clear)
+
+    def test_moniker_availability_is_answered_from_memory(self):
+        self.assertEqual(self.client.get('/creators/moniker-availability', data={'q': 'carol.sol'}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/creators/moniker-availability', data={'q': 'Alice.sol'})
+            self.assertEqual(response.status_code, 409)
+            response = self.client.get('/creators/moniker-availability', data={'q': 'dave.sol'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_moniker_index_follows_created_and_deleted_creators(self):
+        moniker_registry.get()
+        with (
+            self.captureOnCommitCallbacks(execute=True),
+            patch(target='services.circle.CircleAPI._request', return_value=WALLET_CREATION_RESPONSE),
+        ):
+            creator = Creator.objects.create(
+                moniker='carol.sol',
+                address=str(Keypair().pubkey()),
+                image_url='https://google.com',
+                banner_url='https://google.com',
+                subscription_type=SubscriptionType.FREE,
+            )
+        self.assertEqual(self.client.get('/creators/moniker-availability', data={'q': 'carol.sol'}).status_code, 409)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            creator.delete()
+        self.assertEqual(self.client.get('/creators/moniker-availability', data={'q': 'carol.sol'}).status_code, 200)
+
+    def test_moniker_index_follows_renamed_creators(self):
+        moniker_registry.get()
+        creator = Creator.objects.get(moniker='bob.sol')
+        creator.moniker = 'robert.sol'
+        with self.captureOnCommitCallbacks(execute=True):
+            creator.save()
+        self.assertEqual(self.client.get('/creators/moniker-availability', data={'q': 'bob.sol'}).status_code, 200)
+        self.assertEqual(self.client.get('/creators/moniker-availability', data={'q': 'robert.sol'}).status_code, 409)
+
+        # saving other fields leaves the moniker where it is.
+        with self.captureOnCommitCallbacks(execute=True):
+            creator.save(update_fields=['bio'])
+        self.assertEqual(self.client.get('/creators/moniker-availability', data={'q': 'robert.sol'}).status_code, 409)
+
+    def test_moniker_suggestions(self):
+        response = self.client.get('/creators/moniker-suggestions', data={'q': 'ALI'})
+        self.assertEqual(response.json()['data'], ['alice.sol', 'alicia.sol'])
+
+        response = self.client.get('/creators/moniker-suggestions', data={'q': 'carol'})
+        self.assertEqual(response.json()['data'], [])
+        self.assertEqual(self.client.get('/creators/moniker-suggestions').status_code, 400)
+
+
+class MonikerIndexTest(SimpleTestCase):
+    def test_membership_and_prefixes(self):
+        index = MonikerIndex(f'creator-{i}.sol' for i in range(1000))
+        self.assertIn('creator-999.sol', index)
+        self.assertNotIn('creator-1000.sol', index)
+        self.assertEqual(
+            index.with_prefix('creator-99', limit=3), ['creator-99.sol', 'creator-990.sol', 'creator-991.sol']
+        )
+        self.assertEqual(index.with_prefix('zed'), [])
+
+        index.add('creator-1000.sol')
+        index.add('creator-1000.sol')
+        self.assertIn('creator-1000.sol', index)
+        self.assertEqual(len(index), 1001)
+
+        index.discard('creator-0.sol')
+        self.assertNotIn('creator-0.sol', index)
+        self.assertEqual(index.monikers, sorted(index.monikers))
+
+    def test_false_positive_rate(self):
+        index = MonikerIndex(f'creator-{i}.sol' for i in range(10_000))
+        false_positives = sum(f'other-{i}.sol' in index.bloom for i in range(10_000))
+        self.assertLess(false_positives, 200)
+
+
+@tag('benchmark')
+class MonikerIndexBenchmark(SimpleTestCase):
+    monikers = int(os.environ.get('BENCHMARK_ROWS', 1_000_000))
+
+    def test_lookup_timing(self):
+        started_at = time.perf_counter()
+        index = MonikerIndex(f'{i * 2654435761 % 2**32:08x}.sol' for i in range(self.monikers))
+        print(f'\nindexed {self.monikers} monikers in {time.perf_counter() - started_at:.2f}s')  # noqa: T201
+
+        lookups = {
+            'taken': [f'{i * 2654435761 % 2**32:08x}.sol' for i in range(0, self.monikers, 97)],
+            'available': [f'{i:08x}.eth' for i in range(10_000)],
+            'prefix': [f'{i:04x}' for i in range(10_000)],
+        }
+        for name, keys in lookups.items():
+            lookup = index.with_prefix if name == 'prefix' else index.__contains__
+            started_at = time.perf_counter()
+            for key in keys:
+                lookup(key)
+            print(  # noqa: T201
+                f'{name}: {(time.perf_counter() - started_at) / len(keys) * 1_000_000:.2f}µs per lookup',
+            )
+
+
+class SuggestedCreatorsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        get_redis().delete(SUGGESTIONS_KEY)
+        self.addCleanup(get_redis().delete, SUGGESTIONS_KEY)
+
+        self.viewer, self.busy, self.popular, self.verified = build_creators(
+            'viewer.sol',
+            'busy.sol',
+            'popular.sol',
+            'verified.sol',
+        )
+        Creator.objects.filter(id=self.verified.id).update(is_verified=True)
+        Content.objects.bulk_create(Content(creator=self.busy, caption='Busy', content_type='free') for _ in range(6))
+        create_subscribers(self.popular, 3)
+        SubscriptionDetail.objects.create(
+            creator=self.popular,
+            subscriber=self.viewer,
+            subscription_type=ContentType.objects.get_for_model(FreeSubscription),
+            subscription_id=FreeSubscription.objects.get(creator=self.popular).id,
+            expires_at=timezone.now() + datetime.timedelta(days=1),
+            status=SubscriptionDetailStatus.ACTIVE,
+        )
+        self.client.force_authenticate(user=self.viewer)
+
+    def test_suggestions_are_ranked_without_followed_creators(self):
+        rank_suggested_creators.call_local()
+        with self.assertNumQueries(2):
+            response = self.client.get('/creators/suggestions')
+
+        monikers = [creator['moniker'] for creator in response.json()['data']['results']]
+        self.assertEqual(monikers[:2], ['busy.sol', 'verified.sol'])
+        self.assertNotIn('popular.sol', monikers)
+        self.assertNotIn('viewer.sol', monikers)
+
+    def test_suggestions_are_paginated(self):
+        build_creators(*(f'quiet-{i}.sol' for i in range(10)))
+        response = self.client.get('/creators/suggestions').json()['data']
+        self.assertEqual(len(response['results']), 10)
+
+        next_page = self.client.get(response['next']).json()['data']
+        suggested = [creator['id'] for creator in response['results'] + next_page['results']]
+        self.assertEqual(len(suggested), Creator.objects.count() - 2)
+        self.assertEqual(len(set(suggested)), len(suggested))
+        self.assertIsNone(next_page['next'])
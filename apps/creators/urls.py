@@ -6,6 +6,7 @@ from .views import (
     CreatorCreationAPIView,
     SuggestedCreatorAPIView,
     CreatorWithdrawalAPIView,
+    MonikerSuggestionsAPIView,
     MonikerAvailabilityAPIView,
 )
 
@@ -23,5 +24,6 @@ urlpatterns = [
         MonikerAvailabilityAPIView.as_view(),
         name='moniker-availability',
     ),
+    path('moniker-suggestions', MonikerSuggestionsAPIView.as_view(), name='moniker-suggestions'),
     path('<str:address>', CreatorAPIView.as_view(), name='creator-detail'),
 ]
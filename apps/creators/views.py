@@ -1,30 +1,50 @@
+import json
 from typing import ClassVar
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
-from django.db.models import Q
 from django.conf import settings
+from django.utils import timezone
+from django.utils.http import parse_etags
 from django.db import IntegrityError, transaction
+from django.utils.cache import patch_vary_headers
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import OuterRef, prefetch_related_objects
 
 from rest_framework.views import APIView
+from rest_framework.response import Response
 from rest_framework import status, serializers
-from rest_framework.generics import ListAPIView, GenericAPIView, RetrieveAPIView, get_object_or_404
+from rest_framework.generics import GenericAPIView, RetrieveAPIView, get_object_or_404
 
+from apps.contents.models import Content
 from apps.transactions.models import Transaction
+from apps.subscriptions.models import SubscriptionDetail
 from apps.contents.serializers import WithdrawalSerializer
+from apps.subscriptions.choices import SubscriptionType, SubscriptionDetailStatus
 
 from services.circle import CircleAPI
 
-from utils.pagination import CustomCursorPagination
-from utils.constants import PERCENTAGE_CUT_FROM_WITHDRAWALS
+from utils.models import count_subquery
+from utils.pagination import RankedPagination
 from utils.responses import error_response, success_response
+from utils.constants import ZERO, PERCENTAGE_CUT_FROM_WITHDRAWALS
 
-from .models import Creator
 from .choices import Blockchain
+from .models import Wallet, Creator
+from .monikers import moniker_registry
 from .exceptions import BadGatewayError
 from .permissions import IsAuthenticated
-from .serializers import CreatorSerializer, MinimalCreatorSerializer, CreatorCreationSerializer
+from .suggestions import suggestions_for
+from .profiles import profile_etag, cache_profile, get_cached_profile
+from .search import search_prefix, is_prefix_query, normalize_query, search_creators
+from .serializers import WalletSerializer, PublicCreatorSerializer, MinimalCreatorSerializer, CreatorCreationSerializer
+
+# the plan `PublicCreatorSerializer.get_subscription_info` reads for each subscription type.
+SUBSCRIPTION_PLANS = {
+    SubscriptionType.NFT: 'nft_subscriptions',
+    SubscriptionType.MONETARY: 'monetary_subscriptions',
+}
 
 
 class CreatorCreationAPIView(GenericAPIView):
@@ -45,31 +65,66 @@ class CreatorCreationAPIView(GenericAPIView):
 
 class CreatorAPIView(RetrieveAPIView):
     lookup_field = 'address'
-    serializer_class = CreatorSerializer
+    serializer_class = PublicCreatorSerializer
     permission_classes: ClassVar[list] = []
-    queryset = Creator.objects.select_related('wallet').prefetch_related(
-        'wallet__deposit_addresses',
-        'contents',
-        'subscribers',
-        'nft_subscriptions',
-        'monetary_subscriptions',
-    )
+
+    def get_queryset(self):
+        # the counts are computed by correlated subqueries in the same statement instead of prefetching every content
+        # and subscriber row, and the subscription plan is loaded separately in `get_object` as only one kind applies.
+        active_subscribers = SubscriptionDetail.objects.filter(
+            creator=OuterRef('pk'),
+            status=SubscriptionDetailStatus.ACTIVE,
+            expires_at__gte=timezone.now(),
+        )
+        return Creator.objects.annotate(
+            contents_count=count_subquery(Content.objects.filter(creator=OuterRef('pk'))),
+            subscribers_count=count_subquery(active_subscribers),
+        )
 
     def retrieve(self, request, *args, **kwargs):
-        response = super().retrieve(request, *args, **kwargs)
-        return success_response(data=response.data, status_code=response.status_code)
+        address = self.kwargs['address']
+        profile = get_cached_profile(address)
+        if profile is None:
+            profile = cache_profile(address, self.get_serializer(self.get_object()).data)
+
+        data = json.loads(profile)
+        data['is_subscribed'] = not isinstance(request.user, AnonymousUser) and (
+            SubscriptionDetail.objects.filter(
+                creator_id=data['id'],
+                subscriber=request.user,
+                status=SubscriptionDetailStatus.ACTIVE,
+            ).exists()
+        )
+        if getattr(request.user, 'address', None) == address:
+            wallet = Wallet.objects.prefetch_related('deposit_addresses').get(creator=request.user)
+            data['wallet'] = WalletSerializer(wallet).data
+
+        etag = profile_etag(profile, data['is_subscribed'], data.get('wallet'))
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = success_response(data=data)
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Authorization',))
+        return response
 
     def get_object(self):
         qs = self.get_queryset()
         obj = get_object_or_404(qs, address=self.kwargs['address'])
         self.check_object_permissions(self.request, obj)
 
+        plans = SUBSCRIPTION_PLANS.get(obj.subscription_type)
+        if plans is not None:
+            prefetch_related_objects([obj], plans)
+
         return obj
 
 
-class SearchCreatorsAPIView(APIView):
+class SearchCreatorsAPIView(GenericAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = MinimalCreatorSerializer
+    pagination_class = RankedPagination
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -82,15 +137,15 @@ class SearchCreatorsAPIView(APIView):
         ],
     )
     def get(self, request, *args, **kwargs):
-        q = request.query_params.get('q')
-        if q is None:
+        term = normalize_query(request.query_params.get('q', ''))
+        if not term:
             raise serializers.ValidationError('`q` query parameter is required.')
 
-        # This can be improved to use Postgres FTS but for now this should be sufficient.
-        qs = Creator.objects.filter(Q(address__icontains=q) | Q(moniker__icontains=q))
-        serializer = MinimalCreatorSerializer(qs, many=True)
+        if is_prefix_query(term):
+            return success_response(self.get_paginated_response(self.paginate_queryset(search_prefix(term))).data)
 
-        return success_response(serializer.data)
+        page = self.paginate_queryset(search_creators(term))
+        return success_response(self.get_paginated_response(self.get_serializer(page, many=True).data).data)
 
 
 class MonikerAvailabilityAPIView(APIView):
@@ -111,8 +166,8 @@ class MonikerAvailabilityAPIView(APIView):
         if q is None:
             raise serializers.ValidationError('`q` query parameter is required.')
 
-        qs = Creator.objects.filter(moniker=q.lower())
-        if qs.exists():
+        # answered from this process' index of taken monikers, creating a creator is what checks the database.
+        if q.lower() in moniker_registry.get():
             return error_response(
                 message='Moniker is already taken.',
                 errors=[],
@@ -122,6 +177,27 @@ class MonikerAvailabilityAPIView(APIView):
         return success_response(data='Moniker is available to use.')
 
 
+class MonikerSuggestionsAPIView(APIView):
+    permission_classes: ClassVar[list] = []
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'q',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='Start of a moniker to list the taken monikers it is a prefix of',
+            ),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        q = request.query_params.get('q')
+        if not q:
+            raise serializers.ValidationError('`q` query parameter is required.')
+
+        return success_response(data=moniker_registry.get().with_prefix(q.lower()))
+
+
 class CreatorWithdrawalAPIView(GenericAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = WithdrawalSerializer
@@ -132,13 +208,14 @@ class CreatorWithdrawalAPIView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         amount = serializer.validated_data['amount']
+        payout = (PERCENTAGE_CUT_FROM_WITHDRAWALS * amount).quantize(ZERO)
         with transaction.atomic():
-            self.request.user.wallet.withdraw(amount)
+            self.request.user.wallet.withdraw(amount, fee=amount - payout)
             circle_api = CircleAPI(api_key=settings.CIRCLE_API_KEY, base_url=settings.CIRCLE_API_BASE_URL)
 
             withdrawal_response = circle_api.make_withdrawal(
                 chain=Blockchain.SOLANA.value,
-                amount=PERCENTAGE_CUT_FROM_WITHDRAWALS * amount,
+                amount=payout,
                 destination_address=self.request.user.address,
                 master_wallet_id=settings.CIRCLE_MASTER_WALLET_ID,
             )
@@ -154,14 +231,14 @@ class CreatorWithdrawalAPIView(GenericAPIView):
         return success_response('Withdrawal is being processed.')
 
 
-class SuggestedCreatorAPIView(ListAPIView):
+class SuggestedCreatorAPIView(GenericAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = MinimalCreatorSerializer
-    pagination_class = CustomCursorPagination
-
-    def get_queryset(self):
-        return Creator.objects.all().exclude(address=self.request.user.address)
+    pagination_class = RankedPagination
 
     def get(self, request, *args, **kwargs):
-        response = self.list(request, args, kwargs)
-        return success_response(response.data)
+        # pages through the stored ranking, only the creators of the page itself are fetched.
+        page = self.paginate_queryset(suggestions_for(request.user))
+        creators = {str(creator.id): creator for creator in Creator.objects.filter(id__in=page)}
+        serializer = self.get_serializer([creators[pk] for pk in page if pk in creators], many=True)
+        return success_response(self.get_paginated_response(serializer.data).data)
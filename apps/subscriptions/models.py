@@ -105,3 +105,7 @@ class SubscriptionDetail(UUIDModel, TimestampedModel, models.Model):
         constraints: ClassVar[list] = [
             models.UniqueConstraint(fields=('creator', 'subscriber'), name='creator_subscriber_unique'),
         ]
+        indexes: ClassVar[list] = [
+            # profile subscriber counts only read a creator's active, unexpired slice of this index.
+            models.Index(fields=('creator', 'status', 'expires_at'), name='subscription_detail_active_idx'),
+        ]
@@ -9,6 +9,7 @@ from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 
 from apps.transactions.models import Transaction
+from apps.transactions.choices import LedgerCategory
 
 from services.sharingan import SharinganService
 
@@ -105,7 +106,11 @@ def process_subscription_detail_renewal(
             instance.save()
             return
 
-        instance.subscriber.wallet.transfer(amount=subscription.amount, recipient=instance.creator.wallet)
+        instance.subscriber.wallet.transfer(
+            amount=subscription.amount,
+            recipient=instance.creator.wallet,
+            category=LedgerCategory.SUBSCRIPTION,
+        )
         Transaction.create_subscription(
             creator=instance.creator,
             subscriber=instance.subscriber,
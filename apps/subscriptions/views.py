@@ -14,6 +14,7 @@ from rest_framework.mixins import CreateModelMixin
 
 from apps.creators.models import Creator
 from apps.transactions.models import Transaction
+from apps.transactions.choices import LedgerCategory
 from apps.creators.permissions import IsAuthenticated
 
 from services.sharingan import SharinganService
@@ -211,7 +212,7 @@ class SubscribeToCreatorAPIView(APIView):
                     'Top up your balance and try again.',
                 )
 
-            subscriber.wallet.transfer(monetary_subscription.amount, creator.wallet)
+            subscriber.wallet.transfer(monetary_subscription.amount, creator.wallet, LedgerCategory.SUBSCRIPTION)
             Transaction.create_subscription(monetary_subscription.amount, creator, subscriber)
 
             subscription_info.status = SubscriptionDetailStatus.ACTIVE
@@ -225,7 +226,7 @@ class SubscribeToCreatorAPIView(APIView):
                 'Top up your balance and try again.',
             )
 
-        subscriber.wallet.transfer(monetary_subscription.amount, creator.wallet)
+        subscriber.wallet.transfer(monetary_subscription.amount, creator.wallet, LedgerCategory.SUBSCRIPTION)
         Transaction.create_subscription(monetary_subscription.amount, creator, subscriber)
 
         return SubscriptionDetail.objects.create(
@@ -11,3 +11,19 @@ class TransactionStatus(models.TextChoices):
     PENDING = 'pending'
     FAILED = 'failed'
     SUCCESSFUL = 'successful'
+
+
+class LedgerAccount(models.TextChoices):
+    WALLET = 'wallet'
+    EXTERNAL = 'external'
+    PLATFORM = 'platform'
+
+
+class LedgerCategory(models.TextChoices):
+    FEE = 'fee'
+    DEPOSIT = 'deposit'
+    OPENING = 'opening'
+    TRANSFER = 'transfer'
+    WITHDRAWAL = 'withdrawal'
+    SUBSCRIPTION = 'subscription'
+    CONTENT_PURCHASE = 'content purchase'
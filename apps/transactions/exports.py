@@ -0,0 +1,43 @@
+import io
+import csv
+import itertools
+from collections.abc import Iterable, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = ('id', 'created_at', 'tx_type', 'status', 'amount', 'narration')
+
+# Rows are pulled from the database cursor and written out in batches of this size, which keeps both the memory
+# held by the export and the number of chunks handed to the WSGI server bounded regardless of the row count.
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _batches(rows: Iterable[tuple], size: int = EXPORT_CHUNK_SIZE) -> Iterator[list[tuple]]:
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+def stream_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def stream_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder()
+    for batch in _batches(rows):
+        yield ''.join(f'{encoder.encode(dict(zip(EXPORT_FIELDS, row, strict=True)))}\n' for row in batch)
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', stream_csv),
+    'ndjson': ('application/x-ndjson', stream_ndjson),
+}
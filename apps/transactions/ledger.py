@@ -0,0 +1,240 @@
+"""Double-entry ledger that owns every change to `Wallet.balance`.
+
+Each money movement is one conditional `UPDATE ... RETURNING balance` per wallet plus one multi-row insert of its
+ledger legs. `BalanceSnapshot`s keep re-deriving a balance from the ledger proportional to the entries written
+since the latest snapshot.
+"""
+import uuid
+from decimal import Decimal
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from django.utils import timezone
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum, Exists, OuterRef, QuerySet, Subquery
+
+from apps.creators.exceptions import InsufficientBalanceError
+
+from utils.constants import ZERO
+
+from .models import LedgerEntry, BalanceSnapshot
+from .choices import LedgerAccount, LedgerCategory
+
+if TYPE_CHECKING:
+    from apps.creators.models import Wallet
+
+# Entries younger than this are left for the next consumer run so that a movement whose transaction is still in
+# flight (and therefore holds a lower, not yet visible, id) is never skipped over.
+SETTLEMENT_LAG = timedelta(minutes=1)
+
+# wallets locked, and opened, in each transaction of `record_opening_balances`.
+OPENING_BATCH_SIZE = 500
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value)).quantize(ZERO)
+
+
+def _apply_delta(wallet: 'Wallet', amount: Decimal) -> Decimal | None:
+    """Add `amount` to the wallet's balance, refusing to take it below zero, and return the new balance.
+
+    Returns `None` when the wallet does not have enough funds for a debit.
+    """
+    table = connection.ops.quote_name(wallet._meta.db_table)  # noqa: SLF001
+    wallet_id = wallet._meta.pk.get_db_prep_value(wallet.pk, connection)  # noqa: SLF001
+    with connection.cursor() as cursor:
+        if amount < ZERO:
+            cursor.execute(
+                f'UPDATE {table} SET balance = balance + %s WHERE id = %s AND balance >= %s RETURNING balance',  # noqa: S608
+                [amount, wallet_id, -amount],
+            )
+        else:
+            cursor.execute(
+                f'UPDATE {table} SET balance = balance + %s WHERE id = %s RETURNING balance',  # noqa: S608
+                [amount, wallet_id],
+            )
+        row = cursor.fetchone()
+
+    return None if row is None else _to_decimal(row[0])
+
+
+def _raise_insufficient_balance(wallet: 'Wallet', action: str, amount: Decimal):
+    balance = type(wallet).objects.values_list('balance', flat=True).get(pk=wallet.pk)
+    raise InsufficientBalanceError(f'Your balance is {balance} while attempting to {action} {amount}')
+
+
+def _legs(*legs: tuple['Wallet | LedgerAccount', Decimal, LedgerCategory], narration: str) -> list[LedgerEntry]:
+    """Build the legs of one movement. Each leg is booked either against a wallet or a non-wallet account."""
+    reference = uuid.uuid4()
+    return [
+        LedgerEntry(
+            amount=amount,
+            category=category,
+            reference=reference,
+            narration=narration,
+            wallet=None if isinstance(holder, LedgerAccount) else holder,
+            account=holder if isinstance(holder, LedgerAccount) else LedgerAccount.WALLET,
+        )
+        for holder, amount, category in legs
+    ]
+
+
+@transaction.atomic()
+def top_up(wallet: 'Wallet', amount: Decimal, narration: str = '') -> Decimal:
+    """Credit money coming into the platform to `wallet` and return its new balance."""
+    balance = _apply_delta(wallet, amount)
+    LedgerEntry.objects.bulk_create(
+        _legs(
+            (LedgerAccount.EXTERNAL, -amount, LedgerCategory.DEPOSIT),
+            (wallet, amount, LedgerCategory.DEPOSIT),
+            narration=narration,
+        ),
+    )
+    return balance
+
+
+@transaction.atomic()
+def withdraw(wallet: 'Wallet', amount: Decimal, fee: Decimal = ZERO, narration: str = '') -> Decimal:
+    """Debit money leaving the platform from `wallet` and return its new balance.
+
+    `fee` is the part of `amount` kept by the platform instead of being paid out.
+    """
+    balance = _apply_delta(wallet, -amount)
+    if balance is None:
+        _raise_insufficient_balance(wallet, 'withdraw', amount)
+
+    legs = [
+        (wallet, -(amount - fee), LedgerCategory.WITHDRAWAL),
+        (LedgerAccount.EXTERNAL, amount - fee, LedgerCategory.WITHDRAWAL),
+    ]
+    if fee:
+        legs += [(wallet, -fee, LedgerCategory.FEE), (LedgerAccount.PLATFORM, fee, LedgerCategory.FEE)]
+
+    LedgerEntry.objects.bulk_create(_legs(*legs, narration=narration))
+    return balance
+
+
+@transaction.atomic()
+def transfer(
+    sender: 'Wallet',
+    recipient: 'Wallet',
+    amount: Decimal,
+    category: LedgerCategory = LedgerCategory.TRANSFER,
+    narration: str = '',
+) -> tuple[Decimal, Decimal]:
+    """Move `amount` from `sender` to `recipient` and return both new balances.
+
+    Wallet rows are always updated in primary key order so that opposing transfers cannot deadlock.
+    """
+    balances = {}
+    for wallet, delta in sorted(((sender, -amount), (recipient, amount)), key=lambda leg: leg[0].pk):
+        balances[wallet.pk] = _apply_delta(wallet, delta)
+        if balances[wallet.pk] is None:
+            _raise_insufficient_balance(sender, 'transfer', amount)
+
+    LedgerEntry.objects.bulk_create(
+        _legs((sender, -amount, category), (recipient, amount, category), narration=narration)
+    )
+    return balances[sender.pk], balances[recipient.pk]
+
+
+def settled_entries(after_id: int) -> QuerySet[LedgerEntry]:
+    """Entries after `after_id` up to, but excluding, the first one written within `SETTLEMENT_LAG`.
+
+    Cutting at the first unsettled id (rather than filtering on `created_at`) keeps the result a contiguous range of
+    ids, so consumers can safely advance their high-water mark to its maximum.
+    """
+    entries = LedgerEntry.objects.filter(id__gt=after_id)
+    first_unsettled_id = entries.filter(created_at__gt=timezone.now() - SETTLEMENT_LAG).aggregate(
+        first_unsettled_id=Min('id'),
+    )['first_unsettled_id']
+    if first_unsettled_id is not None:
+        entries = entries.filter(id__lt=first_unsettled_id)
+
+    return entries
+
+
+def ledger_balance(wallet: 'Wallet') -> Decimal:
+    """Re-derive the balance of `wallet` from its latest snapshot and the ledger entries written after it."""
+    snapshot = wallet.balance_snapshots.order_by('-last_entry_id').first()
+    balance, last_entry_id = (ZERO, 0) if snapshot is None else (snapshot.balance, snapshot.last_entry_id)
+
+    delta = wallet.ledger_entries.filter(id__gt=last_entry_id).aggregate(total=Sum('amount'))['total']
+    return balance + (delta or ZERO)
+
+
+def record_opening_balances(batch_size: int = OPENING_BATCH_SIZE) -> int:
+    """Book the balance of wallets that predate the ledger as an opening movement from the external account.
+
+    It is run once, by the `record_opening_balances` command, when the ledger is deployed. Only wallets without any
+    ledger entry are opened, any other difference between a balance and the ledger is drift that
+    `reconcile_wallet_balances` reports. Returns the number of wallets opened.
+    """
+    from apps.creators.models import Wallet  # pylint: disable=import-outside-toplevel
+
+    unopened = (
+        Wallet.objects.exclude(balance=ZERO)
+        .exclude(Exists(LedgerEntry.objects.filter(wallet=OuterRef('pk'))))
+        .order_by('pk')
+    )
+    opened, last_id = 0, None
+    while True:
+        with transaction.atomic():
+            batch = unopened if last_id is None else unopened.filter(pk__gt=last_id)
+            wallets = list(batch.select_for_update()[:batch_size])
+            if not wallets:
+                return opened
+
+            # checked again once the wallets are locked, as a movement committed since the batch was selected is only
+            # visible to a later statement, and one that is not committed yet waits for the lock.
+            moved = set(LedgerEntry.objects.filter(wallet__in=wallets).values_list('wallet', flat=True))
+            entries = []
+            for wallet in wallets:
+                if wallet.pk in moved:
+                    continue
+
+                entries.extend(
+                    _legs(
+                        (LedgerAccount.EXTERNAL, -wallet.balance, LedgerCategory.OPENING),
+                        (wallet, wallet.balance, LedgerCategory.OPENING),
+                        narration='Opening balance',
+                    ),
+                )
+                opened += 1
+
+            LedgerEntry.objects.bulk_create(entries)
+            last_id = wallets[-1].pk
+
+
+@transaction.atomic()
+def take_balance_snapshots() -> int:
+    """Snapshot every wallet that has ledger activity since the previous run and return how many were taken."""
+    previous_high_water = BalanceSnapshot.objects.aggregate(high_water=Max('last_entry_id'))['high_water'] or 0
+    high_water = settled_entries(previous_high_water).aggregate(high_water=Max('id'))['high_water']
+    if high_water is None:
+        return 0
+
+    deltas = dict(
+        LedgerEntry.objects.filter(id__gt=previous_high_water, id__lte=high_water, wallet__isnull=False)
+        .values('wallet')
+        .annotate(total=Sum('amount'))
+        .values_list('wallet', 'total'),
+    )
+    latest_snapshot = BalanceSnapshot.objects.filter(wallet=OuterRef('wallet')).order_by('-last_entry_id')
+    previous_balances = dict(
+        BalanceSnapshot.objects.filter(
+            wallet__in=deltas.keys(), id=Subquery(latest_snapshot.values('id')[:1])
+        ).values_list('wallet', 'balance'),
+    )
+
+    BalanceSnapshot.objects.bulk_create(
+        [
+            BalanceSnapshot(
+                wallet_id=wallet_id,
+                last_entry_id=high_water,
+                balance=previous_balances.get(wallet_id, ZERO) + delta,
+            )
+            for wallet_id, delta in deltas.items()
+        ],
+    )
+    return len(deltas)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.transactions.rollups import ROLLUP_BATCH_SIZE, rebuild_earnings
+
+
+class Command(BaseCommand):
+    help = 'Drop the daily earnings rollups and rebuild them from the ledger in batches.'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ROLLUP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batches = rebuild_earnings(batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt daily earnings from the ledger in {batches} batch(es).')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.transactions.ledger import OPENING_BATCH_SIZE, record_opening_balances
+
+
+class Command(BaseCommand):
+    help = 'Book the balance of the wallets without ledger entries as their opening balance.'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OPENING_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        opened = record_opening_balances(batch_size=options['batch_size'])
+        self.stdout.write(f'Recorded the opening balance of {opened} wallet(s).')
@@ -1,12 +1,12 @@
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, ClassVar
 
 from django.db import models, transaction
 
 from utils.models import UUIDModel, TimestampedModel
-from utils.constants import PERCENTAGE_CUT_FROM_WITHDRAWALS
+from utils.constants import ZERO, PERCENTAGE_CUT_FROM_WITHDRAWALS
 
-from .choices import TransactionType, TransactionStatus
+from .choices import LedgerAccount, LedgerCategory, TransactionType, TransactionStatus
 
 if TYPE_CHECKING:
     from apps.creators.models import Creator
@@ -90,3 +90,91 @@ class Transaction(UUIDModel, TimestampedModel, models.Model):
             narration='Flicks 10% cut from withdrawal',
         )
         cls.objects.bulk_create([withdrawal_tx, ten_percent_cut_tx])
+
+
+class LedgerEntry(models.Model):
+    """An append-only leg of a money movement.
+
+    Every movement writes at least two legs sharing a `reference` whose amounts sum to zero. Money entering or
+    leaving the platform (Circle deposits and withdrawals) is booked against the `EXTERNAL` account and fees kept by
+    Flicks against the `PLATFORM` account. The auto-incrementing primary key doubles as the sequence number used by
+    `BalanceSnapshot` and the earnings rollups.
+    """
+
+    reference = models.UUIDField('reference', db_index=True)
+    wallet = models.ForeignKey(
+        to='creators.Wallet',
+        verbose_name='wallet',
+        on_delete=models.PROTECT,
+        related_name='ledger_entries',
+        null=True,
+        blank=True,
+    )
+    account = models.CharField('account', max_length=10, choices=LedgerAccount.choices, blank=False)
+    category = models.CharField('category', max_length=20, choices=LedgerCategory.choices, blank=False)
+    amount = models.DecimalField('amount', max_digits=20, decimal_places=2, blank=False)
+    narration = models.TextField('narration', blank=True, default='')
+    created_at = models.DateTimeField('created at', auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes: ClassVar[list] = [models.Index(fields=('wallet', 'id'), name='ledger_entry_wallet_seq_idx')]
+
+    def __str__(self):
+        return f'{self.account} {self.amount}'
+
+
+class BalanceSnapshot(UUIDModel, TimestampedModel, models.Model):
+    """The balance of a wallet after applying every ledger entry up to and including `last_entry_id`."""
+
+    wallet = models.ForeignKey(
+        to='creators.Wallet',
+        verbose_name='wallet',
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots',
+        blank=False,
+    )
+    balance = models.DecimalField('balance', max_digits=20, decimal_places=2, blank=False)
+    last_entry_id = models.BigIntegerField('last ledger entry id', blank=False)
+
+    class Meta:
+        indexes: ClassVar[list] = [
+            models.Index(fields=('wallet', '-last_entry_id'), name='balance_snapshot_wallet_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.wallet_id} @ {self.last_entry_id}: {self.balance}'
+
+
+class LedgerCheckpoint(TimestampedModel, models.Model):
+    """High-water mark of the last ledger entry a background consumer has processed."""
+
+    name = models.CharField('name', max_length=50, unique=True, blank=False)
+    last_entry_id = models.BigIntegerField('last ledger entry id', default=0)
+
+    def __str__(self):
+        return f'{self.name} @ {self.last_entry_id}'
+
+
+class DailyEarnings(UUIDModel, TimestampedModel, models.Model):
+    """Per creator, per day rollup of the ledger maintained by `apps.transactions.rollups`."""
+
+    creator = models.ForeignKey(
+        to='creators.Creator',
+        verbose_name='creator',
+        on_delete=models.CASCADE,
+        related_name='daily_earnings',
+        blank=False,
+    )
+    day = models.DateField('day', blank=False)
+    subscriptions = models.DecimalField('subscriptions', max_digits=20, decimal_places=2, default=ZERO)
+    content_sales = models.DecimalField('content sales', max_digits=20, decimal_places=2, default=ZERO)
+    withdrawals = models.DecimalField('withdrawals', max_digits=20, decimal_places=2, default=ZERO)
+    fees = models.DecimalField('fees', max_digits=20, decimal_places=2, default=ZERO)
+
+    class Meta:
+        constraints: ClassVar[list] = [
+            models.UniqueConstraint(fields=('creator', 'day'), name='daily_earnings_creator_day_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.creator_id} - {self.day}'
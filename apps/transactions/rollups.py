@@ -0,0 +1,111 @@
+"""Incremental per creator, per day earnings rollups built from the ledger."""
+from django.db import transaction
+from django.db.models import Q, Max, Sum
+from django.db.models.functions import TruncDate
+
+from utils.constants import ZERO
+
+from .choices import LedgerCategory
+from .ledger import settled_entries
+from .models import LedgerEntry, DailyEarnings, LedgerCheckpoint
+
+EARNINGS_CHECKPOINT = 'daily-earnings'
+ROLLUP_BATCH_SIZE = 10_000
+
+ROLLUP_FIELDS = ('subscriptions', 'content_sales', 'withdrawals', 'fees')
+
+
+@transaction.atomic()
+def roll_up_earnings(batch_size: int = ROLLUP_BATCH_SIZE) -> int | None:
+    """Fold up to `batch_size` settled ledger entries into `DailyEarnings`.
+
+    Returns the new high-water mark, or `None` when there was nothing left to process.
+    """
+    checkpoint, _ = LedgerCheckpoint.objects.select_for_update().get_or_create(name=EARNINGS_CHECKPOINT)
+    high_water = batch_high_water(checkpoint.last_entry_id, batch_size)
+    if high_water is None:
+        return None
+
+    add_to_rollups(earnings_increments(checkpoint.last_entry_id, high_water))
+
+    checkpoint.last_entry_id = high_water
+    checkpoint.save(update_fields=['last_entry_id', 'updated_at'])
+    return high_water
+
+
+def batch_high_water(after_id: int, batch_size: int) -> int | None:
+    """The id of the last of the next `batch_size` settled entries after `after_id`, or of the last settled one."""
+    entries = settled_entries(after_id).order_by('id')
+    last_in_batch = batch_size - 1
+    boundary = list(entries.values_list('id', flat=True)[last_in_batch:batch_size])
+    return boundary[0] if boundary else entries.aggregate(high_water=Max('id'))['high_water']
+
+
+def earnings_increments(after_id: int, high_water: int) -> dict[tuple, dict]:
+    """What the entries in `(after_id, high_water]` add to the earnings of each creator and day."""
+    totals = (
+        LedgerEntry.objects.filter(
+            # only the receiving legs of sales count as earnings, withdrawals and fees are booked on the creator.
+            Q(category__in=(LedgerCategory.SUBSCRIPTION, LedgerCategory.CONTENT_PURCHASE), amount__gt=0)
+            | Q(category__in=(LedgerCategory.WITHDRAWAL, LedgerCategory.FEE)),
+            id__gt=after_id,
+            id__lte=high_water,
+            wallet__creator__isnull=False,
+        )
+        .annotate(day=TruncDate('created_at'))
+        .values('wallet__creator', 'day')
+        .annotate(
+            subscriptions=Sum('amount', filter=Q(category=LedgerCategory.SUBSCRIPTION), default=ZERO),
+            content_sales=Sum('amount', filter=Q(category=LedgerCategory.CONTENT_PURCHASE), default=ZERO),
+            withdrawals=Sum('amount', filter=Q(category=LedgerCategory.WITHDRAWAL), default=ZERO),
+            fees=Sum('amount', filter=Q(category=LedgerCategory.FEE), default=ZERO),
+        )
+    )
+    return {
+        (row['wallet__creator'], row['day']): {
+            'subscriptions': row['subscriptions'],
+            'content_sales': row['content_sales'],
+            # withdrawals and fees are debits on the creator's wallet, but are reported as positive amounts.
+            'withdrawals': -row['withdrawals'],
+            'fees': -row['fees'],
+        }
+        for row in totals
+    }
+
+
+def add_to_rollups(increments: dict[tuple, dict]):
+    existing = {
+        (rollup.creator_id, rollup.day): rollup
+        for rollup in DailyEarnings.objects.select_for_update().filter(
+            creator__in={creator_id for creator_id, _ in increments},
+            day__in={day for _, day in increments},
+        )
+    }
+    to_create, to_update = [], []
+    for (creator_id, day), increment in increments.items():
+        rollup = existing.get((creator_id, day))
+        if rollup is None:
+            to_create.append(DailyEarnings(creator_id=creator_id, day=day, **increment))
+            continue
+
+        for field, amount in increment.items():
+            setattr(rollup, field, getattr(rollup, field) + amount)
+        to_update.append(rollup)
+
+    DailyEarnings.objects.bulk_create(to_create)
+    DailyEarnings.objects.bulk_update(to_update, fields=ROLLUP_FIELDS)
+
+
+def rebuild_earnings(batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Drop every rollup and replay the whole ledger in batches of `batch_size`. Returns the number of batches."""
+    with transaction.atomic():
+        checkpoint, _ = LedgerCheckpoint.objects.select_for_update().get_or_create(name=EARNINGS_CHECKPOINT)
+        checkpoint.last_entry_id = 0
+        checkpoint.save(update_fields=['last_entry_id', 'updated_at'])
+        DailyEarnings.objects.all().delete()
+
+    batches = 0
+    while roll_up_earnings(batch_size) is not None:
+        batches += 1
+
+    return batches
@@ -1,9 +1,56 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
 from rest_framework import serializers
 
-from .models import Transaction
+from .exports import EXPORT_FORMATS
+from .choices import TransactionType
+from .models import Transaction, DailyEarnings
+
+DEFAULT_EARNINGS_WINDOW_DAYS = 30
+MAX_EARNINGS_WINDOW_DAYS = 366
 
 
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = '__all__'
+
+
+class TransactionExportSerializer(serializers.Serializer):
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    tx_type = serializers.ChoiceField(
+        required=False,
+        choices=[(tx_type.value, tx_type.label) for tx_type in (TransactionType.DEBIT, TransactionType.CREDIT)],
+    )
+    export_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError('`start` must be before `end`.')
+
+        return attrs
+
+
+class DailyEarningsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyEarnings
+        fields = ('day', 'subscriptions', 'content_sales', 'withdrawals', 'fees')
+
+
+class EarningsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.now().date())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=DEFAULT_EARNINGS_WINDOW_DAYS))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('`start` must not be after `end`.')
+
+        if (attrs['end'] - attrs['start']).days > MAX_EARNINGS_WINDOW_DAYS:
+            raise serializers.ValidationError(f'Earnings can be fetched for at most {MAX_EARNINGS_WINDOW_DAYS} days.')
+
+        return attrs
@@ -0,0 +1,38 @@
+import logging
+
+from huey import crontab
+from huey.contrib.djhuey import lock_task, db_periodic_task
+
+from apps.creators.models import Wallet
+
+from . import ledger, rollups
+
+logger = logging.getLogger(__name__)
+
+
+@db_periodic_task(crontab(minute='0'))
+@lock_task('take-balance-snapshots-lock')
+def take_balance_snapshots():
+    snapshots = ledger.take_balance_snapshots()
+    logger.info('Took %s balance snapshots', snapshots)
+
+
+@db_periodic_task(crontab(hour='*/6', minute='30'))
+@lock_task('reconcile-wallet-balances-lock')
+def reconcile_wallet_balances():
+    for wallet in Wallet.objects.iterator(chunk_size=500):
+        expected_balance = ledger.ledger_balance(wallet)
+        if expected_balance != wallet.balance:
+            logger.error(
+                'Wallet %s balance %s does not match its ledger balance %s',
+                wallet.id,
+                wallet.balance,
+                expected_balance,
+            )
+
+
+@db_periodic_task(crontab(minute='*/5'))
+@lock_task('roll-up-daily-earnings-lock')
+def roll_up_daily_earnings():
+    while rollups.roll_up_earnings() is not None:
+        continue
@@ -1,45 +1,45 @@
+import os
+import csv
+import json
+import time
 import logging
+import tracemalloc
+from io import StringIO
+from decimal import Decimal
+from datetime import timedelta
+from unittest import skipUnless
 from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
 
 from solders.keypair import Keypair
 
-from django.test import TestCase
+from django.db import connection
+from django.utils import timezone
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, tag
 
 from rest_framework.test import APIClient
 
-from apps.creators.models import Creator
-from apps.subscriptions.choices import SubscriptionType
-from apps.creators.tests import WALLET_CREATION_RESPONSE
+from apps.transactions import ledger, rollups
+from apps.creators.exceptions import InsufficientBalanceError
+from apps.creators.test_helpers import auth_header, create_creator
+from apps.creators.tests import WALLET_CREATION_RESPONSE, WALLET_CREATION_RESPONSE_2
+
+from utils.constants import ZERO
+
+from .choices import LedgerCategory, TransactionType, TransactionStatus
+from .models import LedgerEntry, Transaction, DailyEarnings, BalanceSnapshot
 
 
 class TransactionsTest(TestCase):
     def setUp(self):
         self.client = APIClient()
-        self.keypair, self.creator = self.create_creator('bonfida.sol')  # pylint: disable=no-value-for-parameter
-        self.message = b'Message: Welcome to Flicks!\nURI: https://flicks.vercel.app'
-        self.signature = self.keypair.sign_message(message=self.message)
-        self.auth_header = {'Authorization': f'Signature {self.keypair.pubkey()}:{self.signature}'}
+        self.keypair = Keypair()
+        self.creator = create_creator('bonfida.sol', self.keypair, is_verified=True)
+        self.auth_header = auth_header(self.keypair)
 
         logging.disable(logging.CRITICAL)
 
-    @staticmethod
-    @patch(
-        target='services.circle.CircleAPI._request',
-        return_value=WALLET_CREATION_RESPONSE,
-    )
-    def create_creator(moniker: str, mock_post):  # noqa: ARG004
-        keypair = Keypair()
-        creator = Creator.objects.create(
-            moniker=moniker,
-            image_url='https://google.com',
-            banner_url='https://google.com',
-            address=str(keypair.pubkey()),
-            subscription_type=SubscriptionType.FREE,
-            is_verified=True,
-        )
-
-        return keypair, creator
-
     @patch(
         target='services.circle.CircleAPI._request',
         return_value=WALLET_CREATION_RESPONSE,
@@ -48,3 +48,267 @@ class TransactionsTest(TestCase):
         response = self.client.get(path='/transactions/', headers=self.auth_header)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {'data': {'next': None, 'previous': None, 'results': []}})
+
+
+class TransactionExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.keypair = Keypair()
+        self.creator = create_creator('exporter.sol', self.keypair)
+        self.auth_header = auth_header(self.keypair)
+
+        for tx_type in (TransactionType.CREDIT, TransactionType.DEBIT, TransactionType.MOVE_TO_MASTER_WALLET):
+            Transaction.objects.create(
+                amount=Decimal('10.00'),
+                account=self.creator,
+                tx_type=tx_type,
+                status=TransactionStatus.SUCCESSFUL,
+                narration=f'{tx_type} narration',
+            )
+
+    def test_export_csv(self):
+        response = self.client.get(path='/transactions/export', headers=self.auth_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['tx_type'] for row in rows], [TransactionType.CREDIT, TransactionType.DEBIT])
+
+    def test_export_ndjson_with_filters(self):
+        response = self.client.get(
+            path='/transactions/export',
+            data={'export_format': 'ndjson', 'tx_type': 'debit', 'start': timezone.now().date().isoformat()},
+            headers=self.auth_header,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['tx_type'], TransactionType.DEBIT)
+        self.assertEqual(rows[0]['amount'], '10.000000')
+
+    def test_export_invalid_range(self):
+        now = timezone.now()
+        response = self.client.get(
+            path='/transactions/export',
+            data={'start': now.isoformat(), 'end': (now - timedelta(days=1)).isoformat()},
+            headers=self.auth_header,
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@tag('benchmark')
+class TransactionExportBenchmark(TestCase):
+    rows = int(os.environ.get('BENCHMARK_ROWS', 1_000_000))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.keypair = Keypair()
+        cls.creator = create_creator('benchmark.sol', cls.keypair)
+
+        batch_size = 10_000
+        for offset in range(0, cls.rows, batch_size):
+            Transaction.objects.bulk_create(
+                Transaction(
+                    amount=Decimal('1.50'),
+                    account=cls.creator,
+                    tx_type=TransactionType.CREDIT,
+                    status=TransactionStatus.SUCCESSFUL,
+                    narration=f'benchmark transaction {i}',
+                )
+                for i in range(offset, min(offset + batch_size, cls.rows))
+            )
+
+    def test_export_memory_is_constant(self):
+        headers = auth_header(self.keypair)
+
+        for export_format in ('csv', 'ndjson'):
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            response = APIClient().get('/transactions/export', {'export_format': export_format}, headers=headers)
+            exported_bytes = lines = 0
+            for chunk in response.streaming_content:
+                exported_bytes += len(chunk)
+                lines += chunk.count(b'\n')
+            elapsed = time.perf_counter() - started_at
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(  # noqa: T201
+                f'\n{export_format}: {self.rows} rows, {exported_bytes / 1_000_000:.1f} MB in {elapsed:.2f}s '
+                f'({self.rows / elapsed:,.0f} rows/s), peak traced memory {peak / 1_000_000:.1f} MB',
+            )
+            self.assertEqual(lines, self.rows + (export_format == 'csv'))
+            self.assertLess(peak, 50_000_000)
+
+
+class LedgerTest(TestCase):
+    def setUp(self):
+        self.sender = create_creator('sender.sol').wallet
+        self.recipient = create_creator('recipient.sol', wallet_response=WALLET_CREATION_RESPONSE_2).wallet
+
+    def test_top_up_and_transfer(self):
+        self.sender.top_up(Decimal('50.00'))
+        self.sender.transfer(Decimal('20.00'), self.recipient)
+
+        self.assertEqual(self.sender.balance, Decimal('30.00'))
+        self.assertEqual(self.recipient.balance, Decimal('20.00'))
+        self.sender.refresh_from_db()
+        self.recipient.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal('30.00'))
+        self.assertEqual(self.recipient.balance, Decimal('20.00'))
+
+        self.assertEqual(LedgerEntry.objects.count(), 4)
+        for reference in LedgerEntry.objects.values_list('reference', flat=True).distinct():
+            self.assertEqual(sum(LedgerEntry.objects.filter(reference=reference).values_list('amount', flat=True)), 0)
+
+    def test_insufficient_balance_leaves_no_trace(self):
+        self.sender.top_up(Decimal('5.00'))
+        with self.assertRaisesMessage(InsufficientBalanceError, 'Your balance is 5.00'):
+            self.sender.transfer(Decimal('10.00'), self.recipient)
+        with self.assertRaises(InsufficientBalanceError):
+            self.sender.withdraw(Decimal('10.00'))
+
+        self.sender.refresh_from_db()
+        self.recipient.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal('5.00'))
+        self.assertEqual(self.recipient.balance, Decimal('0.00'))
+        self.assertEqual(LedgerEntry.objects.count(), 2)
+
+    def test_balance_snapshots(self):
+        self.sender.top_up(Decimal('50.00'))
+        self.sender.transfer(Decimal('20.00'), self.recipient)
+        LedgerEntry.objects.update(created_at=self.sender.created_at - timedelta(hours=1))
+
+        self.assertEqual(ledger.take_balance_snapshots(), 2)
+        self.assertEqual(BalanceSnapshot.objects.get(wallet=self.sender).balance, Decimal('30.00'))
+        self.assertEqual(ledger.take_balance_snapshots(), 0)
+
+        self.sender.withdraw(Decimal('5.00'))
+        self.assertEqual(ledger.ledger_balance(self.sender), Decimal('25.00'))
+        self.assertEqual(ledger.ledger_balance(self.recipient), Decimal('20.00'))
+
+    def test_opening_balances(self):
+        type(self.sender).objects.filter(id=self.sender.id).update(balance=Decimal('12.00'))
+
+        stdout = StringIO()
+        call_command('record_opening_balances', '--batch-size', '1', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), 'Recorded the opening balance of 1 wallet(s).')
+        self.assertEqual(ledger.record_opening_balances(), 0)
+        self.assertEqual(ledger.ledger_balance(self.sender), Decimal('12.00'))
+        self.assertEqual(ledger.ledger_balance(self.recipient), ZERO)
+
+    def test_opening_balances_leave_wallets_with_entries_alone(self):
+        # a wallet that already moved money through the ledger is not opened, its difference is left to reconcile.
+        type(self.sender).objects.filter(id=self.sender.id).update(balance=Decimal('12.00'))
+        self.sender.refresh_from_db()
+        self.sender.transfer(Decimal('5.00'), self.recipient)
+
+        self.assertEqual(ledger.record_opening_balances(), 0)
+        self.assertFalse(LedgerEntry.objects.filter(category=LedgerCategory.OPENING).exists())
+        self.assertEqual(ledger.ledger_balance(self.sender), Decimal('-5.00'))
+
+
+class EarningsRollupTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.fan = create_creator('fan.sol').wallet
+        self.keypair = Keypair()
+        self.creator = create_creator('earner.sol', self.keypair, wallet_response=WALLET_CREATION_RESPONSE_2)
+        self.auth_header = auth_header(self.keypair)
+
+        self.fan.top_up(Decimal('100.00'))
+        self.fan.transfer(Decimal('10.00'), self.creator.wallet, LedgerCategory.SUBSCRIPTION)
+        self.fan.transfer(Decimal('5.00'), self.creator.wallet, LedgerCategory.CONTENT_PURCHASE)
+        self.creator.wallet.withdraw(Decimal('10.00'), fee=Decimal('1.00'))
+        self.settle()
+
+    @staticmethod
+    def settle():
+        LedgerEntry.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def assert_earnings(self, **expected):
+        earnings = DailyEarnings.objects.get(creator=self.creator)
+        self.assertEqual({field: getattr(earnings, field) for field in expected}, expected)
+
+    def test_incremental_rollup(self):
+        self.assertIsNotNone(rollups.roll_up_earnings(batch_size=3))
+        self.assertIsNotNone(rollups.roll_up_earnings(batch_size=3))
+        self.fan.transfer(Decimal('2.50'), self.creator.wallet, LedgerCategory.CONTENT_PURCHASE)
+        # the new entries are still within the settlement lag.
+        while rollups.roll_up_earnings(batch_size=3) is not None:
+            continue
+
+        self.assert_earnings(
+            subscriptions=Decimal('10.00'),
+            content_sales=Decimal('5.00'),
+            withdrawals=Decimal('9.00'),
+            fees=Decimal('1.00'),
+        )
+        self.assertFalse(DailyEarnings.objects.filter(creator__wallet=self.fan).exists())
+
+        self.settle()
+        self.assertIsNotNone(rollups.roll_up_earnings())
+        self.assertIsNone(rollups.roll_up_earnings())
+        self.assert_earnings(content_sales=Decimal('7.50'))
+
+    def test_rebuild(self):
+        rollups.roll_up_earnings()
+        DailyEarnings.objects.update(subscriptions=Decimal('999.00'))
+
+        self.assertEqual(rollups.rebuild_earnings(batch_size=4), 3)
+        self.assert_earnings(subscriptions=Decimal('10.00'), fees=Decimal('1.00'))
+
+    def test_earnings_view(self):
+        rollups.roll_up_earnings()
+
+        response = self.client.get(path='/transactions/earnings', headers=self.auth_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['data'],
+            [
+                {
+                    'day': DailyEarnings.objects.get().day.isoformat(),
+                    'subscriptions': '10.00',
+                    'content_sales': '5.00',
+                    'withdrawals': '9.00',
+                    'fees': '1.00',
+                },
+            ],
+        )
+
+        response = self.client.get(
+            path='/transactions/earnings',
+            data={'start': '2023-01-01', 'end': '2024-06-01'},
+            headers=self.auth_header,
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class LedgerConcurrencyTest(TransactionTestCase):
+    # balances move with `UPDATE ... RETURNING` under row locks, while SQLite locks the whole database for a write.
+    @skipUnless(connection.vendor == 'postgresql', 'needs UPDATE ... RETURNING with row-level locking')
+    def test_parallel_transfers_from_the_same_wallet(self):
+        sender = create_creator('sender.sol').wallet
+        recipient = create_creator('recipient.sol', wallet_response=WALLET_CREATION_RESPONSE_2).wallet
+        sender.top_up(Decimal('100.00'))
+
+        def transfer(_):
+            try:
+                ledger.transfer(sender, recipient, Decimal('10.00'))
+            except InsufficientBalanceError:
+                return False
+            finally:
+                connection.close()
+            return True
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(transfer, range(25)))
+
+        sender.refresh_from_db()
+        recipient.refresh_from_db()
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(sender.balance, Decimal('0.00'))
+        self.assertEqual(recipient.balance, Decimal('100.00'))
+        self.assertEqual(ledger.ledger_balance(sender), sender.balance)
+        self.assertEqual(ledger.ledger_balance(recipient), recipient.balance)
@@ -1,5 +1,9 @@
 from django.urls import path
 
-from .views import TransactionView
+from .views import EarningsView, TransactionView, TransactionExportView
 
-urlpatterns = [path('', TransactionView.as_view(), name='user-transactions')]
+urlpatterns = [
+    path('', TransactionView.as_view(), name='user-transactions'),
+    path('export', TransactionExportView.as_view(), name='export-user-transactions'),
+    path('earnings', EarningsView.as_view(), name='user-earnings'),
+]
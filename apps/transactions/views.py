@@ -1,3 +1,9 @@
+from drf_yasg.utils import swagger_auto_schema
+
+from django.utils import timezone
+from django.http import StreamingHttpResponse
+
+from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 
 from apps.creators.permissions import IsAuthenticated
@@ -5,8 +11,14 @@ from apps.creators.permissions import IsAuthenticated
 from utils.responses import success_response
 from utils.pagination import CustomCursorPagination
 
-from .serializers import TransactionSerializer
-from .models import Transaction, TransactionType
+from .models import Transaction, DailyEarnings, TransactionType
+from .exports import EXPORT_FIELDS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE
+from .serializers import (
+    TransactionSerializer,
+    DailyEarningsSerializer,
+    EarningsQuerySerializer,
+    TransactionExportSerializer,
+)
 
 
 class TransactionView(ListAPIView):
@@ -24,3 +36,48 @@ class TransactionView(ListAPIView):
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
         return success_response(data=response.data, status_code=response.status_code)
+
+
+class TransactionExportView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(query_serializer=TransactionExportSerializer)
+    def get(self, request, *args, **kwargs):
+        serializer = TransactionExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = serializer.validated_data
+
+        qs = Transaction.objects.filter(account=self.request.user).exclude(
+            tx_type=TransactionType.MOVE_TO_MASTER_WALLET
+        )
+        if 'start' in filters:
+            qs = qs.filter(created_at__gte=filters['start'])
+        if 'end' in filters:
+            qs = qs.filter(created_at__lt=filters['end'])
+        if 'tx_type' in filters:
+            qs = qs.filter(tx_type=filters['tx_type'])
+
+        rows = qs.order_by('created_at', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        export_format = filters['export_format']
+        content_type, stream = EXPORT_FORMATS[export_format]
+        file_name = f'transactions-{timezone.now():%Y%m%d%H%M%S}.{export_format}'
+
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return response
+
+
+class EarningsView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(query_serializer=EarningsQuerySerializer)
+    def get(self, request, *args, **kwargs):
+        serializer = EarningsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        qs = DailyEarnings.objects.filter(
+            creator=self.request.user,
+            day__gte=serializer.validated_data['start'],
+            day__lte=serializer.validated_data['end'],
+        ).order_by('day')
+        return success_response(DailyEarningsSerializer(qs, many=True).data)
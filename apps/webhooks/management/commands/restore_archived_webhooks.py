@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from django.utils.dateparse import parse_datetime
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhooks.models import ArchivedWebhook
+
+
+class Command(BaseCommand):
+    help = 'Decompress archived webhooks and write them out as newline-delimited JSON for audits.'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--message-id', action='append', dest='message_ids', default=[])
+        parser.add_argument('--since', help='Only restore webhooks received at or after this ISO 8601 timestamp.')
+        parser.add_argument('--until', help='Only restore webhooks received before this ISO 8601 timestamp.')
+        parser.add_argument('--output', help='File to write the restored webhooks to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        qs = ArchivedWebhook.objects.order_by('received_at')
+        if options['message_ids']:
+            qs = qs.filter(message_id__in=options['message_ids'])
+        if options['since']:
+            qs = qs.filter(received_at__gte=self.parse_timestamp(options['since']))
+        if options['until']:
+            qs = qs.filter(received_at__lt=self.parse_timestamp(options['until']))
+
+        lines = (
+            self.serialize(archived_webhook) for archived_webhook in qs.iterator(chunk_size=options['chunk_size'])
+        )
+        restored = 0
+        if options['output']:
+            with Path(options['output']).open('w', encoding='utf-8') as output:
+                for line in lines:
+                    output.write(f'{line}\n')
+                    restored += 1
+        else:
+            for line in lines:
+                self.stdout.write(line)
+                restored += 1
+
+        self.stderr.write(f'Restored {restored} archived webhook(s).')
+
+    @staticmethod
+    def serialize(archived_webhook: ArchivedWebhook) -> str:
+        return json.dumps(
+            {
+                'id': str(archived_webhook.id),
+                'message_id': archived_webhook.message_id,
+                'notification_type': archived_webhook.notification_type,
+                'received_at': archived_webhook.received_at.isoformat(),
+                'payload': archived_webhook.payload,
+            },
+        )
+
+    @staticmethod
+    def parse_timestamp(value):
+        timestamp = parse_datetime(value)
+        if timestamp is None:
+            raise CommandError(f'{value} is not a valid ISO 8601 timestamp.')
+
+        return timestamp
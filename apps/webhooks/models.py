@@ -1,3 +1,7 @@
+import json
+import zlib
+from typing import ClassVar
+
 from django.db import models
 
 from utils.models import UUIDModel, TimestampedModel
@@ -19,5 +23,45 @@ class Webhook(UUIDModel, TimestampedModel, models.Model):
     status = models.CharField('status', max_length=10, choices=WebhookStatus.choices, blank=False)
     notification_type = models.CharField('notification type', max_length=50, choices=WebhookType.choices, blank=False)
 
+    class Meta:
+        indexes: ClassVar[list] = [
+            # `handle_pending_webhooks` only ever scans pending rows, which are a tiny fraction of the table.
+            models.Index(
+                fields=('created_at',),
+                name='webhook_pending_idx',
+                condition=models.Q(status=WebhookStatus.PENDING),
+            ),
+        ]
+
     def __str__(self):
         return str(self.id)
+
+
+class ArchivedWebhook(UUIDModel, models.Model):
+    """Cold storage for completed webhooks that are past the retention window.
+
+    The SNS payload is stored as zlib-compressed JSON since it is only ever read back for audits.
+    """
+
+    message_id = models.CharField('message identifier', unique=True, max_length=100, blank=False)
+    notification_type = models.CharField('notification type', max_length=50, choices=WebhookType.choices, blank=False)
+    compressed_payload = models.BinaryField('compressed payload', blank=False)
+    received_at = models.DateTimeField('received at', db_index=True)
+    archived_at = models.DateTimeField('archived at', auto_now_add=True)
+
+    def __str__(self):
+        return self.message_id
+
+    @classmethod
+    def from_webhook(cls, webhook: Webhook) -> 'ArchivedWebhook':
+        return cls(
+            id=webhook.id,
+            message_id=webhook.message_id,
+            received_at=webhook.created_at,
+            notification_type=webhook.notification_type,
+            compressed_payload=zlib.compress(json.dumps(webhook.payload).encode('utf-8'), level=9),
+        )
+
+    @property
+    def payload(self):
+        return json.loads(zlib.decompress(self.compressed_payload).decode('utf-8'), strict=False)
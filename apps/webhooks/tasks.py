@@ -1,12 +1,15 @@
 import json
 import logging
 from decimal import Decimal
+from datetime import timedelta
 
 import requests
 from huey import crontab
 from huey.contrib.djhuey import lock_task, db_periodic_task
 
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 
 from apps.creators.models import Wallet
 from apps.creators.choices import Blockchain
@@ -15,7 +18,7 @@ from apps.transactions.choices import TransactionType, TransactionStatus
 
 from utils.constants import MINIMUM_ALLOWED_DEPOSIT_AMOUNT
 
-from .models import Webhook, WebhookType, WebhookStatus
+from .models import Webhook, WebhookType, WebhookStatus, ArchivedWebhook
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +26,7 @@ logger = logging.getLogger(__name__)
 @db_periodic_task(crontab(minute='*/2'))
 @lock_task('handle-pending-webhooks-lock')
 def handle_pending_webhooks():
-    for webhook in Webhook.objects.filter(status=WebhookStatus.PENDING):
+    for webhook in Webhook.objects.filter(status=WebhookStatus.PENDING).order_by('created_at'):
         if webhook.notification_type == WebhookType.SUBSCRIPTION_CONFIRMATION:
             handle_subscription_confirmation_webhook(webhook)
 
@@ -60,6 +63,33 @@ def handle_pending_webhooks():
                     continue
 
 
+@db_periodic_task(crontab(hour='2', minute='0'))
+@lock_task('archive-completed-webhooks-lock')
+def archive_completed_webhooks():
+    """Move completed webhooks past the retention window into `ArchivedWebhook` in bounded chunks."""
+    cutoff = timezone.now() - timedelta(days=settings.WEBHOOK_RETENTION_DAYS)
+    expired_webhooks = Webhook.objects.filter(status=WebhookStatus.COMPLETED, created_at__lt=cutoff).order_by(
+        'created_at',
+    )
+
+    archived_count = 0
+    while True:
+        with transaction.atomic():
+            batch = list(expired_webhooks[: settings.WEBHOOK_ARCHIVE_BATCH_SIZE])
+            if not batch:
+                break
+
+            ArchivedWebhook.objects.bulk_create(
+                [ArchivedWebhook.from_webhook(webhook) for webhook in batch],
+                ignore_conflicts=True,
+            )
+            Webhook.objects.filter(id__in=[webhook.id for webhook in batch]).delete()
+
+        archived_count += len(batch)
+
+    logger.info('Archived %s completed webhooks older than %s', archived_count, cutoff)
+
+
 @transaction.atomic()
 def handle_wallet_deposits_webhook(message, webhook):
     amount = Decimal(message['amount']['amount'])
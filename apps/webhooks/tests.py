@@ -1,8 +1,15 @@
+import json
+from io import StringIO
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from django.core.management import call_command
 
 from rest_framework.test import APIClient
 
-from apps.webhooks.models import Webhook
+from apps.webhooks.tasks import archive_completed_webhooks
+from apps.webhooks.models import Webhook, WebhookType, WebhookStatus, ArchivedWebhook
 
 CONFIRM_SUBSCRIPTION_PAYLOAD = r"""{
   "Type" : "SubscriptionConfirmation",
@@ -56,3 +63,52 @@ class WebhookTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(Webhook.objects.count(), 1)
+
+
+class WebhookRetentionTest(TestCase):
+    def setUp(self):
+        self.payload = json.loads(TRANSFER_RECEIVED_PAYLOAD, strict=False)
+
+    def create_webhook(self, message_id, status, age):
+        webhook = Webhook.objects.create(
+            status=status,
+            payload=self.payload,
+            message_id=message_id,
+            notification_type=WebhookType.TRANSFERS,
+        )
+        Webhook.objects.filter(id=webhook.id).update(created_at=timezone.now() - age)
+        return webhook
+
+    def test_archive_completed_webhooks(self):
+        old_completed = [
+            self.create_webhook(f'old-{i}', WebhookStatus.COMPLETED, timedelta(days=60)) for i in range(3)
+        ]
+        self.create_webhook('old-pending', WebhookStatus.PENDING, timedelta(days=60))
+        self.create_webhook('recent-completed', WebhookStatus.COMPLETED, timedelta(days=1))
+
+        with self.settings(WEBHOOK_RETENTION_DAYS=30, WEBHOOK_ARCHIVE_BATCH_SIZE=2):
+            archive_completed_webhooks.call_local()
+
+        self.assertEqual(
+            set(Webhook.objects.values_list('message_id', flat=True)),
+            {'old-pending', 'recent-completed'},
+        )
+        self.assertEqual(ArchivedWebhook.objects.count(), len(old_completed))
+
+        archived_webhook = ArchivedWebhook.objects.get(message_id='old-0')
+        self.assertEqual(archived_webhook.id, old_completed[0].id)
+        self.assertEqual(archived_webhook.payload, self.payload)
+        self.assertLess(len(archived_webhook.compressed_payload), len(TRANSFER_RECEIVED_PAYLOAD))
+
+    def test_restore_archived_webhooks(self):
+        self.create_webhook('old-0', WebhookStatus.COMPLETED, timedelta(days=60))
+        self.create_webhook('old-1', WebhookStatus.COMPLETED, timedelta(days=60))
+        archive_completed_webhooks.call_local()
+
+        stdout = StringIO()
+        call_command('restore_archived_webhooks', '--message-id', 'old-1', stdout=stdout, stderr=StringIO())
+
+        restored = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(len(restored), 1)
+        self.assertEqual(restored[0]['message_id'], 'old-1')
+        self.assertEqual(restored[0]['payload'], self.payload)
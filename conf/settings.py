@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import os
 from typing import Any
 from pathlib import Path
 
@@ -39,6 +40,7 @@ DJANGO_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.contenttypes',
+    'django.contrib.postgres',
 ]
 if DEBUG:
     DJANGO_APPS.insert(5, 'whitenoise.runserver_nostatic')
@@ -196,6 +198,16 @@ connection_pool.max_connections = env.int('HUEY_STORAGE_MAX_CONNECTIONS', defaul
 HUEY = RedisHuey(name=__name__, immediate=env.bool('HUEY_IMMEDIATE'), connection_pool=connection_pool)
 
 
+# ==============================================================================
+# REDIS SETTINGS
+# ==============================================================================
+REDIS_CONNECTION_POOL = ConnectionPool.from_url(
+    env.str('REDIS_URL', default=env.str('HUEY_REDIS_URL')),
+    decode_responses=True,
+    max_connections=env.int('REDIS_MAX_CONNECTIONS', default=50),
+)
+
+
 # ==============================================================================
 # DJANGO EXTRA CHECKS SETTINGS
 # ==============================================================================
@@ -250,17 +262,63 @@ AWS_SECRET_ACCESS_KEY = env.str('AWS_SECRET_ACCESS_KEY')
 PRESIGNED_URL_EXPIRATION = env.int('PRESIGNED_URL_EXPIRATION')
 MAX_FILE_UPLOAD_PER_REQUEST = env.int('MAX_FILE_UPLOAD_PER_REQUEST')
 
+# widths, in pixels, of the downscaled variants created for every uploaded image.
+MEDIA_VARIANT_WIDTHS = env.list('MEDIA_VARIANT_WIDTHS', cast=int, default=[320, 640, 1080])
+MEDIA_VARIANT_WORKERS = env.int('MEDIA_VARIANT_WORKERS', default=min(os.cpu_count() or 1, 4))
+
+# hours after which uploads that no media refers to are deleted from the bucket.
+ORPHANED_UPLOAD_AGE = env.int('ORPHANED_UPLOAD_AGE', default=24)
+
+# hash image uploads so that identical files are stored, and processed, only once.
+MEDIA_DEDUPLICATION = env.bool('MEDIA_DEDUPLICATION', default=True)
+
 # =======================================
 # AGORA SETTINGS
 # =======================================
 AGORA_APP_ID = env.str('AGORA_APP_ID')
 AGORA_APP_CERTIFICATE = env.str('AGORA_APP_CERTIFICATE')
 
+# =======================================
+# CREATOR SETTINGS
+# =======================================
+# seconds a cached public profile is served for, which bounds how long lapsed subscriptions are still counted.
+CREATOR_PROFILE_CACHE_TIMEOUT = env.int('CREATOR_PROFILE_CACHE_TIMEOUT', default=60)
+
+# seconds the top matches of a query shorter than a trigram are cached for autocomplete.
+CREATOR_SEARCH_CACHE_TIMEOUT = env.int('CREATOR_SEARCH_CACHE_TIMEOUT', default=60)
+
+# seconds after which each process reloads its in-memory index of taken monikers from the database.
+MONIKER_INDEX_REFRESH_INTERVAL = env.int('MONIKER_INDEX_REFRESH_INTERVAL', default=300)
+
+# =======================================
+# DISCOVER SETTINGS
+# =======================================
+# hours after which an engagement counts for half as much in the discover ranking.
+DISCOVER_HALF_LIFE = env.int('DISCOVER_HALF_LIFE', default=24)
+
+# days for which a content is ranked in the discover feed after it was created.
+DISCOVER_HORIZON = env.int('DISCOVER_HORIZON', default=7)
+
+# =======================================
+# LIVESTREAM SETTINGS
+# =======================================
+# viewers that have not sent a heartbeat for this many seconds are no longer counted as watching.
+LIVESTREAM_PRESENCE_TIMEOUT = env.int('LIVESTREAM_PRESENCE_TIMEOUT', default=30)
+
+# how far ahead, in hours, upcoming livestreams are discovered.
+LIVESTREAM_DISCOVERY_HORIZON = env.int('LIVESTREAM_DISCOVERY_HORIZON', default=24)
+
 # =======================================
 # SHARINGAN SETTINGS
 # =======================================
 SHARINGAN_BASE_URL = env.str('SHARINGAN_BASE_URL')
 
+# =======================================
+# WEBHOOK RETENTION SETTINGS
+# =======================================
+WEBHOOK_RETENTION_DAYS = env.int('WEBHOOK_RETENTION_DAYS', default=30)
+WEBHOOK_ARCHIVE_BATCH_SIZE = env.int('WEBHOOK_ARCHIVE_BATCH_SIZE', default=500)
+
 
 # ==============================================================================
 # LOGGING SETTINGS
@@ -8,18 +8,7 @@ from hashlib import sha256
 from typing import ClassVar
 from collections import OrderedDict
 
-from .packer import (
-    pack_int16,
-    pack_string,
-    pack_uint16,
-    pack_uint32,
-    unpack_int16,
-    unpack_string,
-    unpack_uint16,
-    unpack_uint32,
-    pack_map_uint32,
-    unpack_map_uint32,
-)
+from .packer import BufferReader, pack_int16, pack_string, pack_uint16, pack_uint32, pack_map_uint32
 
 K_JOIN_CHANEL = 1
 K_PUBLISH_AUDIO_STREAM = 2
@@ -55,12 +44,20 @@ class Service:
     def service_type(self):
         return self.__type
 
+    @property
+    def privileges(self):
+        return self.__privileges
+
     def pack(self):
         return self.__pack_type() + self.__pack_privileges()
 
     def unpack(self, buffer):
-        self.__privileges, buffer = unpack_map_uint32(buffer)
-        return buffer
+        reader = BufferReader(buffer)
+        self.read(reader)
+        return reader.remaining()
+
+    def read(self, reader):
+        self.__privileges = reader.map_uint32()
 
 
 class ServiceRtc(Service):
@@ -76,14 +73,21 @@ class ServiceRtc(Service):
         self.__channel_name = channel_name.encode('utf-8')
         self.__uid = b'' if uid == 0 else str(uid).encode('utf-8')
 
+    @property
+    def channel_name(self):
+        return self.__channel_name
+
+    @property
+    def uid(self):
+        return self.__uid
+
     def pack(self):
         return super().pack() + pack_string(self.__channel_name) + pack_string(self.__uid)
 
-    def unpack(self, buffer):
-        buffer = super().unpack(buffer)
-        self.__channel_name, buffer = unpack_string(buffer)
-        self.__uid, buffer = unpack_string(buffer)
-        return buffer
+    def read(self, reader):
+        super().read(reader)
+        self.__channel_name = reader.string()
+        self.__uid = reader.string()
 
 
 class ServiceRtm(Service):
@@ -98,10 +102,9 @@ class ServiceRtm(Service):
     def pack(self):
         return super().pack() + pack_string(self.__user_id)
 
-    def unpack(self, buffer):
-        buffer = super().unpack(buffer)
-        self.__user_id, buffer = unpack_string(buffer)
-        return buffer
+    def read(self, reader):
+        super().read(reader)
+        self.__user_id = reader.string()
 
 
 class ServiceFpa(Service):
@@ -115,8 +118,8 @@ class ServiceFpa(Service):
     def pack(self):  # pylint: disable=W0246
         return super().pack()
 
-    def unpack(self, buffer):  # pylint: disable=W0246
-        return super().unpack(buffer)
+    def read(self, reader):  # pylint: disable=W0246
+        super().read(reader)
 
 
 class ServiceChat(Service):
@@ -132,10 +135,9 @@ class ServiceChat(Service):
     def pack(self):
         return super().pack() + pack_string(self.__user_id)
 
-    def unpack(self, buffer):
-        buffer = super().unpack(buffer)
-        self.__user_id, buffer = unpack_string(buffer)
-        return buffer
+    def read(self, reader):
+        super().read(reader)
+        self.__user_id = reader.string()
 
 
 class ServiceEducation(Service):
@@ -154,12 +156,11 @@ class ServiceEducation(Service):
     def pack(self):
         return super().pack() + pack_string(self.__room_uuid) + pack_string(self.__user_uuid) + pack_int16(self.__role)
 
-    def unpack(self, buffer):
-        buffer = super().unpack(buffer)
-        self.__room_uuid, buffer = unpack_string(buffer)
-        self.__user_uuid, buffer = unpack_string(buffer)
-        self.__role, buffer = unpack_int16(buffer)
-        return buffer
+    def read(self, reader):
+        super().read(reader)
+        self.__room_uuid = reader.string()
+        self.__user_uuid = reader.string()
+        self.__role = reader.int16()
 
 
 class AccessToken:
@@ -231,17 +232,17 @@ class AccessToken:
         if origin_version != get_version():
             return False
 
-        buffer = zlib.decompress(base64.b64decode(origin_token[VERSION_LENGTH:]))
-        _, buffer = unpack_string(buffer)
-        self.__app_id, buffer = unpack_string(buffer)
-        self.__issue_ts, buffer = unpack_uint32(buffer)
-        self.__expire, buffer = unpack_uint32(buffer)
-        self.__salt, buffer = unpack_uint32(buffer)
-        service_count, buffer = unpack_uint16(buffer)
+        reader = BufferReader(zlib.decompress(base64.b64decode(origin_token[VERSION_LENGTH:])))
+        reader.string()
+        self.__app_id = reader.string()
+        self.__issue_ts = reader.uint32()
+        self.__expire = reader.uint32()
+        self.__salt = reader.uint32()
+        service_count = reader.uint16()
 
         for _i in range(service_count):
-            service_type, buffer = unpack_uint16(buffer)
+            service_type = reader.uint16()
             service = AccessToken.K_SERVICES[service_type]()
-            buffer = service.unpack(buffer)
+            service.read(reader)
             self.__service[service_type] = service
         return True
@@ -3,32 +3,88 @@ __copyright__ = 'Copyright (c) 2014-2017 Agora.io, Inc.'
 
 import struct
 
+_UINT16 = struct.Struct('<H')
+_UINT32 = struct.Struct('<I')
+_INT16 = struct.Struct('<h')
+
+
+class BufferReader:
+    """Reads packed values sequentially from a buffer by advancing an offset instead of slicing it.
+
+    The buffer is wrapped in a `memoryview`, so nothing is copied apart from the bytes of the strings being read.
+    """
+
+    __slots__ = ('view', 'offset')
+
+    def __init__(self, buffer, offset=0):
+        self.view = memoryview(buffer)
+        self.offset = offset
+
+    def _unpack(self, fmt):
+        (value,) = fmt.unpack_from(self.view, self.offset)
+        self.offset += fmt.size
+        return value
+
+    def uint16(self):
+        return self._unpack(_UINT16)
+
+    def uint32(self):
+        return self._unpack(_UINT32)
+
+    def int16(self):
+        return self._unpack(_INT16)
+
+    def string(self):
+        data_length = self.uint16()
+        start, end = self.offset, self.offset + data_length
+        if end > len(self.view):
+            raise struct.error(f'unpack requires a buffer of {data_length} bytes')
+
+        self.offset = end
+        return self.view[start:end].tobytes()
+
+    def map_uint32(self):
+        return {self.uint16(): self.uint32() for _i in range(self.uint16())}
+
+    def map_string(self):
+        return {self.uint16(): self.string() for _i in range(self.uint16())}
+
+    def remaining(self):
+        offset = self.offset
+        return self.view[offset:]
+
+
+# The `unpack_*` helpers below keep their original `(value, rest)` interface, with `rest` being a zero-copy
+# `memoryview` over the remainder of the buffer rather than a fresh `bytes` copy of it.
+
+
+def _unpack_with(read, buffer):
+    reader = BufferReader(buffer)
+    return read(reader), reader.remaining()
+
 
 def pack_uint16(val):
-    return struct.pack('<H', int(val))
+    return _UINT16.pack(int(val))
 
 
 def unpack_uint16(buffer):
-    data_length = struct.calcsize('H')
-    return struct.unpack('<H', buffer[:data_length])[0], buffer[data_length:]
+    return _unpack_with(BufferReader.uint16, buffer)
 
 
 def pack_uint32(val):
-    return struct.pack('<I', int(val))
+    return _UINT32.pack(int(val))
 
 
 def unpack_uint32(buffer):
-    data_length = struct.calcsize('I')
-    return struct.unpack('<I', buffer[:data_length])[0], buffer[data_length:]
+    return _unpack_with(BufferReader.uint32, buffer)
 
 
 def pack_int16(val):
-    return struct.pack('<h', int(val))
+    return _INT16.pack(int(val))
 
 
 def unpack_int16(buffer):
-    data_length = struct.calcsize('h')
-    return struct.unpack('<h', buffer[:data_length])[0], buffer[data_length:]
+    return _unpack_with(BufferReader.int16, buffer)
 
 
 def pack_string(string):
@@ -38,8 +94,7 @@ def pack_string(string):
 
 
 def unpack_string(buffer):
-    data_length, buffer = unpack_uint16(buffer)
-    return struct.unpack(f'<{data_length}s', buffer[:data_length])[0], buffer[data_length:]
+    return _unpack_with(BufferReader.string, buffer)
 
 
 def pack_map_uint32(map_val):
@@ -47,14 +102,7 @@ def pack_map_uint32(map_val):
 
 
 def unpack_map_uint32(buffer):
-    data_length, buffer = unpack_uint16(buffer)
-
-    data = {}
-    for _i in range(data_length):
-        k, buffer = unpack_uint16(buffer)
-        val, buffer = unpack_uint32(buffer)
-        data[k] = val
-    return data, buffer
+    return _unpack_with(BufferReader.map_uint32, buffer)
 
 
 def pack_map_string(map_val):
@@ -62,11 +110,4 @@ def pack_map_string(map_val):
 
 
 def unpack_map_string(buffer):
-    data_length, buffer = unpack_uint16(buffer)
-
-    data = {}
-    for _i in range(data_length):
-        k, buffer = unpack_uint16(buffer)
-        val, buffer = unpack_string(buffer)
-        data[k] = val
-    return data, buffer
+    return _unpack_with(BufferReader.map_string, buffer)
@@ -0,0 +1,125 @@
+import hmac
+import time
+import zlib
+import base64
+import struct
+import binascii
+import functools
+from hashlib import sha256
+from dataclasses import dataclass
+
+from .packer import BufferReader, pack_uint32
+from .access_token import VERSION_LENGTH, ServiceRtc, AccessToken, get_version
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class RtcTokenClaims:
+    """What a verified RTC token grants. Every timestamp is absolute, in seconds since the epoch."""
+
+    app_id: str
+    channel_name: str
+    account: str
+    issued_at: int
+    expires_at: int
+    privileges: dict[int, int]
+
+    def is_expired(self, now=None):
+        return self.expires_at <= (time.time() if now is None else now)
+
+    def has_privilege(self, privilege, now=None):
+        expires_at = self.privileges.get(privilege)
+        return expires_at is not None and expires_at > (time.time() if now is None else now)
+
+
+@dataclass(slots=True)
+class SignedToken:
+    """The fields of an RTC token as they were packed, before its signature is checked."""
+
+    signature: bytes
+    signing_info: bytes
+    app_id: bytes
+    issue_ts: int
+    expire: int
+    salt: int
+    rtc: ServiceRtc | None
+
+
+@functools.lru_cache(maxsize=1024)
+def _signing_key(app_certificate, issue_ts, salt):
+    # tokens minted in the same second by `RtcTokenSigner` share their issue timestamp and salt, hence their key.
+    signing = hmac.new(pack_uint32(issue_ts), app_certificate, sha256).digest()
+    return hmac.new(pack_uint32(salt), signing, sha256).digest()
+
+
+def parse_token(token):
+    """Unpack `token` without checking its signature, raising `InvalidTokenError` if it is malformed."""
+    if token[:VERSION_LENGTH] != get_version():
+        raise InvalidTokenError('Unsupported token version.')
+
+    try:
+        reader = BufferReader(zlib.decompress(base64.b64decode(token[VERSION_LENGTH:], validate=True)))
+        signature = reader.string()
+        signing_info = reader.remaining()
+        app_id = reader.string()
+        issue_ts, expire, salt = reader.uint32(), reader.uint32(), reader.uint32()
+        services = {}
+        for _i in range(reader.uint16()):
+            service = AccessToken.K_SERVICES[reader.uint16()]()
+            service.read(reader)
+            services[service.service_type()] = service
+    except (binascii.Error, zlib.error, struct.error, KeyError, ValueError) as e:
+        raise InvalidTokenError('Malformed token.') from e
+
+    return SignedToken(
+        signature, signing_info, app_id, issue_ts, expire, salt, services.get(ServiceRtc.K_SERVICE_TYPE)
+    )
+
+
+def is_signed_by(token, app_id, app_certificate):
+    if token.app_id != app_id.encode('utf-8'):
+        return False
+
+    key = _signing_key(app_certificate.encode('utf-8'), token.issue_ts, token.salt)
+    return hmac.compare_digest(hmac.new(key, token.signing_info, sha256).digest(), token.signature)
+
+
+def privilege_expiries(token):
+    """When each RTC privilege of `token` expires, as absolute timestamps."""
+    # expiries are relative to the issue timestamp, a privilege without one lasts as long as the token itself.
+    expires_at = token.issue_ts + token.expire
+    return {
+        privilege: token.issue_ts + privilege_expire if privilege_expire else expires_at
+        for privilege, privilege_expire in token.rtc.privileges.items()
+    }
+
+
+def verify_rtc_token(token, app_id, app_certificate):
+    """Check the signature of an RTC `token` against our app credentials and return the claims it carries.
+
+    Raises `InvalidTokenError` for malformed tokens and for ones not signed with `app_certificate`. Expiry is left
+    to the caller, see `RtcTokenClaims.is_expired`.
+    """
+    signed = parse_token(token)
+    if not is_signed_by(signed, app_id, app_certificate):
+        raise InvalidTokenError('Token was not issued for this app.')
+
+    if signed.rtc is None:
+        raise InvalidTokenError('Token carries no RTC privileges.')
+
+    try:
+        channel_name, account = signed.rtc.channel_name.decode('utf-8'), signed.rtc.uid.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise InvalidTokenError('Malformed token.') from e
+
+    return RtcTokenClaims(
+        app_id=app_id,
+        channel_name=channel_name,
+        account=account,
+        issued_at=signed.issue_ts,
+        expires_at=signed.issue_ts + signed.expire,
+        privileges=privilege_expiries(signed),
+    )
@@ -1,12 +1,39 @@
+import hashlib
 import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from apps.contents.choices import MediaType
 
+from utils.videos import RangedFile
 from utils.constants import MAX_IMAGE_FILE_SIZE, MAX_VIDEO_FILE_SIZE
 
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# the most requests the shared client makes at once, so that none of the parallel ones waits for a connection.
+MAX_POOL_CONNECTIONS = 16
+
+
+def upload_conditions(file_type: str) -> list:
+    if file_type == MediaType.IMAGE:
+        return [['content-length-range', 0, MAX_IMAGE_FILE_SIZE]]
+    return [['content-length-range', 0, MAX_VIDEO_FILE_SIZE]]
+
+
+@functools.cache
+def shared_client(access_key, secret_key):
+    """The client of a set of credentials, created once since that is what is costly, and shared between threads."""
+    return boto3.client(
+        's3',
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        config=Config(max_pool_connections=MAX_POOL_CONNECTIONS),
+    )
+
 
 class S3Service:
     def __init__(self, access_key, secret_key, bucket):
@@ -15,36 +42,121 @@ class S3Service:
         self.bucket = bucket
 
     def get_pre_signed_upload_url(self, key: str, file_type: str, expiration):
-        if file_type == MediaType.IMAGE:
-            conditions = [['content-length-range', 0, MAX_IMAGE_FILE_SIZE]]
-        else:
-            conditions = [['content-length-range', 0, MAX_VIDEO_FILE_SIZE]]
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-        )
         response = None
         try:
-            response = s3_client.generate_presigned_post(
+            response = self.client().generate_presigned_post(
                 self.bucket,
                 key,
                 Fields=None,
-                Conditions=conditions,
+                Conditions=upload_conditions(file_type),
                 ExpiresIn=expiration,
             )
         except ClientError:
             logging.exception('Could not generate presigned url')
         return response
 
+    def get_pre_signed_upload_urls(self, files, expiration) -> dict[str, dict | None]:
+        """Presigned posts for `(s3_key, file_type)` files, all signed by the shared client."""
+        return {s3_key: self.get_pre_signed_upload_url(s3_key, file_type, expiration) for s3_key, file_type in files}
+
     def get_pre_signed_fetch_url(self, s3_key, expiration):
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
+        return self.get_pre_signed_fetch_urls([s3_key], expiration)[s3_key]
+
+    def get_pre_signed_fetch_urls(self, s3_keys, expiration) -> dict[str, str]:
+        s3_client = self.client()
+        return {
+            s3_key: s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': s3_key},
+                ExpiresIn=expiration,
+            )
+            for s3_key in s3_keys
+        }
+
+    def digest(self, s3_key) -> tuple[str, int]:
+        """The SHA-256 digest and the size of an object, hashed as it is streamed rather than held in memory."""
+        body = self.client().get_object(Bucket=self.bucket, Key=s3_key)['Body']
+        sha256, size = hashlib.sha256(), 0
+        while chunk := body.read(DIGEST_CHUNK_SIZE):
+            sha256.update(chunk)
+            size += len(chunk)
+
+        return sha256.hexdigest(), size
+
+    def download(self, s3_key) -> bytes:
+        return self.client().get_object(Bucket=self.bucket, Key=s3_key)['Body'].read()
+
+    def open_ranged_file(self, s3_key, head_size) -> RangedFile:
+        """A file that is read with ranged requests, starting with its first `head_size` bytes."""
+        s3_client = self.client()
+
+        def fetch(start, end):
+            return s3_client.get_object(Bucket=self.bucket, Key=s3_key, Range=f'bytes={start}-{end}')['Body'].read()
+
+        response = s3_client.get_object(Bucket=self.bucket, Key=s3_key, Range=f'bytes=0-{head_size - 1}')
+        size = int(response['ContentRange'].rpartition('/')[2])
+        return RangedFile(fetch, size, response['Body'].read())
+
+    def upload_files(self, files):
+        """Upload `(s3_key, data, content_type)` files, which are never changed once uploaded, with a single client."""
+        s3_client = self.client()
+        for s3_key, data, content_type in files:
+            s3_client.put_object(
+                Bucket=self.bucket,
+                Key=s3_key,
+                Body=data,
+                ContentType=content_type,
+                CacheControl='public, max-age=31536000, immutable',
+            )
+
+    def copy(self, source_key, s3_key):
+        """Copy an object of at most 5GB, the largest a single `CopyObject` takes, within the bucket."""
+        self.client().copy_object(
+            Bucket=self.bucket,
+            Key=s3_key,
+            CopySource={'Bucket': self.bucket, 'Key': source_key},
         )
-        return s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': self.bucket, 'Key': s3_key},
-            ExpiresIn=expiration,
+
+    def existing_keys(self, s3_keys) -> set[str]:
+        """The keys among `s3_keys` that exist, checked with one round of parallel `HEAD` requests."""
+        s3_keys = list(s3_keys)
+        if not s3_keys:
+            return set()
+
+        s3_client = self.client()
+
+        def exists(s3_key):
+            try:
+                s3_client.head_object(Bucket=self.bucket, Key=s3_key)
+            except ClientError as error:
+                if error.response['Error']['Code'] in {'404', 'NoSuchKey', 'NotFound'}:
+                    return False
+                raise
+
+            return True
+
+        with ThreadPoolExecutor(max_workers=min(len(s3_keys), MAX_POOL_CONNECTIONS)) as executor:
+            return {s3_key for s3_key, found in zip(s3_keys, executor.map(exists, s3_keys), strict=True) if found}
+
+    def list_objects(self, prefix, page_size=1000):
+        """The objects under `prefix`, listed a page of at most `page_size` at a time."""
+        s3_client = self.client()
+        params = {'Bucket': self.bucket, 'Prefix': prefix, 'MaxKeys': page_size}
+        while True:
+            response = s3_client.list_objects_v2(**params)
+            yield response.get('Contents', [])
+            if not response.get('IsTruncated'):
+                return
+
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    def delete_keys(self, s3_keys) -> list[str]:
+        """Delete up to 1000 keys in a single request and return the ones that could not be deleted."""
+        response = self.client().delete_objects(
+            Bucket=self.bucket,
+            Delete={'Objects': [{'Key': s3_key} for s3_key in s3_keys], 'Quiet': True},
         )
+        return [error['Key'] for error in response.get('Errors', [])]
+
+    def client(self):
+        return shared_client(self.access_key, self.secret_key)
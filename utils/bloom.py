@@ -0,0 +1,32 @@
+import math
+import hashlib
+
+
+class BloomFilter:
+    """Set membership over strings that can answer "definitely not present" without holding the strings.
+
+    Sized for `capacity` items at a false positive rate of `error_rate`. The number of hashes is fixed rather than
+    the optimal one for the rate (7 at 1%), trading a few more bits per item for fewer bits set and probed per
+    item, which is what adding and looking up costs in Python. Items cannot be removed.
+    """
+
+    __slots__ = ('bits', 'size', 'hashes')
+
+    def __init__(self, capacity: int, error_rate: float = 0.01, hashes: int = 3):
+        capacity = max(capacity, 1)
+        self.hashes = hashes
+        self.size = math.ceil(-hashes * capacity / math.log(1 - error_rate ** (1 / hashes)))
+        self.bits = bytearray(-(-self.size // 8))
+
+    def _positions(self, item: str):
+        # double hashing, the positions are derived from the two halves of a single digest.
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
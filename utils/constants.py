@@ -1,4 +1,5 @@
 from decimal import Decimal
+from datetime import timedelta
 
 ZERO = Decimal('0.00')
 ONE_MEGABYTE = 1_024_000
@@ -7,3 +8,6 @@ MAX_VIDEO_FILE_SIZE = 200 * ONE_MEGABYTE
 MINIMUM_ALLOWED_DEPOSIT_AMOUNT = Decimal('1.00')
 PERCENTAGE_CUT_FROM_WITHDRAWALS = Decimal('0.9')
 MINIMUM_ALLOWED_WITHDRAWAL_AMOUNT = Decimal('5.00')
+MIN_LIVESTREAM_DURATION = timedelta(minutes=15)
+MAX_LIVESTREAM_DURATION = timedelta(minutes=120)
+COMMENT_PREVIEW_SIZE = 3
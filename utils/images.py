@@ -0,0 +1,37 @@
+"""Image processing that runs in worker processes, which is why it imports nothing from Django."""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+ENCODERS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def render_variants(original: bytes, widths: tuple[int, ...], formats: tuple[str, ...]) -> list[tuple]:
+    """Downscale an image to each of `widths` in each of `formats`, as `(width, height, format, data)`.
+
+    Widths larger than the image are capped to it rather than upscaled, so an image narrower than every width still
+    gets a single re-encoded variant at its own size.
+    """
+    with Image.open(BytesIO(original)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+
+    rendered = []
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for image_format in formats:
+            encoded = resized
+            if image_format == 'jpeg' and resized.mode != 'RGB':
+                encoded = resized.convert('RGB')
+            elif resized.mode not in {'RGB', 'RGBA'}:
+                encoded = resized.convert('RGBA')
+
+            buffer = BytesIO()
+            encoded.save(buffer, **ENCODERS[image_format])
+            rendered.append((width, height, image_format, buffer.getvalue()))
+
+    return rendered
@@ -1,5 +1,11 @@
 import json
+import functools
+from io import BytesIO
 from typing import Any, Optional
+from datetime import UTC, datetime
+
+import boto3
+from botocore.exceptions import ClientError
 
 
 class MockResponse:  # pylint: disable=too-few-public-methods
@@ -12,3 +18,104 @@ class MockResponse:  # pylint: disable=too-few-public-methods
 
     def json(self) -> dict[str, Any]:
         return json.loads(self.text)
+
+
+class LocalS3Client:
+    """A stand-in for a boto3 S3 client that keeps objects in memory, for the calls `S3Service` makes."""
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], dict[str, Any]] = {}
+        # `(key, start, end)` of every read, to tell how much of an object was downloaded.
+        self.reads: list[tuple[str, int, int]] = []
+        self.heads: list[str] = []
+        self.listings = 0
+        self.deletions: list[list[str]] = []
+        self.presigned_posts = 0
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs: Any) -> dict[str, Any]:  # noqa: N803
+        self.objects[(Bucket, Key)] = {'Body': Body, 'LastModified': datetime.now(UTC), **kwargs}
+        return {}
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: dict[str, str]) -> dict[str, Any]:  # noqa: N803
+        stored = self.objects[(CopySource['Bucket'], CopySource['Key'])]
+        self.objects[(Bucket, Key)] = {**stored, 'LastModified': datetime.now(UTC)}
+        return {}
+
+    def head_object(self, Bucket: str, Key: str) -> dict[str, Any]:  # noqa: N803
+        self.heads.append(Key)
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+
+        stored = self.objects[(Bucket, Key)]
+        return {'ContentLength': len(stored['Body']), 'LastModified': stored['LastModified']}
+
+    def list_objects_v2(
+        self,
+        Bucket: str,  # noqa: N803
+        Prefix: str = '',  # noqa: N803
+        MaxKeys: int = 1000,  # noqa: N803
+        ContinuationToken: Optional[str] = None,  # noqa: N803
+    ) -> dict[str, Any]:
+        # keys are listed in order and the token is the last key of the previous page, as S3 does.
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        if ContinuationToken is not None:
+            keys = [key for key in keys if key > ContinuationToken]
+
+        page = keys[:MaxKeys]
+        self.listings += 1
+        response = {
+            'KeyCount': len(page),
+            'IsTruncated': len(keys) > MaxKeys,
+            'Contents': [
+                {
+                    'Key': key,
+                    'Size': len(self.objects[(Bucket, key)]['Body']),
+                    'LastModified': self.objects[(Bucket, key)]['LastModified'],
+                }
+                for key in page
+            ],
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def delete_objects(self, Bucket: str, Delete: dict[str, Any]) -> dict[str, Any]:  # noqa: N803
+        self.deletions.append([entry['Key'] for entry in Delete['Objects']])
+        for entry in Delete['Objects']:
+            self.objects.pop((Bucket, entry['Key']), None)
+        return {}
+
+    @functools.cached_property
+    def signer(self) -> Any:
+        # signing is local, so posts are presigned by a real client with dummy credentials.
+        return boto3.session.Session().client(
+            's3',
+            aws_access_key_id='local',
+            aws_secret_access_key='local',  # noqa: S106
+            region_name='us-east-1',
+        )
+
+    def generate_presigned_post(self, Bucket: str, Key: str, **kwargs: Any) -> dict[str, Any]:  # noqa: N803
+        self.presigned_posts += 1
+        return self.signer.generate_presigned_post(Bucket, Key, **kwargs)
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None) -> dict[str, Any]:  # noqa: N803
+        stored = self.objects[(Bucket, Key)]
+        body, size = stored['Body'], len(stored['Body'])
+        if Range is None:
+            self.reads.append((Key, 0, size))
+            return {**stored, 'Body': BytesIO(body), 'ContentLength': size}
+
+        start, end = (int(bound) for bound in Range.removeprefix('bytes=').split('-'))
+        stop = min(end + 1, size)
+        self.reads.append((Key, start, stop))
+        return {
+            **stored,
+            'Body': BytesIO(body[start:stop]),
+            'ContentLength': stop - start,
+            'ContentRange': f'bytes {start}-{stop - 1}/{size}',
+        }
+
+    def generate_presigned_url(self, method: str, Params: dict[str, str], ExpiresIn: int) -> str:  # noqa: N803
+        bucket, key = Params['Bucket'], Params['Key']
+        return f'https://s3.local/{bucket}/{key}?Method={method}&Expires={ExpiresIn}&Signature=local'
@@ -1,6 +1,8 @@
 from uuid import uuid4
 
 from django.db import models
+from django.db.models import Count, Subquery
+from django.db.models.functions import Coalesce
 
 
 class UUIDModel(models.Model):
@@ -21,3 +23,9 @@ class TimestampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+def count_subquery(queryset, group_by='creator'):
+    """Count the rows of a queryset correlated to the outer query on `group_by`, as a single column expression."""
+    totals = queryset.order_by().values(group_by).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(totals), 0)
@@ -1,4 +1,8 @@
-from rest_framework.pagination import CursorPagination
+import itertools
+
+from rest_framework.response import Response
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomCursorPagination(CursorPagination):
@@ -6,3 +10,78 @@ class CustomCursorPagination(CursorPagination):
     max_page_size = 20
     cursor_query_param = 'page'
     ordering = '-created_at'
+    # when set, the results of a page are grouped by the ISO date of this datetime field of each row.
+    group_by_date: str | None = None
+
+    def get_paginated_response(self, data):
+        if self.group_by_date is not None:
+            data = self.group_results(data)
+
+        return super().get_paginated_response(data)
+
+    def group_results(self, data):
+        """Group the serialized rows of the page in a single pass, keeping the order of the page."""
+        grouped = {}
+        rows = zip(self.page, data, strict=True)
+        for day, group in itertools.groupby(rows, lambda row: getattr(row[0], self.group_by_date).date()):
+            grouped.setdefault(day.isoformat(), []).extend(serialized for _, serialized in group)
+
+        return grouped
+
+
+class DateGroupedCursorPagination(CustomCursorPagination):
+    group_by_date = 'created_at'
+
+
+class StartCursorPagination(CustomCursorPagination):
+    """Pages through livestreams in the order they start."""
+
+    page_size = 50
+    ordering = 'start'
+
+
+class RankedPagination(BasePagination):
+    """Numbered pages over an ordering that a cursor cannot follow, such as a search rank.
+
+    Matches are never counted, whether there is a next page is known from fetching one row more than a page.
+    """
+
+    page_size = 10
+    page_query_param = 'page'
+
+    request = None
+    page_number = 1
+    has_next = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number = self.get_page_number(request)
+        start = (self.page_number - 1) * self.page_size
+        end = start + self.page_size + 1
+        rows = list(queryset[start:end])
+        self.has_next = len(rows) > self.page_size
+        return rows[:-1] if self.has_next else rows
+
+    def get_page_number(self, request):
+        # anything but a positive page number falls back to the first page.
+        page_number = request.query_params.get(self.page_query_param, '1')
+        return int(page_number) if page_number.isdecimal() and int(page_number) > 0 else 1
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:  # noqa: PLR2004
+            return remove_query_param(url, self.page_query_param)
+
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data})
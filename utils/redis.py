@@ -0,0 +1,10 @@
+import functools
+
+import redis
+
+from django.conf import settings
+
+
+@functools.cache
+def get_redis() -> redis.Redis:
+    return redis.Redis(connection_pool=settings.REDIS_CONNECTION_POOL)
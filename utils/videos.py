@@ -0,0 +1,180 @@
+"""Video metadata read from the container header alone, and poster frames extracted by ffmpeg.
+
+MP4 and QuickTime files are a sequence of boxes, the metadata being in the `moov` box at either end of the file
+while the `mdat` box holds the media itself. `read_video_info` walks the top-level boxes with ranged reads, skipping
+`mdat` without reading it, and only fetches `moov` in full, which is a few kilobytes to a few hundred for hours of
+video.
+"""
+import shutil
+import struct
+import subprocess
+from dataclasses import dataclass
+from collections.abc import Callable
+
+# the first read covers the start of the file, which holds `moov` too when the file is optimized for streaming.
+HEAD_READ_SIZE = 64 * 1024
+
+# boxes that only contain other boxes, on the path from `moov` to the ones that are parsed.
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+# the codec is the type of the first sample entry of `stsd`, after its version, flags and entry count.
+SAMPLE_ENTRY_TYPE = slice(12, 16)
+
+POSTER_TIMEOUT = 60
+
+
+@dataclass
+class VideoInfo:
+    duration: float
+    width: int | None = None
+    height: int | None = None
+    codec: str = ''
+
+
+class RangedFile:
+    """A file read through `fetch(start, end)`, with the end inclusive as in a `Range` header."""
+
+    def __init__(self, fetch: Callable[[int, int], bytes], size: int, head: bytes = b''):
+        self.fetch = fetch
+        self.size = size
+        self.head = head
+
+    def read(self, start: int, length: int) -> bytes:
+        end = min(start + length, self.size)
+        if end <= len(self.head):
+            return self.head[start:end]
+
+        return self.fetch(start, end - 1)
+
+
+def iter_boxes(data: bytes):
+    """The `(type, payload)` of the boxes laid out one after the other in `data`."""
+    offset, end = 0, len(data)
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from('>Q', data, offset + 8)
+            header = 16
+        elif size == 0:
+            size = end - offset
+
+        if size < header:
+            return
+
+        start, offset = offset + header, offset + size
+        yield box_type, data[start:offset]
+
+
+def read_video_info(file: RangedFile) -> VideoInfo | None:
+    """The metadata of an MP4 or QuickTime file, or `None` when it is in another container or is cut short."""
+    try:
+        return find_movie(file)
+    except struct.error:
+        return None
+
+
+def find_movie(file: RangedFile) -> VideoInfo | None:
+    offset = 0
+    while offset + 8 <= file.size:
+        header = file.read(offset, 16)
+        size, box_type = struct.unpack_from('>I4s', header)
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack_from('>Q', header, 8)
+            header_size = 16
+        elif size == 0:
+            size = file.size - offset
+
+        if size < header_size:
+            return None
+
+        if box_type == b'moov':
+            start = offset + header_size
+            return parse_movie(file.read(start, size - header_size))
+
+        offset += size
+
+    return None
+
+
+def parse_movie(moov: bytes) -> VideoInfo | None:
+    info = None
+    for box_type, payload in iter_boxes(moov):
+        if box_type == b'mvhd':
+            if payload[0] == 1:
+                timescale, duration = struct.unpack_from('>IQ', payload, 20)
+            else:
+                timescale, duration = struct.unpack_from('>II', payload, 12)
+            info = VideoInfo(duration=duration / timescale if timescale else 0)
+        elif box_type == b'trak' and info is not None:
+            track = parse_track(payload)
+            if track is not None and not info.codec:
+                info.width, info.height, info.codec = track
+
+    return info
+
+
+def parse_track(trak: bytes) -> tuple[int, int, str] | None:
+    """The dimensions and codec of a video track, `None` for any other track."""
+    boxes = {}
+
+    def collect(data):
+        for box_type, payload in iter_boxes(data):
+            if box_type in CONTAINER_BOXES:
+                collect(payload)
+            else:
+                boxes.setdefault(box_type, payload)
+
+    collect(trak)
+    hdlr, tkhd, stsd = boxes.get(b'hdlr'), boxes.get(b'tkhd'), boxes.get(b'stsd')
+    if hdlr is None or hdlr[8:12] != b'vide' or tkhd is None:
+        return None
+
+    # the display size is 16.16 fixed point at the end of the box, after the transformation matrix.
+    width, height = (value >> 16 for value in struct.unpack_from('>II', tkhd, len(tkhd) - 8))
+    matrix_offset = 52 if tkhd[0] == 1 else 40
+    scale_x, rotate_x = struct.unpack_from('>ii', tkhd, matrix_offset)
+    if scale_x == 0 and rotate_x != 0:
+        # rotated by a quarter turn, as phones record portrait videos.
+        width, height = height, width
+
+    codec = ''
+    if stsd is not None and len(stsd) >= SAMPLE_ENTRY_TYPE.stop:
+        codec = stsd[SAMPLE_ENTRY_TYPE].decode('latin-1').strip()
+
+    return width, height, codec
+
+
+def extract_poster(url: str, position: float) -> bytes | None:
+    """A JPEG of the frame `position` seconds into the video at `url`, or `None` when ffmpeg is not installed.
+
+    ffmpeg reads HTTP urls with range requests, so only the part of the file around the frame is downloaded.
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return None
+
+    command = (
+        ffmpeg,
+        '-nostdin',
+        '-loglevel',
+        'error',
+        '-ss',
+        f'{position:.3f}',
+        '-i',
+        url,
+        '-frames:v',
+        '1',
+        '-vf',
+        "scale='min(1080,iw)':-2",
+        '-f',
+        'image2',
+        '-c:v',
+        'mjpeg',
+        '-q:v',
+        '3',
+        'pipe:1',
+    )
+    result = subprocess.run(command, capture_output=True, timeout=POSTER_TIMEOUT, check=True)  # noqa: S603
+    return result.stdout or None